@@ -1,39 +1,27 @@
 """
 agent.py
 ENTRY POINT for the Process Diagram Multi-Agent System
+
+Importing this module is cheap: the agents, plugins, session service and
+runners are built on first use by the cached get_*() factories below (the
+google.adk/google.genai imports are deferred to them as well). Module
+attributes 'root_agent', 'app', 'runner', ... still work (ADK Web reads
+'app'/'root_agent') and trigger the build on first access.
 """
 
 import os
 import sys
 import asyncio
+import functools
 import json
 import re
-
-# --- SMART IMPORTS ---
-from google.adk.agents import SequentialAgent, LoopAgent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.genai import types
-import google.generativeai as genai
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
 
 # Import from app package
 from app import config
-from app.agents import (
-    create_pdf_analysis_agent,
-    create_pdf_text_extraction_agent,
-    create_conversion_agent,
-    create_quality_agent,
-    create_bpmn_generation_agent,
-    create_validation_agent,
-    create_system_evaluator_agent,
-    create_approval_agent,
-    create_publication_agent
-)
-from app.tools import (
-    render_mermaid_to_svg,
-    save_diagram,
-    save_report
-)
 
 # =============================================================================
 # Helper: Robust JSON Parser
@@ -53,189 +41,598 @@ def repair_and_parse_json(json_str):
 
 # =============================================================================
 
-print("\n" + "="*70)
-print("🚀 Process Diagram Multi-Agent System")
-print("="*70 + "\n")
+APP_NAME = "ProcessDiagramApp"
+USER_ID = "test_user"
 
-genai.configure(api_key=config.GOOGLE_API_KEY)
 
-# =============================================================================
-# Create Sub-Agents
-# =============================================================================
+@functools.lru_cache(maxsize=None)
+def _initialize() -> None:
+    """One-time startup: banner, config validation, model scheduler."""
+    from app.app_utils.model_scheduler import install_model_scheduler
 
-print("📦 Creating Sub-Agents...")
+    print("\n" + "="*70)
+    print("🚀 Process Diagram Multi-Agent System")
+    print("="*70 + "\n")
 
-pdf_text_extraction_agent = create_pdf_text_extraction_agent()
-pdf_analysis_agent = create_pdf_analysis_agent()
-conversion_agent = create_conversion_agent()
-quality_agent = create_quality_agent()
-bpmn_generation_agent = create_bpmn_generation_agent()
-validation_agent = create_validation_agent()
-system_evaluator_agent = create_system_evaluator_agent()
-approval_agent = create_approval_agent()
-publication_agent = create_publication_agent()
+    config.validate_config()
+    os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+    os.makedirs(config.LOGS_DIR, exist_ok=True)
+
+    # All Gemini calls (every agent, every concurrent run) share one rate-limit-aware scheduler
+    install_model_scheduler()
 
 # =============================================================================
-# Create Quality Loop Agent
+# Create Sub-Agents + Root Agent
 # =============================================================================
 
-print("\n🔄 Creating LoopAgent (Quality Loop)...")
+@functools.lru_cache(maxsize=None)
+def get_root_agent():
+    """Builds the sub-agents, the quality loop and the root agent (once)."""
+    from google.adk.agents import SequentialAgent, LoopAgent
+    from app.agents import (
+        create_pdf_analysis_agent,
+        create_chunked_pdf_analysis_agent,
+        create_pdf_text_extraction_agent,
+        create_pdf_extraction_stage,
+        create_text_preprocessing_stage,
+        create_conversion_agent,
+        create_best_of_n_conversion_agent,
+        create_quality_agent,
+        create_quality_loop_controller,
+        create_bpmn_generation_agent,
+        create_mermaid_compiler_stage,
+        create_validation_agent,
+        create_mermaid_validation_stage,
+        create_approval_agent,
+        create_publication_agent
+    )
+    from app.tools.revision_store import skip_if_graph_unchanged
+
+    _initialize()
+    print("📦 Creating Sub-Agents...")
 
-quality_loop_agent = LoopAgent(
-    name="QualityLoopAgent",
-    description="Iteratively refines the process structure.",
-    sub_agents=[conversion_agent, quality_agent],
-    max_iterations=config.MAX_QUALITY_ITERATIONS
-)
+    if config.USE_LLM_PDF_EXTRACTION:
+        pdf_text_extraction_agent = create_pdf_text_extraction_agent()
+    else:
+        pdf_text_extraction_agent = create_pdf_extraction_stage()
+    text_preprocessing_stage = create_text_preprocessing_stage() if config.PREPROCESS_TEXT else None
+    if config.ANALYSIS_CHUNKING or config.INCREMENTAL_ANALYSIS:
+        pdf_analysis_agent = create_chunked_pdf_analysis_agent()
+    else:
+        pdf_analysis_agent = create_pdf_analysis_agent()
+    if config.USE_LLM_MERMAID_GENERATION:
+        bpmn_generation_agent = create_bpmn_generation_agent()
+    else:
+        bpmn_generation_agent = create_mermaid_compiler_stage()
+    if config.USE_LLM_VALIDATION:
+        validation_agent = create_validation_agent()
+    else:
+        validation_agent = create_mermaid_validation_stage()
+    approval_agent = create_approval_agent()
+    publication_agent = create_publication_agent()
+
+    # --- Quality Loop Agent ---
+    if config.CONVERSION_MODE == "best_of_n":
+        print("\n🔀 Creating Best-of-N Conversion (instead of the Quality Loop)...")
+        quality_loop_agent = create_best_of_n_conversion_agent()
+    else:
+        print("\n🔄 Creating LoopAgent (Quality Loop)...")
+        quality_loop_agent = LoopAgent(
+            name="QualityLoopAgent",
+            description="Iteratively refines the process structure.",
+            sub_agents=[create_conversion_agent(), create_quality_agent(), create_quality_loop_controller()],
+            max_iterations=config.MAX_QUALITY_ITERATIONS,
+            before_agent_callback=skip_if_graph_unchanged  # Incremental re-analysis
+        )
 
-print(f"✅ {quality_loop_agent.name} created")
+    print(f"✅ {quality_loop_agent.name} created")
+
+    # --- Root Agent ---
+    print("\n🎯 Creating Root Agent...")
+
+    agent = SequentialAgent(
+        name="ProcessDiagramRootAgent",
+        description="Root orchestrator for process diagram generation.",
+        sub_agents=[
+            pdf_text_extraction_agent,
+            *([text_preprocessing_stage] if text_preprocessing_stage else []),
+            pdf_analysis_agent,
+            quality_loop_agent,
+            bpmn_generation_agent,
+            validation_agent,
+            approval_agent,     # HITL Gatekeeper
+            publication_agent   # Final Action
+        ]
+    )
+
+    print(f"✅ {agent.name} created\n")
+    return agent
+
+
+@functools.lru_cache(maxsize=None)
+def get_system_evaluator_agent():
+    """The Agent-as-a-Judge run after each workflow (built on first evaluation)."""
+    from app.agents import create_system_evaluator_agent
+
+    _initialize()
+    return create_system_evaluator_agent()
 
 # =============================================================================
-# Create Root Agent
+# App (Root Agent + Plugins)
 # =============================================================================
 
-print("\n🎯 Creating Root Agent...")
-
-agent = SequentialAgent(
-    name="ProcessDiagramRootAgent",
-    description="Root orchestrator for process diagram generation.",
-    sub_agents=[
-        pdf_text_extraction_agent,
-        pdf_analysis_agent,
-        quality_loop_agent,
-        bpmn_generation_agent,
-        validation_agent,
-        approval_agent,     # HITL Gatekeeper
-        publication_agent   # Final Action
+@functools.lru_cache(maxsize=None)
+def get_metrics_plugin():
+    """InstrumentationPlugin, StageTimingPlugin or None (per config)."""
+    from app.app_utils.instrumentation import create_instrumentation_plugin
+    from app.app_utils.stage_timing import create_stage_timing_plugin
+
+    return create_instrumentation_plugin() or create_stage_timing_plugin()
+
+
+@functools.lru_cache(maxsize=None)
+def get_checkpoint_plugin():
+    """CheckpointPlugin (SQLite checkpoints per root stage) or None (per config)."""
+    from app.app_utils.checkpoints import create_checkpoint_plugin
+
+    return create_checkpoint_plugin()
+
+
+@functools.lru_cache(maxsize=None)
+def get_plugins():
+    """Plugins shared by the workflow and the evaluator app."""
+    from app.app_utils.compact_output import create_compact_output_plugin
+    from app.app_utils.model_cache import create_model_cache_plugin
+    from app.app_utils.model_router import create_model_routing_plugin
+
+    # Checkpoints first (skipping a restored stage bypasses all other plugins).
+    # Routing before metrics and cache (both read the routed model);
+    # compact output expands responses before metrics and cache see them;
+    # a model cache hit short-circuits all later plugins.
+    return [
+        p for p in [
+            get_checkpoint_plugin(),
+            create_model_routing_plugin(),
+            create_compact_output_plugin(),
+            get_metrics_plugin(),
+            create_model_cache_plugin()
+        ] if p
     ]
-)
 
-# IMPORTANT: For ADK Web
-root_agent = agent
 
-print(f"✅ {agent.name} created\n")
+@functools.lru_cache(maxsize=None)
+def get_app():
+    """Root agent + plugins. ADK Web prefers 'app' over 'root_agent' if present (enables the plugins)."""
+    from google.adk.apps import App
+
+    return App(name=APP_NAME, root_agent=get_root_agent(), plugins=get_plugins())
 
 # =============================================================================
-# Session Service
+# Session Service + Runners
 # =============================================================================
 
-session_service = InMemorySessionService()
+def find_saved_metadata_path(session):
+    """Path of the metadata JSON written by 'save_diagram' in this session (or None)."""
+    published = session.state.get("publication_result") or {}
+    if published.get("metadata_path"):
+        return published["metadata_path"]  # Direct (no-LLM) publication
+    for event in reversed(session.events):
+        for response in event.get_function_responses():
+            result = response.response or {}
+            if response.name == "save_diagram" and result.get("metadata_path"):
+                return result["metadata_path"]
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def get_session_service():
+    """Finished sessions are evicted (TTL/LRU under SESSION_STORE_MAX_MB)."""
+    from app.app_utils.session_store import BoundedInMemorySessionService
+
+    return BoundedInMemorySessionService()
+
+
+# One Runner per app, shared by all (concurrent) runs: each run only owns its session
+@functools.lru_cache(maxsize=None)
+def get_runner():
+    from google.adk.runners import Runner
+
+    return Runner(app=get_app(), session_service=get_session_service())
+
+
+@functools.lru_cache(maxsize=None)
+def get_eval_runner():
+    from google.adk.apps import App
+    from google.adk.runners import Runner
+
+    return Runner(
+        app=App(name=APP_NAME, root_agent=get_system_evaluator_agent(), plugins=get_plugins()),
+        session_service=get_session_service()
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_evaluation_queue():
+    """Background, sampled SystemEvaluatorAgent runs (see evaluate_run)."""
+    from app.app_utils.evaluation_queue import EvaluationQueue
+
+    return EvaluationQueue(evaluate_run)
+
+
+# Module attributes built on first access (PEP 562)
+_LAZY_ATTRIBUTES = {
+    "agent": get_root_agent,
+    "root_agent": get_root_agent,  # IMPORTANT: For ADK Web
+    "app": get_app,
+    "system_evaluator_agent": get_system_evaluator_agent,
+    "metrics_plugin": get_metrics_plugin,
+    "plugins": get_plugins,
+    "session_service": get_session_service,
+    "runner": get_runner,
+    "eval_runner": get_eval_runner,
+    "evaluation_queue": get_evaluation_queue,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # =============================================================================
 # Workflow Logic
 # =============================================================================
 
-async def run_process_diagram_workflow(pdf_path: str, user_query: str = None):
+async def run_workflow(
+    pdf_path: str,
+    user_query: str = None,
+    priority: str = "interactive",
+    session_id: str = None,
+    user_id: str = USER_ID,
+    checkpoint: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Runs the workflow for one PDF in its own session (safe to call concurrently).
+
+    Args:
+        pdf_path: Source PDF
+        user_query: Optional instruction (default: analyze the process)
+        priority: Scheduler priority class of the model calls ("interactive"/"batch")
+        session_id: Session to create (default: a new unique id)
+        user_id: Session owner
+        checkpoint: Restart from this checkpoint instead (see resume_workflow)
+
+    Returns:
+        Dict with 'session_id', 'user_id', 'response', 'state' (snapshot of
+        the final session state), 'metadata_path', 'eval_score' and 'error'.
+        'eval_score' is the score only with EVAL_BACKGROUND=false; otherwise
+        'queued', 'not sampled' or 'after approval' (paused run) - the
+        evaluation is added to the metadata JSON when it finished
+    """
+    from google.genai import types
+    from app.app_utils.approval_queue import get_approval_queue
+    from app.app_utils.context_builder import context_report, print_context_report, reset_context_report
+    from app.app_utils.instrumentation import InstrumentationPlugin
+    from app.app_utils.model_router import print_routing_report, reset_routing_log, routing_report
+    from app.app_utils.model_scheduler import get_model_scheduler, priority_class
+    from app.tools.filesystem_saver import attach_run_summary
+
+    agent = get_root_agent()
+    metrics_plugin = get_metrics_plugin()
+    session_service = get_session_service()
+    runner = get_runner()
+
     print("="*70)
     print("🔥 STARTING WORKFLOW")
     print("="*70)
-    
+
+    session_id = session_id or f"session_{uuid.uuid4().hex[:12]}"  # One session per run
+    result = {
+        "session_id": session_id,
+        "user_id": user_id,
+        "response": "",
+        "state": {},
+        "metadata_path": None,
+        "eval_score": "N/A",
+        "error": None,
+    }
+    app_name = APP_NAME
+    active = False
+
     try:
-        if not user_query:
-            user_query = "Analyze this process description."
-        
-        user_query += f"\n\nThe source PDF is located at path: {pdf_path}"
-        
-        user_id = "test_user"
-        session_id = "test_session"
-        app_name = "ProcessDiagramApp"
+        if checkpoint:
+            # Resume: recreate the session from the checkpointed state; the
+            # checkpoint plugin skips the stages that finished before
+            state = checkpoint["state"]
+            user_query = checkpoint["user_message"] or f"The source PDF is located at path: {pdf_path}"
+            await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            get_checkpoint_plugin().resume(session_id, checkpoint["next_stage"])
+        else:
+            if not user_query:
+                user_query = "Analyze this process description."
+            
+            user_query += f"\n\nThe source PDF is located at path: {pdf_path}"
+            state = {"pdf_path": pdf_path}
         
         session = await session_service.create_session(
-            app_name=app_name, user_id=user_id, session_id=session_id
+            app_name=app_name, user_id=user_id, session_id=session_id, state=state
         )
-        
-        runner = Runner(agent=agent, app_name=app_name, session_service=session_service)
+        session_service.mark_active(app_name, user_id, session_id)  # Not evicted while running
+        active = True
         
         final_response = ""
         
         # --- MAIN EVENT LOOP (Clean & Simple) ---
         # Wir entfernen hier jegliche manuelle Confirmation-Logik!
         # Das macht jetzt das Tool selbst.
-        async for event in runner.run_async(
-            user_id=user_id, session_id=session_id, 
-            new_message=types.Content(parts=[types.Part(text=user_query)])
-        ):
-            if event.is_final_response():
-                if hasattr(event, 'text') and event.text:
-                    final_response = event.text
-                else:
-                    final_response = "Workflow completed."
+        # Model calls of this run are scheduled with its priority class
+        with priority_class(priority):
+            async for event in runner.run_async(
+                user_id=user_id, session_id=session_id, 
+                new_message=types.Content(parts=[types.Part(text=user_query)])
+            ):
+                if event.is_final_response():
+                    if hasattr(event, 'text') and event.text:
+                        final_response = event.text
+                    else:
+                        final_response = "Workflow completed."
         
         print(f"\n✅ Workflow completed!")
+        result["response"] = final_response
 
-        # --- SYSTEM EVALUATION (Agent-as-a-Judge) ---
-        print(f"\n🏅 System Evaluation (Agent-as-a-Judge)...")
-        
-        eval_score = "N/A"
-        
-        try:
-            session = await session_service.get_session(
-                app_name=app_name, user_id=user_id, session_id=session_id
-            )
-            mermaid_code = session.state.get("current_mermaid_code", "")
-            
-            eval_runner = Runner(
-                agent=system_evaluator_agent,
-                app_name=app_name,
-                session_service=session_service
-            )
-            
-            execution_trace = {
+        session = await session_service.get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id
+        )
+        result["state"] = session.state if session else {}
+        result["metadata_path"] = find_saved_metadata_path(session) if session else None
+
+        # Metrics are collected per session, so concurrent runs report only their own
+        if metrics_plugin:
+            metrics_plugin.print_summary(session_id)
+        print_context_report(session_id)
+        print_routing_report(session_id)
+        if config.MODEL_SCHEDULER:
+            get_model_scheduler().print_summary()
+
+        # --- SYSTEM EVALUATION (Agent-as-a-Judge, sampled) ---
+        # Paused runs are evaluated once their resumed run completes
+        evaluation_job = None
+        if result["state"].get("approval_status") != "PENDING":
+            evaluation_job = {
+                "session_id": session_id,
+                "user_id": user_id,
+                "pdf_path": pdf_path,
+                "metadata_path": result["metadata_path"],
+                "mermaid_code": result["state"].get("current_mermaid_code", ""),
+                "graph": result["state"].get("conversion_output"),
                 "agents_invoked": [a.name for a in agent.sub_agents],
-                "final_output_len": len(mermaid_code)
             }
-            
-            eval_prompt = f"Evaluate execution. Trace: {execution_trace}. Code: {mermaid_code[:1000]}..."
-            
-            eval_result = None
+        evaluation_queue = get_evaluation_queue()
+        if evaluation_job is None:
+            result["eval_score"] = "after approval"
+        elif not config.EVAL_BACKGROUND:
+            evaluation = await evaluation_queue.evaluate_now(evaluation_job)
+            result["eval_score"] = evaluation["overall_score"] if evaluation else "not sampled"
+
+        # --- RUN SUMMARY (metadata JSON + JSONL) ---
+        if isinstance(metrics_plugin, InstrumentationPlugin):
+            run_fields = {
+                "context_scoping": context_report(session_id),
+                "routing": routing_report(session_id),
+                "scheduler": get_model_scheduler().stats() if config.MODEL_SCHEDULER else {},
+                "session_store": session_service.stats(),
+                "approval_queue": get_approval_queue().stats() if get_approval_queue() else {},
+                "evaluations": evaluation_queue.stats(),
+            }
+            if result["metadata_path"]:
+                attach_run_summary(
+                    result["metadata_path"], {**metrics_plugin.run_summary(session_id), **run_fields}
+                )
+            metrics_plugin.export_jsonl(
+                config.METRICS_JSONL, session_id=session_id, pdf_path=pdf_path, **run_fields
+            )
+            print(f"📊 Run metrics appended to {config.METRICS_JSONL}")
+
+        if evaluation_job is not None and config.EVAL_BACKGROUND:
+            # After the run summary: the evaluation adds to the metadata JSON later
+            queued = evaluation_queue.submit(evaluation_job)
+            result["eval_score"] = "queued" if queued else "not sampled"
+            print(f"🏅 System evaluation {'queued in the background' if queued else 'not sampled'}")
+
+    except Exception as e:
+        print(f"\n❌ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        result["error"] = str(e)
+        result["response"] = f"Error: {str(e)}"
+
+    finally:
+        # Drop this run's metrics and release its session for eviction
+        if metrics_plugin:
+            metrics_plugin.reset(session_id)
+        reset_context_report(session_id)
+        reset_routing_log(session_id)
+        if active:
+            session_service.mark_finished(app_name, user_id, session_id)
+            if result["state"].get("approval_status") == "PENDING" and get_checkpoint_plugin():
+                # Paused for review: the checkpoint holds the run, release the session now
+                get_checkpoint_plugin().store.flush()
+                await session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        await session_service.evict()
+        print(f"🗄️ Session store: {session_service.stats()}")
+
+    return result
+
+
+async def evaluate_run(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs the SystemEvaluatorAgent for a finished run (job from run_workflow).
+
+    Uses its own session, so the run's session can be released meanwhile.
+    The result is added to the run's metadata JSON and appended to EVAL_JSONL.
+    """
+    from google.genai import types
+    from app.app_utils.context_builder import reset_context_report
+    from app.app_utils.instrumentation import InstrumentationPlugin
+    from app.app_utils.model_router import reset_routing_log
+    from app.app_utils.model_scheduler import priority_class
+    from app.tools.filesystem_saver import attach_evaluation
+
+    session_service = get_session_service()
+    metrics_plugin = get_metrics_plugin()
+    eval_runner = get_eval_runner()
+    user_id = job["user_id"]
+    eval_session_id = f"{job['session_id']}_eval"
+    evaluation = {"session_id": job["session_id"], "overall_score": "N/A", "feedback": None, "scores": {}}
+
+    await session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=eval_session_id)
+    await session_service.create_session(
+        app_name=APP_NAME, user_id=user_id, session_id=eval_session_id,
+        state={"pdf_path": job["pdf_path"], "conversion_output": job["graph"]}  # For model routing
+    )
+    session_service.mark_active(APP_NAME, user_id, eval_session_id)
+    start = time.perf_counter()
+    try:
+        mermaid_code = job["mermaid_code"]
+        execution_trace = {
+            "agents_invoked": job["agents_invoked"],
+            "final_output_len": len(mermaid_code)
+        }
+
+        eval_prompt = f"Evaluate execution. Trace: {execution_trace}. Code: {mermaid_code[:1000]}..."
+
+        eval_result = None
+        # Background work: never ahead of interactive runs in the model scheduler
+        with priority_class("batch"):
             async for event in eval_runner.run_async(
                 user_id=user_id,
-                session_id=session_id,
+                session_id=eval_session_id,
                 new_message=types.Content(parts=[types.Part(text=eval_prompt)])
             ):
                 if event.is_final_response():
                     eval_result = event
-            
-            # Robust Parsing
-            if eval_result:
-                raw_text = ""
-                if hasattr(eval_result, 'text') and eval_result.text:
-                    raw_text = eval_result.text
-                elif hasattr(eval_result, 'content') and hasattr(eval_result.content, 'parts'):
-                    for part in eval_result.content.parts:
-                        if hasattr(part, 'text'):
-                            raw_text += part.text
-                
-                if not raw_text:
-                    raw_text = str(eval_result)
-
-                json_match = re.search(r'(\{[\s\S]*\})', raw_text)
-                if json_match:
-                    clean_json = json_match.group(1)
-                    eval_data = repair_and_parse_json(clean_json)
-                    if eval_data:
-                        eval_score = eval_data.get('overall_score', 'N/A')
-                        feedback = eval_data.get('feedback', 'No feedback')
-                        print(f"💡 Feedback: {feedback[:300]}...")
-                    else:
-                        print(f"⚠️ Warning: JSON parsing failed.")
+
+        # Robust Parsing
+        if eval_result:
+            raw_text = ""
+            if hasattr(eval_result, 'text') and eval_result.text:
+                raw_text = eval_result.text
+            elif hasattr(eval_result, 'content') and hasattr(eval_result.content, 'parts'):
+                for part in eval_result.content.parts:
+                    if hasattr(part, 'text'):
+                        raw_text += part.text
+
+            if not raw_text:
+                raw_text = str(eval_result)
+
+            json_match = re.search(r'(\{[\s\S]*\})', raw_text)
+            if json_match:
+                clean_json = json_match.group(1)
+                eval_data = repair_and_parse_json(clean_json)
+                if eval_data:
+                    evaluation["overall_score"] = eval_data.get('overall_score', 'N/A')
+                    evaluation["feedback"] = eval_data.get('feedback', 'No feedback')
+                    evaluation["scores"] = {k: v for k, v in eval_data.items() if k.endswith("_score")}
+                    evaluation["recommendations"] = eval_data.get("recommendations", [])
                 else:
-                    print(f"⚠️ Warning: No JSON block found.")
+                    print(f"⚠️ Warning: JSON parsing failed.")
             else:
-                 print(f"⚠️ Warning: Evaluator returned None.")
+                print(f"⚠️ Warning: No JSON block found.")
+        else:
+             print(f"⚠️ Warning: Evaluator returned None.")
 
-        except Exception as e:
-            print(f"⚠️ Warning during evaluation: {e}")
+    except Exception as e:
+        print(f"⚠️ Warning during evaluation: {e}")
+        evaluation["error"] = str(e)
 
-        print(f"📈 Overall Score: {eval_score}")
-        
-        return final_response
+    finally:
+        evaluation["latency_s"] = round(time.perf_counter() - start, 3)
+        if isinstance(metrics_plugin, InstrumentationPlugin):
+            evaluation["metrics"] = metrics_plugin.run_summary(eval_session_id)["totals"]
+        if metrics_plugin:
+            metrics_plugin.reset(eval_session_id)
+        reset_context_report(eval_session_id)
+        reset_routing_log(eval_session_id)
+        session_service.mark_finished(APP_NAME, user_id, eval_session_id)
+        await session_service.delete_session(app_name=APP_NAME, user_id=user_id, session_id=eval_session_id)
+
+    evaluation["evaluated_at"] = datetime.now().isoformat()
+    print(f"🏅 System Evaluation of {job['session_id']}: {evaluation['overall_score']} "
+          f"({evaluation['latency_s']:.1f}s)")
+    if evaluation["feedback"]:
+        print(f"💡 Feedback: {evaluation['feedback'][:300]}...")
+
+    if job["metadata_path"]:
+        attach_evaluation(job["metadata_path"], evaluation)
+    os.makedirs(os.path.dirname(config.EVAL_JSONL) or ".", exist_ok=True)
+    with open(config.EVAL_JSONL, "a", encoding="utf-8") as f:
+        record = {"pdf_path": job["pdf_path"], "metadata_path": job["metadata_path"], **evaluation}
+        f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    return evaluation
+
+
+async def drain_evaluations() -> None:
+    """Waits for the background evaluations (call before the event loop ends)."""
+    if config.EVAL_BACKGROUND:
+        queue = get_evaluation_queue()
+        await queue.drain()
+        queue.print_summary()
 
-    except Exception as e:
-        print(f"\n❌ ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return f"Error: {str(e)}"
+
+async def run_process_diagram_workflow(
+    pdf_path: str,
+    user_query: str = None,
+    priority: str = "interactive",
+    session_id: str = None
+):
+    """Runs the workflow (see run_workflow) and returns the final response text."""
+    result = await run_workflow(pdf_path, user_query, priority=priority, session_id=session_id)
+    return result["response"]
+
+
+def resumable_runs():
+    """Checkpointed runs that crashed ('running') or wait for approval ('paused')."""
+    from app.app_utils.checkpoints import get_checkpoint_store
+
+    store = get_checkpoint_store()
+    return store.list_runs(["running", "paused"]) if store else []
+
+
+async def resume_workflow(
+    session_id: str,
+    priority: str = "interactive",
+    state_updates: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Restarts a crashed or paused run from its last checkpoint (first unfinished stage).
+
+    Args:
+        session_id: Session of the run to resume
+        priority: Scheduler priority class of the model calls
+        state_updates: Applied to the checkpointed state first (e.g. an approval decision)
+
+    Returns:
+        Result dict of run_workflow()
+
+    Raises:
+        ValueError: Checkpoints are off, or the session has no resumable checkpoint
+    """
+    from app.app_utils.checkpoints import get_checkpoint_store
+
+    store = get_checkpoint_store()
+    checkpoint = store.load(session_id) if store else None
+    if not checkpoint or checkpoint["status"] == "completed":
+        raise ValueError(f"No resumable checkpoint for session '{session_id}'")
+
+    print(f"♻️ Resuming {session_id} at stage {checkpoint['stage']} ({checkpoint['status']})")
+    checkpoint["state"].update(state_updates or {})
+    return await run_workflow(
+        checkpoint["pdf_path"],
+        priority=priority,
+        session_id=session_id,
+        user_id=checkpoint["user_id"],
+        checkpoint=checkpoint
+    )
 
 # =============================================================================
 # Main Entry Point
@@ -244,7 +641,22 @@ async def run_process_diagram_workflow(pdf_path: str, user_query: str = None):
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python -m app.agent <path/to/pdf>")
+        print("       python -m app.agent --resume [session_id]")
         sys.exit(1)
-    
-    result_msg = asyncio.run(run_process_diagram_workflow(sys.argv[1]))
-    print(f"\n🤖 AGENT RESPONSE:\n{result_msg}")
\ No newline at end of file
+
+    if sys.argv[1] == "--resume" and len(sys.argv) < 3:
+        runs = resumable_runs()
+        print(f"♻️ {len(runs)} resumable run(s):")
+        for run in runs:
+            print(f"   {run['session_id']:<40} {run['status']:<8} at {run['stage']:<24} {run['pdf_path']}")
+        sys.exit(0)
+
+    async def main():
+        if sys.argv[1] == "--resume":
+            result_msg = (await resume_workflow(sys.argv[2]))["response"]
+        else:
+            result_msg = await run_process_diagram_workflow(sys.argv[1])
+        print(f"\n🤖 AGENT RESPONSE:\n{result_msg}")
+        await drain_evaluations()  # The diagram is out; finish the evaluation before exiting
+
+    asyncio.run(main())
\ No newline at end of file
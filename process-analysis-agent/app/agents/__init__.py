@@ -1,21 +1,32 @@
-from .pdf_text_extraction_agent import create_pdf_text_extraction_agent
-from .pdf_analysis_agent import create_pdf_analysis_agent
-from .conversion_agent import create_conversion_agent
-from .quality_agent import create_quality_agent
-from .bpmn_generation_agent import create_bpmn_generation_agent
-from .validation_agent import create_validation_agent
-from .system_evaluator_agent import create_system_evaluator_agent
-from .publication_agent import create_publication_agent
-from .approval_agent import create_approval_agent  
+# Factories are imported on first access (PEP 562), so importing one agent
+# module does not load all of them (and their pydantic schemas/ADK imports).
+import importlib
 
-__all__ = [
-    "create_pdf_text_extraction_agent",
-    "create_pdf_analysis_agent",
-    "create_conversion_agent",
-    "create_quality_agent",
-    "create_bpmn_generation_agent",
-    "create_validation_agent",
-    "create_system_evaluator_agent",
-    "create_publication_agent",
-    "create_approval_agent"  
-]
\ No newline at end of file
+_FACTORIES = {
+    "create_pdf_text_extraction_agent": ".pdf_text_extraction_agent",
+    "create_pdf_extraction_stage": ".pdf_extraction_stage",
+    "create_text_preprocessing_stage": ".text_preprocessing_stage",
+    "create_pdf_analysis_agent": ".pdf_analysis_agent",
+    "create_chunked_pdf_analysis_agent": ".chunked_analysis_agent",
+    "create_conversion_agent": ".conversion_agent",
+    "create_best_of_n_conversion_agent": ".best_of_n_conversion_agent",
+    "create_quality_agent": ".quality_agent",
+    "create_quality_loop_controller": ".quality_loop_controller",
+    "create_bpmn_generation_agent": ".bpmn_generation_agent",
+    "create_mermaid_compiler_stage": ".mermaid_compiler_stage",
+    "create_validation_agent": ".validation_agent",
+    "create_mermaid_validation_stage": ".mermaid_validation_stage",
+    "create_system_evaluator_agent": ".system_evaluator_agent",
+    "create_publication_agent": ".publication_agent",
+    "create_approval_agent": ".approval_agent"
+}
+
+__all__ = list(_FACTORIES)
+
+
+def __getattr__(name):
+    if name in _FACTORIES:
+        value = getattr(importlib.import_module(_FACTORIES[name], __name__), name)
+        globals()[name] = value  # Cache: later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,7 +8,12 @@ from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 from google.genai import types
 from app import config
-from app.tools.approval_tool import request_publication_approval
+from app.app_utils.context_builder import history_mode, scoped_instruction
+from app.tools.approval_tool import request_publication_approval, resolve_approval_without_llm
+
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ("approval_status",)
+
 
 def create_approval_agent() -> LlmAgent:
     """
@@ -20,7 +25,7 @@ def create_approval_agent() -> LlmAgent:
     agent = LlmAgent(
         name="ApprovalAgent",
         model=config.MODEL_FLASH_THINKING,
-        instruction=(
+        instruction=scoped_instruction(
             "You are the Quality Gatekeeper.\n\n"
             "CURRENT STATUS: {approval_status?}\n\n"
             "LOGIC:\n"
@@ -34,10 +39,13 @@ def create_approval_agent() -> LlmAgent:
             "   - Call 'request_publication_approval' tool.\n"
             "   - If tool returns 'waiting_for_user': Output 'Waiting for user approval...'\n"
             "   - If tool returns 'approved': Output 'Approval confirmed.'\n"
-            "   - If tool returns 'rejected': Output 'Approval denied.'"
+            "   - If tool returns 'rejected': Output 'Approval denied.'",
+            CONTEXT_KEYS
         ),
+        include_contents=history_mode(),
         description="Triggers approval workflow only if not already approved.",
         tools=[approval_tool],
+        before_agent_callback=resolve_approval_without_llm,  # No LLM if already decided
         generate_content_config=types.GenerateContentConfig(
             temperature=0.0
         )
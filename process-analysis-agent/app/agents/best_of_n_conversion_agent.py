@@ -0,0 +1,188 @@
+"""
+agents/best_of_n_conversion_agent.py
+Agent 2+3 (parallel): Best-of-N Conversion Agent
+Generates N conversion candidates concurrently and picks the best one.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncGenerator, Dict, List
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing_extensions import override
+
+from app import config
+from app.agents.conversion_agent import ConversionOutput, create_conversion_candidate_agent
+from app.agents.quality_agent import SCORE_FIELDS, BatchQualityOutput, create_batch_quality_agent
+from app.tools.revision_store import skip_if_graph_unchanged
+from app.tools.structure_checker import check_process_structure, structure_score
+
+
+def candidate_temperatures(num_candidates: int) -> List[float]:
+    """Spreads the candidate temperatures evenly over config.CONVERSION_TEMPERATURE_RANGE."""
+    low, high = config.CONVERSION_TEMPERATURE_RANGE
+    if num_candidates <= 1:
+        return [low]
+    step = (high - low) / (num_candidates - 1)
+    return [round(low + i * step, 2) for i in range(num_candidates)]
+
+
+class BestOfNConversionAgent(BaseAgent):
+    """
+    Alternative to the sequential QualityLoopAgent (config.CONVERSION_MODE = "best_of_n").
+
+    1. Runs config.CONVERSION_CANDIDATES ConversionCandidate agents concurrently
+       (different temperature/seed, each with its own output_key).
+       A candidate that fails (invalid graph, API error) is dropped; the stage
+       only fails if none produced a graph.
+    2. Checks every candidate locally (check_process_structure).
+    3. Scores the candidates that pass with ONE BatchQualityAgent call
+       (skipped if fewer than two pass).
+    4. Writes the winner to 'conversion_output' (and its verdict to
+       'quality_output'); details in 'conversion_candidates_report'.
+    """
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        start = time.perf_counter()
+        temperatures = candidate_temperatures(config.CONVERSION_CANDIDATES)
+        candidate_agents = [
+            create_conversion_candidate_agent(i, t) for i, t in enumerate(temperatures)
+        ]
+        print(f"[{self.name}] 🔀 Generating {len(candidate_agents)} candidates (temperatures {temperatures})")
+
+        async def generate(agent) -> List[Event]:
+            candidate_ctx = ctx.model_copy(update={"branch": f"{ctx.branch or self.name}.{agent.name}"})
+            events = []
+            try:
+                async for event in agent.run_async(candidate_ctx):
+                    events.append(event)
+            except Exception as e:
+                # Invalid graph, API error after retries, open circuit, ...: only
+                # this candidate is lost, the others are still judged
+                print(f"[{self.name}] ⚠️ {agent.name} returned no valid graph: {type(e).__name__}: {e}")
+            return events
+
+        # Collected per candidate and yielded afterwards, so each candidate's
+        # output_key lands in the session state
+        for events in await asyncio.gather(*(generate(a) for a in candidate_agents)):
+            for event in events:
+                yield event
+
+        state = ctx.session.state
+        candidates: Dict[int, Dict[str, Any]] = {}
+        rows: List[Dict[str, Any]] = []
+        for index, agent in enumerate(candidate_agents):
+            number = index + 1
+            raw = state.get(agent.output_key)
+            if not raw:
+                continue
+            graph = ConversionOutput.model_validate(raw).model_dump()
+            check = check_process_structure(graph, state.get("pdf_analysis"))
+            candidates[number] = graph
+            rows.append({
+                "candidate": number,
+                "temperature": temperatures[index],
+                "passed": check["passed"],
+                "issues": len(check["issues"]),
+                "warnings": len(check["warnings"]),
+                "local_score": structure_score(check),
+                "judge_score": None,
+            })
+
+        if not rows:
+            raise RuntimeError(f"{self.name}: all {len(candidate_agents)} conversion candidates failed")
+
+        # One batched judge call for all structurally sound candidates
+        passed = {r["candidate"]: candidates[r["candidate"]] for r in rows if r["passed"]}
+        evaluations = {}
+        best_by_judge = None
+        if len(passed) >= 2:
+            judge = create_batch_quality_agent(passed)
+            async for event in judge.run_async(ctx):
+                yield event
+            raw = ctx.session.state.get(judge.output_key)
+            if raw:
+                verdict = BatchQualityOutput.model_validate(raw)
+                evaluations = {e.candidate: e for e in verdict.evaluations if e.candidate in passed}
+                best_by_judge = verdict.best_candidate
+        for row in rows:
+            evaluation = evaluations.get(row["candidate"])
+            if evaluation:
+                row["judge_score"] = round(min(getattr(evaluation, f) for f in SCORE_FIELDS), 3)
+
+        winner = max(
+            rows,
+            key=lambda r: (
+                r["passed"],
+                r["judge_score"] if r["judge_score"] is not None else -1.0,
+                r["candidate"] == best_by_judge,
+                r["local_score"],
+                -r["candidate"],
+            ),
+        )
+        number = winner["candidate"]
+
+        state_delta: Dict[str, Any] = {
+            "conversion_output": candidates[number],
+            "conversion_candidates_report": {
+                "candidates": rows,
+                "winner": number,
+                "judge_called": bool(evaluations),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+            },
+        }
+        if number in evaluations:
+            evaluation = evaluations[number]
+            state_delta["quality_output"] = {
+                "reasoning": evaluation.feedback,
+                **{f: getattr(evaluation, f) for f in SCORE_FIELDS},
+                "feedback": evaluation.feedback,
+                "approved": winner["judge_score"] >= config.MIN_QUALITY_SCORE,
+                "exit_loop": True,
+            }
+
+        score = winner["judge_score"] if winner["judge_score"] is not None else winner["local_score"]
+        message = (
+            f"Selected candidate {number}/{len(candidate_agents)} "
+            f"({'judge' if winner['judge_score'] is not None else 'local'} score {score:.2f}, "
+            f"{len(passed)} passed the structural checks)."
+        )
+        print(f"[{self.name}] 🏆 {message}")
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=message)]),
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+def create_best_of_n_conversion_agent() -> BestOfNConversionAgent:
+    """
+    Creates the Best-of-N Conversion Agent.
+
+    Replaces the QualityLoopAgent (ConversionAgent + QualityAgent rounds) by
+    one parallel round of candidates and one batched judge call.
+
+    Returns:
+        BestOfNConversionAgent (custom BaseAgent)
+    """
+
+    agent = BestOfNConversionAgent(
+        name="BestOfNConversionAgent",
+        description=(
+            "Generates several process graph candidates concurrently, scores them "
+            "locally and with one batched judge call, and keeps the best."
+        ),
+        before_agent_callback=skip_if_graph_unchanged,  # Incremental re-analysis
+    )
+
+    print(f"✅ {agent.name} created ({config.CONVERSION_CANDIDATES} candidates)")
+    return agent
@@ -8,7 +8,13 @@ from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 from google.genai import types
 from app import config
+from app.app_utils.context_builder import history_mode, scoped_instruction
 from app.tools import render_mermaid_to_svg
+from app.tools.revision_store import reuse_mermaid_if_graph_unchanged
+
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ("conversion_output",)
+
 
 def create_bpmn_generation_agent() -> LlmAgent:
     """
@@ -28,7 +34,7 @@ def create_bpmn_generation_agent() -> LlmAgent:
     agent = LlmAgent(
         name="BPMNGenerationAgent",
         model=config.MODEL_FLASH_THINKING,
-        instruction=(
+        instruction=scoped_instruction(
             "You are an expert Mermaid.js developer specializing in business process diagrams. "
             "Your task is to generate valid Mermaid 'flowchart TD' code based on the provided process structure.\n\n"
             "STRICT RULES FOR ROBUST SYNTAX:\n"
@@ -37,8 +43,10 @@ def create_bpmn_generation_agent() -> LlmAgent:
             "3. Use distinct IDs (e.g., Start, Decision1, End_Approved).\n"
             "4. For End Events, use the syntax: id([\"Label\"])\n"
             "5. For Decisions, use the syntax: id{{\"Question?\"}}\n"
-            "6. Return ONLY the raw Mermaid code. No markdown blocks (```mermaid), no explanations."
+            "6. Return ONLY the raw Mermaid code. No markdown blocks (```mermaid), no explanations.",
+            CONTEXT_KEYS
         ),
+        include_contents=history_mode(),
         description=(
             "Generates clean Mermaid flowchart syntax from process structures. "
             "Specializes in business process diagram notation."
@@ -49,7 +57,9 @@ def create_bpmn_generation_agent() -> LlmAgent:
         output_key="current_mermaid_code",
         generate_content_config=types.GenerateContentConfig(
             temperature=0.1,  # Very low for precise syntax
-        )
+        ),
+        # Incremental re-analysis: reuse the approved Mermaid code of an unchanged graph
+        before_agent_callback=reuse_mermaid_if_graph_unchanged
     )
     
     print(f"✅ {agent.name} created (with render tool)")
@@ -0,0 +1,214 @@
+"""
+agents/chunked_analysis_agent.py
+Agent 1 (map-reduce): Chunked PDF Analysis Agent
+Analyzes long documents chunk by chunk (concurrently) and merges the graphs.
+"""
+
+import asyncio
+from typing import AsyncGenerator, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing_extensions import override
+
+from app import config
+from app.agents.pdf_analysis_agent import (
+    PdfAnalysisOutput,
+    create_pdf_analysis_agent,
+    create_pdf_analysis_chunk_agent,
+)
+from app.tools import analysis_merger, revision_store, text_chunker
+
+# Attempts per chunk: a malformed answer is retried once before the stage fails
+CHUNK_ATTEMPTS = 2
+
+
+def _final_text(event: Event) -> str:
+    """Concatenates the non-thought text parts of an event."""
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(p.text or "" for p in event.content.parts if not p.thought)
+
+
+class ChunkedPDFAnalysisAgent(BaseAgent):
+    """
+    Runs the PDF analysis as map-reduce for long documents.
+
+    - Short text (one chunk): delegates to the regular PDFAnalysisAgent.
+    - Long text: splits on page markers/headings, analyses the chunks with at
+      most config.ANALYSIS_MAX_CONCURRENCY parallel model calls and merges the
+      per-chunk graphs with analysis_merger.merge_analysis_outputs. A chunk
+      that returns invalid JSON is analysed once more; if it fails again the
+      stage fails (a graph missing a section is never passed on).
+
+    With config.INCREMENTAL_ANALYSIS, per-chunk results of the previous run of
+    the same document are reused for unchanged chunks (see revision_store),
+    and 'graph_unchanged' tells later agents whether they can be skipped.
+
+    The merged result is written to 'pdf_analysis' and emitted as JSON text,
+    exactly like the single-pass agent's output.
+    """
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        text = ctx.session.state.get("extracted_pdf_text", "")
+        if config.ANALYSIS_CHUNKING:
+            chunks = text_chunker.split_into_chunks(text, config.ANALYSIS_CHUNK_CHARS)
+        else:
+            chunks = [text]
+
+        # Chunk keys: mode (single-pass and chunk prompts differ) + prompt/schema/
+        # model fingerprint + content hash
+        mode = "single" if len(chunks) <= 1 else "chunk"
+        version = revision_store.analysis_version()
+        chunk_keys = [f"{mode}-{version}-{text_chunker.content_hash(c)}" for c in chunks]
+
+        doc_key = revision_store.document_key(ctx.session.state.get("pdf_path", ""))
+        previous = revision_store.load_revision(doc_key) if config.INCREMENTAL_ANALYSIS else {}
+        stored = previous.get("chunk_analyses", {})
+
+        outputs: List[Optional[PdfAnalysisOutput]] = [
+            PdfAnalysisOutput.model_validate(stored[key]) if key in stored else None
+            for key in chunk_keys
+        ]
+        missing = [i for i, output in enumerate(outputs) if output is None]
+        reused = len(chunks) - len(missing)
+        if reused:
+            print(f"[{self.name}] ♻️ Reusing {reused}/{len(chunks)} unchanged chunk analyses")
+
+        emitted_by_single_pass = False
+        if len(chunks) <= 1 and missing:
+            async for event in self.sub_agents[0].run_async(ctx):
+                yield event
+            raw = ctx.session.state.get("pdf_analysis")
+            if not raw:
+                return  # Analysis failed - nothing to merge or record
+            outputs[0] = PdfAnalysisOutput.model_validate(raw)
+            emitted_by_single_pass = True
+
+        elif missing:
+            print(
+                f"[{self.name}] ✂️ {len(text)} characters -> {len(chunks)} chunks, "
+                f"analysing {len(missing)} (max {config.ANALYSIS_MAX_CONCURRENCY} concurrent)"
+            )
+
+            semaphore = asyncio.Semaphore(config.ANALYSIS_MAX_CONCURRENCY)
+
+            async def analyze(index: int) -> Optional[PdfAnalysisOutput]:
+                for attempt in range(1, CHUNK_ATTEMPTS + 1):
+                    async with semaphore:
+                        chunk_agent = create_pdf_analysis_chunk_agent(
+                            index, len(chunks), chunks[index], retry=attempt > 1
+                        )
+                        chunk_ctx = ctx.model_copy(
+                            update={"branch": f"{ctx.branch or self.name}.{chunk_agent.name}"}
+                        )
+                        raw = ""
+                        async for event in chunk_agent.run_async(chunk_ctx):
+                            if event.is_final_response() and _final_text(event):
+                                raw = _final_text(event)
+                    try:
+                        return PdfAnalysisOutput.model_validate_json(raw)
+                    except ValueError as e:
+                        retry = " - retrying" if attempt < CHUNK_ATTEMPTS else ""
+                        print(f"[{self.name}] ⚠️ Chunk {index + 1} returned invalid JSON{retry}: {e}")
+                return None
+
+            results = await asyncio.gather(*(analyze(i) for i in missing))
+            for index, result in zip(missing, results):
+                outputs[index] = result
+
+        failed = [i + 1 for i, output in enumerate(outputs) if output is None]
+        if failed:
+            # A merged graph without these sections would be judged and published as complete
+            raise RuntimeError(
+                f"{self.name}: analysis of chunk(s) {', '.join(map(str, failed))} of {len(chunks)} failed"
+            )
+
+        if len(chunks) <= 1:
+            merged = outputs[0]
+        else:
+            merged = analysis_merger.merge_analysis_outputs(outputs)
+            print(
+                f"[{self.name}] 🔗 Merged {len(chunks)} chunks: "
+                f"{len(merged.actors)} actors, {len(merged.steps)} steps, "
+                f"{len(merged.dependencies)} dependencies"
+            )
+
+        merged_dict = merged.model_dump(by_alias=True)
+        # Includes the downstream pipeline: a changed conversion prompt/model
+        # must not replay the stored diagram
+        analysis_hash = revision_store.graph_hash(
+            {"analysis": merged_dict, "pipeline": revision_store.pipeline_version()}
+        )
+        graph_unchanged = bool(
+            previous.get("mermaid_code")
+            and previous.get("mermaid_analysis_hash") == analysis_hash
+        )
+
+        state_delta = {
+            "pdf_analysis": merged_dict,
+            "document_key": doc_key,
+            "analysis_hash": analysis_hash,
+            "graph_unchanged": graph_unchanged,
+            "analysis_chunks": {"total": len(chunks), "reused": reused},
+        }
+        if graph_unchanged:
+            print(f"[{self.name}] ✅ Process graph unchanged since the last revision")
+            state_delta["current_mermaid_code"] = previous["mermaid_code"]
+            if previous.get("conversion_output"):
+                state_delta["conversion_output"] = previous["conversion_output"]
+
+        if config.INCREMENTAL_ANALYSIS:
+            revision_store.save_revision(doc_key, {
+                "chunk_analyses": {
+                    key: output.model_dump(by_alias=True)
+                    for key, output in zip(chunk_keys, outputs)
+                },
+                "analysis_hash": analysis_hash,
+                "mermaid_code": previous.get("mermaid_code"),
+                "conversion_output": previous.get("conversion_output"),
+                "mermaid_analysis_hash": previous.get("mermaid_analysis_hash"),
+            })
+
+        content = None
+        if not emitted_by_single_pass:
+            content = types.Content(
+                role="model",
+                parts=[types.Part(text=merged.model_dump_json(by_alias=True))],
+            )
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=content,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+def create_chunked_pdf_analysis_agent() -> ChunkedPDFAnalysisAgent:
+    """
+    Creates the Chunked PDF Analysis Agent (map-reduce over long documents).
+
+    Returns:
+        ChunkedPDFAnalysisAgent wrapping the regular PDFAnalysisAgent
+    """
+
+    agent = ChunkedPDFAnalysisAgent(
+        name="ChunkedPDFAnalysisAgent",
+        description=(
+            "Analyzes long process documents chunk by chunk in parallel and "
+            "merges the per-chunk process graphs."
+        ),
+        sub_agents=[create_pdf_analysis_agent()],
+    )
+
+    print(
+        f"✅ {agent.name} created (chunk size: {config.ANALYSIS_CHUNK_CHARS} chars, "
+        f"concurrency: {config.ANALYSIS_MAX_CONCURRENCY})"
+    )
+    return agent
@@ -3,11 +3,26 @@ agents/conversion_agent.py
 Agent 2: Conversion Agent
 Transforms extracted process elements into a POWL-like structure (Nodes + Edges).
 """
+import json
 from typing import List, Optional
 from google.adk.agents import LlmAgent
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.utils.instructions_utils import inject_session_state
 from google.genai import types
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from app import config
+from app.app_utils.context_builder import (
+    history_mode, record_scoped_prompt, scoped_instruction, serialize_state_value
+)
+from app.tools.graph_patch import apply_quality_edits
+
+# Node types the graph stages understand (graph edits, structure checks,
+# Mermaid shapes, compact output); 'decision' is the analysis' name for an
+# exclusive gateway and is accepted as such
+NODE_TYPES = (
+    "start_event", "end_event", "task", "subprocess",
+    "exclusive_gateway", "parallel_gateway", "inclusive_gateway", "decision",
+)
 
 # Pydantic Models for structured output
 class Node(BaseModel):
@@ -17,6 +32,9 @@ class Node(BaseModel):
     actor: Optional[str] = Field(None, description="The actor associated with the node.")
 
 class Edge(BaseModel):
+    # output_key stores model_dump() ('from_'); allow both names when re-validating
+    model_config = ConfigDict(populate_by_name=True)
+
     from_: str = Field(..., alias="from", description="The ID of the source node.")
     to: str = Field(..., description="The ID of the target node.")
     label: Optional[str] = Field(None, description="Label for the edge, representing a condition.")
@@ -25,6 +43,44 @@ class ConversionOutput(BaseModel):
     nodes: List[Node] = Field(..., description="List of all nodes in the process graph.")
     edges: List[Edge] = Field(..., description="List of all edges connecting the nodes.")
 
+# Session-state keys this agent consumes (see app_utils/context_builder.py):
+# the analysis, plus - from the 2nd loop iteration on - its previous graph and
+# the feedback of the structural pre-gate / QualityAgent
+CONTEXT_KEYS = ("pdf_analysis", "conversion_output", "structure_check", "quality_output")
+
+# Delta refinement (config.QUALITY_DELTA_FEEDBACK): only these keys, once the
+# judge's edits were applied and issues remain ('graph_refinement')
+REFINEMENT_KEYS = ("conversion_output", "graph_refinement")
+
+REFINEMENT_RULES = (
+    "\n\nREFINEMENT: 'conversion_output' is your previous graph with the quality "
+    "judge's edits already applied. Fix ONLY the issues in 'graph_refinement', "
+    "keep all other nodes, ids and edges unchanged, and return the complete graph."
+)
+
+
+def conversion_instruction():
+    """
+    The ConversionAgent's instruction: the scoped one, or - during a delta
+    refinement - the patched graph and the open issues only.
+    """
+    full = scoped_instruction(config.SYSTEM_PROMPT_CONVERSION, CONTEXT_KEYS)
+    if not config.QUALITY_DELTA_FEEDBACK:
+        return full
+
+    async def provider(context: ReadonlyContext) -> str:
+        if not context.state.get("graph_refinement"):
+            if callable(full):
+                return await full(context)
+            return await inject_session_state(full, context)
+        refined = config.SYSTEM_PROMPT_CONVERSION + REFINEMENT_RULES + "\n\nCONTEXT (session state):\n" + "\n\n".join(
+            f"[{key}]\n{serialize_state_value(context.state.get(key))}" for key in REFINEMENT_KEYS
+        )
+        record_scoped_prompt(context, refined, config.SYSTEM_PROMPT_CONVERSION)
+        return refined
+
+    return provider
+
 
 def create_conversion_agent() -> LlmAgent:
     """
@@ -39,7 +95,8 @@ def create_conversion_agent() -> LlmAgent:
     agent = LlmAgent(
         name="ConversionAgent",
         model=config.MODEL_FLASH_THINKING,
-        instruction=config.SYSTEM_PROMPT_CONVERSION,
+        instruction=conversion_instruction(),
+        include_contents=history_mode(),
         description=(
             "Converts extracted process elements into a POWL-like "
             "graph structure with nodes and edges. Filters out "
@@ -47,11 +104,55 @@ def create_conversion_agent() -> LlmAgent:
         ),
         tools=[],
         output_schema=ConversionOutput,
+        output_key="conversion_output",  # Latest graph, compiled by MermaidCompilerStage
         generate_content_config=types.GenerateContentConfig(
             temperature=0.3,
             response_mime_type="application/json"
-        )
+        ),
+        # Delta refinement: applies the judge's edits locally (may skip the LLM)
+        before_agent_callback=apply_quality_edits
     )
     
-    print(f"✅ {agent.name} created")
-    return agent
\ No newline at end of file
+    print(f"✅ {agent.name} created" + (" (delta refinement)" if config.QUALITY_DELTA_FEEDBACK else ""))
+    return agent
+
+
+def create_conversion_candidate_agent(candidate_index: int, temperature: float) -> LlmAgent:
+    """
+    Creates one ConversionAgent variant for the best-of-N conversion.
+    
+    Candidates differ in temperature and seed and write to their own state
+    key 'conversion_candidate_<n>', so concurrent runs never overwrite each
+    other (or 'conversion_output'). The analysis is passed through an
+    instruction provider instead of the conversation history.
+    
+    Args:
+        candidate_index: 0-based candidate number (also used as seed)
+        temperature: Sampling temperature of this candidate
+        
+    Returns:
+        LlmAgent configured for one conversion candidate
+    """
+    
+    def instruction(context: ReadonlyContext) -> str:
+        analysis = context.state.get("pdf_analysis") or {}
+        return (
+            config.SYSTEM_PROMPT_CONVERSION
+            + "\n\nPROCESS ANALYSIS (JSON):\n"
+            + json.dumps(analysis, ensure_ascii=False)
+        )
+    
+    return LlmAgent(
+        name=f"ConversionCandidate_{candidate_index + 1}",
+        model=config.MODEL_FLASH_THINKING,
+        instruction=instruction,
+        description="Generates one candidate process graph for the best-of-N selection.",
+        include_contents="none",
+        output_schema=ConversionOutput,
+        output_key=f"conversion_candidate_{candidate_index + 1}",
+        generate_content_config=types.GenerateContentConfig(
+            temperature=temperature,
+            seed=candidate_index + 1,
+            response_mime_type="application/json"
+        )
+    )
@@ -0,0 +1,84 @@
+"""
+agents/mermaid_compiler_stage.py
+Agent 4 (deterministic): Mermaid Compiler Stage
+Compiles the ConversionOutput graph into Mermaid code - no LLM round-trip.
+"""
+
+import json
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing_extensions import override
+
+from app.tools.mermaid_generator import generate_mermaid_code
+from app.tools.revision_store import reuse_mermaid_if_graph_unchanged
+
+
+class MermaidCompilerStage(BaseAgent):
+    """
+    Non-LLM replacement for the BPMNGenerationAgent.
+
+    Reads the final graph of the quality loop from 'conversion_output' and
+    writes the compiled code to 'current_mermaid_code' - the same state key
+    the LLM-based agent used, so validation/approval/publication are unchanged.
+    """
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        graph = ctx.session.state.get("conversion_output")
+        if isinstance(graph, str):
+            try:
+                graph = json.loads(graph)
+            except json.JSONDecodeError:
+                graph = None
+
+        if not isinstance(graph, dict):
+            result = {"success": False, "error": "No 'conversion_output' found in session state."}
+        else:
+            result = generate_mermaid_code(graph)
+
+        if result["success"]:
+            mermaid_code = result["mermaid_code"]
+            text = mermaid_code
+        else:
+            mermaid_code = ""
+            text = f"❌ {result['error']}"
+            print(f"[{self.name}] {text}")
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta={"current_mermaid_code": mermaid_code}),
+        )
+
+
+def create_mermaid_compiler_stage() -> MermaidCompilerStage:
+    """
+    Creates the deterministic Mermaid Compiler Stage.
+
+    Drop-in replacement for the LLM-based BPMNGenerationAgent: same state
+    key, same revision store callbacks, no model call.
+
+    Returns:
+        MermaidCompilerStage (custom BaseAgent)
+    """
+
+    agent = MermaidCompilerStage(
+        name="MermaidCompilerStage",
+        description=(
+            "Compiles the process graph in 'conversion_output' into Mermaid "
+            "flowchart code and stores it as 'current_mermaid_code'."
+        ),
+        # Incremental re-analysis: reuse the approved Mermaid code of an unchanged graph
+        before_agent_callback=reuse_mermaid_if_graph_unchanged,
+    )
+
+    print(f"✅ {agent.name} created (deterministic, no LLM)")
+    return agent
@@ -0,0 +1,146 @@
+"""
+agents/mermaid_validation_stage.py
+Agent 5 (deterministic): Mermaid Validation Stage
+Calls 'validate_mermaid_syntax' directly; an LLM fix-up only runs on errors.
+"""
+
+import json
+import time
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing_extensions import override
+
+from app import config
+from app.tools.mermaid_validator import validate_mermaid_syntax
+
+
+def _strip_code_fence(code: str) -> str:
+    """Removes a ```mermaid ... ``` wrapper the fix-up model may add."""
+    code = (code or "").strip()
+    if code.startswith("```"):
+        code = code.split("\n", 1)[1] if "\n" in code else ""
+        code = code.rsplit("```", 1)[0]
+    return code.strip()
+
+
+def create_mermaid_fixup_agent() -> LlmAgent:
+    """
+    Creates the Mermaid Fix-up Agent (only invoked by the validation stage).
+
+    Gets the current code and the validator errors, returns corrected code
+    into 'current_mermaid_code'.
+    """
+
+    def instruction(context: ReadonlyContext) -> str:
+        result = context.state.get("validation_result") or {}
+        errors = "\n".join(f"- {e}" for e in result.get("errors", [])) or "- (none)"
+        warnings = "\n".join(f"- {w}" for w in result.get("warnings", [])) or "- (none)"
+        return (
+            "You are an expert Mermaid.js developer. The following 'flowchart TD' code "
+            "failed validation. Fix ONLY the reported problems and keep all nodes, "
+            "labels and edges otherwise unchanged.\n\n"
+            "RULES:\n"
+            "1. Every node referenced in an edge must be defined, e.g. id[\"Label\"].\n"
+            "2. Always wrap node labels in double quotes.\n"
+            "3. Return ONLY the raw Mermaid code. No markdown blocks, no explanations.\n\n"
+            f"ERRORS:\n{errors}\n\nWARNINGS:\n{warnings}\n\n"
+            f"MERMAID CODE:\n{context.state.get('current_mermaid_code', '')}"
+        )
+
+    return LlmAgent(
+        name="MermaidFixupAgent",
+        model=config.MODEL_FLASH_THINKING,
+        instruction=instruction,
+        description="Repairs Mermaid code that failed the syntax validation.",
+        include_contents="none",  # Code + errors are in the instruction
+        output_key="current_mermaid_code",
+        generate_content_config=types.GenerateContentConfig(
+            temperature=0.1,
+        )
+    )
+
+
+class MermaidValidationStage(BaseAgent):
+    """
+    Non-LLM replacement for the ValidationAgent.
+
+    Validates 'current_mermaid_code' and stores the ValidationOutput-shaped
+    result (plus validator stats and timing) in 'validation_result'. Only if
+    the validator reports errors, the MermaidFixupAgent sub-agent repairs
+    the code (up to MERMAID_FIX_MAX_ATTEMPTS times) and it is re-validated.
+    """
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        fixup_agent = self.sub_agents[0] if self.sub_agents else None
+        attempts = 0
+
+        while True:
+            start = time.perf_counter()
+            result = validate_mermaid_syntax(ctx.session.state.get("current_mermaid_code", ""))
+            result["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            result["fix_attempts"] = attempts
+
+            if not result["errors"] or not fixup_agent or attempts >= config.MERMAID_FIX_MAX_ATTEMPTS:
+                break
+
+            # Store the errors first - the fix-up instruction reads them from state
+            attempts += 1
+            print(f"[{self.name}] 🔧 {len(result['errors'])} error(s), LLM fix-up attempt {attempts}")
+            yield Event(
+                author=self.name,
+                invocation_id=ctx.invocation_id,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={"validation_result": result}),
+            )
+            async for event in fixup_agent.run_async(ctx):
+                yield event
+            code = ctx.session.state.get("current_mermaid_code", "")
+            if _strip_code_fence(code) != code:
+                yield Event(
+                    author=self.name,
+                    invocation_id=ctx.invocation_id,
+                    branch=ctx.branch,
+                    actions=EventActions(state_delta={"current_mermaid_code": _strip_code_fence(code)}),
+                )
+
+        print(f"[{self.name}] Status: {result['overall_status']} ({result['duration_ms']} ms)")
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(result, ensure_ascii=False))]),
+            actions=EventActions(state_delta={"validation_result": result}),
+        )
+
+
+def create_mermaid_validation_stage() -> MermaidValidationStage:
+    """
+    Creates the deterministic Mermaid Validation Stage.
+
+    Drop-in replacement for the LLM-based ValidationAgent. The fix-up agent
+    is only attached if MERMAID_FIX_MAX_ATTEMPTS > 0.
+
+    Returns:
+        MermaidValidationStage (custom BaseAgent)
+    """
+
+    agent = MermaidValidationStage(
+        name="MermaidValidationStage",
+        description=(
+            "Validates 'current_mermaid_code' locally and stores the result in "
+            "'validation_result'. Escalates to an LLM fix-up only on errors."
+        ),
+        sub_agents=[create_mermaid_fixup_agent()] if config.MERMAID_FIX_MAX_ATTEMPTS > 0 else [],
+    )
+
+    print(f"✅ {agent.name} created (deterministic, LLM fix-up on errors only)")
+    return agent
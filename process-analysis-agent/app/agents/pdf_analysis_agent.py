@@ -6,9 +6,11 @@ Analyzes extracted text to identify the process structure.
 
 from typing import List, Optional
 from google.adk.agents import LlmAgent
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.genai import types
-from pydantic import BaseModel, Field, conint
+from pydantic import BaseModel, ConfigDict, Field, conint
 from app import config
+from app.app_utils.context_builder import history_mode, scoped_instruction
 
 # Pydantic Models for structured output
 class Step(BaseModel):
@@ -19,6 +21,9 @@ class Step(BaseModel):
     condition: Optional[str] = Field(None, description="Condition for a decision step.")
 
 class Dependency(BaseModel):
+    # ADK's output_key stores model_dump() (field names), so accept both 'from' and 'from_'
+    model_config = ConfigDict(populate_by_name=True)
+
     from_: conint(ge=0) = Field(..., alias="from", description="The ID of the source step.")
     to: conint(ge=0) = Field(..., description="The ID of the target step.")
     label: Optional[str] = Field(None, description="Label for the dependency/arrow.")
@@ -28,6 +33,13 @@ class PdfAnalysisOutput(BaseModel):
     steps: List[Step] = Field(..., description="List of all process steps.")
     dependencies: List[Dependency] = Field(..., description="List of dependencies between steps.")
 
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ("extracted_pdf_text",)
+
+# Bump whenever the analysis instructions below change (invalidates the
+# chunk analyses stored for incremental re-analysis, see revision_store)
+PROMPT_VERSION = "1"
+
 
 def create_pdf_analysis_agent() -> LlmAgent:
     """
@@ -43,20 +55,70 @@ def create_pdf_analysis_agent() -> LlmAgent:
     agent = LlmAgent(
         name="PDFAnalysisAgent",
         model=config.MODEL_FLASH_THINKING,
-        instruction=(
+        instruction=scoped_instruction(
             "You are an expert in business process analysis. Your task is to extract "
-            "the core process flow from the provided text, which is available in "
-            "'session.state[\"extracted_pdf_text\"]'. Identify all actors, process steps, "
+            "the core process flow from the provided text. Identify all actors, process steps, "
             "decisions, and their dependencies. Your output must strictly adhere to "
-            "the PdfAnalysisOutput JSON schema."
+            "the PdfAnalysisOutput JSON schema.\n\n"
+            "EXTRACTED PDF TEXT:\n"
+            "{extracted_pdf_text}",
+            CONTEXT_KEYS
         ),
+        include_contents=history_mode(),
         description=(
             "Analyzes business process descriptions from pre-extracted PDF text. "
             "Identifies actors, steps, decisions, and dependencies to structure the process."
         ),
         tools=[],  # No tools needed, text is already in state
-        output_schema=PdfAnalysisOutput
+        output_schema=PdfAnalysisOutput,
+        output_key="pdf_analysis"
     )
     
     print(f"✅ {agent.name} created (Expects 'extracted_pdf_text' in state)")
-    return agent
\ No newline at end of file
+    return agent
+
+
+def create_pdf_analysis_chunk_agent(
+    chunk_index: int, num_chunks: int, chunk_text: str, retry: bool = False
+) -> LlmAgent:
+    """
+    Creates a single-use analysis agent for one chunk of a long document.
+    
+    Used by the ChunkedPDFAnalysisAgent (map step). The chunk text is passed
+    through an instruction provider, so braces in the PDF text are never
+    mistaken for state placeholders. No conversation history is included.
+    
+    Args:
+        chunk_index: 0-based position of the chunk in the document
+        num_chunks: Total number of chunks
+        chunk_text: The text of this chunk
+        retry: The previous answer for this chunk was malformed (adds a
+            reminder, so the model cache does not replay that answer)
+        
+    Returns:
+        LlmAgent configured for analysing one chunk
+    """
+    
+    def instruction(_: ReadonlyContext) -> str:
+        return (
+            "You are an expert in business process analysis. The following text is "
+            f"PART {chunk_index + 1} OF {num_chunks} of a longer process document. "
+            "Extract the process flow described in THIS PART ONLY: actors, process steps, "
+            "decisions, and their dependencies. Number the steps starting at 1.\n"
+            "Only create start_event/end_event steps if the text explicitly describes "
+            "the start or the end of the process - never for the beginning or end of this part.\n"
+            "Your output must strictly adhere to the PdfAnalysisOutput JSON schema.\n"
+            + ("Your previous answer for this part was not valid JSON - return only the JSON object.\n"
+               if retry else "")
+            + "\n"
+            f"TEXT (PART {chunk_index + 1}/{num_chunks}):\n{chunk_text}"
+        )
+    
+    return LlmAgent(
+        name=f"PDFAnalysisChunkAgent_{chunk_index + 1}",
+        model=config.MODEL_FLASH_THINKING,
+        instruction=instruction,
+        description="Analyzes one chunk of a long process document.",
+        include_contents="none",
+        output_schema=PdfAnalysisOutput
+    )
\ No newline at end of file
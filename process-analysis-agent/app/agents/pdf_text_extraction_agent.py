@@ -7,10 +7,15 @@ Extracts text from PDF documents using the 'parse_pdf' tool.
 from google.adk.agents import LlmAgent
 from google.genai import types
 from app import config
+from app.app_utils.context_builder import history_mode, scoped_instruction
 
 # Import custom tools
 from app.tools.pdf_parser import parse_pdf
 
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ("pdf_path",)
+
+
 def create_pdf_text_extraction_agent() -> LlmAgent:
     """
     Creates the PDF Text Extraction Agent.
@@ -25,7 +30,7 @@ def create_pdf_text_extraction_agent() -> LlmAgent:
     agent = LlmAgent(
         name="PDFTextExtractionAgent",
         model=config.MODEL_FLASH_THINKING,
-        instruction=(
+        instruction=scoped_instruction(
             "You are a helpful assistant specialized in extracting text from PDF documents. "
             "Your task is to use the 'parse_pdf' tool. "
             "The user will provide the file path in their message (e.g. 'The source PDF is located at...'). "
@@ -35,8 +40,10 @@ def create_pdf_text_extraction_agent() -> LlmAgent:
             "2. Call the 'parse_pdf' tool with this path.\n"
             "3. The tool will return the text. **Simply return this text as your final response.**\n"
             "4. Do NOT try to save the text to the session state yourself (no 'set_state' calls needed).\n"
-            "   The system automatically saves your output."
+            "   The system automatically saves your output.",
+            CONTEXT_KEYS
         ),
+        include_contents=history_mode(),
         description=(
             "Extracts text content from a PDF document using the 'parse_pdf' tool. "
             "Stores the extracted text in the session state for further processing."
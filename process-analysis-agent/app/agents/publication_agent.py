@@ -9,7 +9,14 @@ from google.adk.agents import LlmAgent
 from google.adk.tools import FunctionTool
 from google.genai import types
 from app import config
+from app.app_utils.context_builder import history_mode, scoped_instruction
 from app.tools import render_mermaid_to_svg, save_diagram, save_report
+from app.tools.filesystem_saver import publish_without_llm
+from app.tools.revision_store import record_mermaid_revision
+
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ("approval_status", "pdf_path", "current_mermaid_code", "pdf_analysis", "validation_result")
+
 
 def create_publication_agent() -> LlmAgent:
     """
@@ -23,7 +30,7 @@ def create_publication_agent() -> LlmAgent:
     agent = LlmAgent(
         name="PublicationAgent",
         model=config.MODEL_FLASH_THINKING,
-        instruction=(
+        instruction=scoped_instruction(
             "You are the Publication Manager. You perform the final save.\n\n"
             "SECURITY CHECK (CRITICAL):\n"
             "1. Check 'session.state[\"approval_status\"]'.\n"
@@ -36,10 +43,14 @@ def create_publication_agent() -> LlmAgent:
             "- Call 'render_mermaid_to_svg'.\n"
             "- Call 'save_diagram'.\n"
             "- Call 'save_report'.\n"
-            "- Return: 'Analysis complete. Report saved at [path].'"
+            "- Return: 'Analysis complete. Report saved at [path].'",
+            CONTEXT_KEYS
         ),
+        include_contents=history_mode(),
         description="Saves files ONLY if approval_status is APPROVED.",
         tools=[render_tool, save_diagram_tool, save_report_tool],
+        before_agent_callback=publish_without_llm,  # Deterministic save path (no LLM)
+        after_agent_callback=record_mermaid_revision,  # Approved diagram -> revision store
         generate_content_config=types.GenerateContentConfig(
             temperature=0.0, # Zero temp for strict logic
         )
@@ -3,12 +3,17 @@ agents/quality_agent.py
 Agent 3: Output Quality Agent
 Evaluate the quality of the generated Process Structure (in the LoopAgent)
 """
-from typing import List
+import json
+from typing import Any, Dict, List
 from google.adk.agents import LlmAgent
+from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.tools import FunctionTool
 from google.genai import types
 from pydantic import BaseModel, Field, conint, confloat
 from app import config
+from app.app_utils.context_builder import history_mode, scoped_instruction
+from app.tools.graph_patch import GraphEdit
+from app.tools.structure_checker import structural_pre_gate
 
 def exit_loop() -> dict:
     """
@@ -29,30 +34,106 @@ class QualityOutput(BaseModel):
     consistency_score: confloat(ge=0.0, le=1.0) = Field(..., description="Score for logical consistency of the flow.")
     feedback: str = Field(..., description="Specific, actionable feedback for improvement.")
     approved: bool = Field(..., description="True if all scores are >= 0.85, else False.")
+    exit_loop: bool = Field(..., description="True if loop should exit")
+
+class DeltaQualityOutput(QualityOutput):
+    """QualityOutput plus machine-readable fixes (config.QUALITY_DELTA_FEEDBACK)."""
+    edits: List[GraphEdit] = Field(default_factory=list, description="Graph edits that fix the problems found (node ids of the evaluated graph). Empty when approved.")
+    open_issues: List[str] = Field(default_factory=list, description="Problems that cannot be fixed with edits alone.")
+
+# Appended to the judge's instruction in delta mode
+DELTA_FEEDBACK_RULES = (
+    "\n\nDELTA FEEDBACK: If approved=false, express every fix as an entry in 'edits' "
+    "(they are applied to the evaluated graph automatically): "
+    "add_node (node_id, type, label, actor), remove_node (node_id; its neighbours are reconnected), "
+    "rename_node (node_id, label and/or type/actor), add_edge (from, to, label), "
+    "remove_edge (from, to), reroute_edge (from, to, new_from and/or new_to, label). "
+    "Use the node ids of the evaluated graph. Put only problems that edits cannot fix "
+    "into 'open_issues'. Keep 'reasoning' and 'feedback' to one or two sentences."
+)
+
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ("pdf_analysis", "conversion_output")
+
+# Score fields compared against config.MIN_QUALITY_SCORE by the loop controller
+SCORE_FIELDS = ("completeness_score", "clarity_score", "reduction_score", "consistency_score")
+
+class CandidateEvaluation(BaseModel):
+    candidate: conint(ge=1) = Field(..., description="Number of the evaluated candidate.")
+    completeness_score: confloat(ge=0.0, le=1.0) = Field(..., description="Score for completeness of the process.")
+    clarity_score: confloat(ge=0.0, le=1.0) = Field(..., description="Score for clarity and unambiguity.")
+    reduction_score: confloat(ge=0.0, le=1.0) = Field(..., description="Score for filtering out unnecessary details.")
+    consistency_score: confloat(ge=0.0, le=1.0) = Field(..., description="Score for logical consistency of the flow.")
+    feedback: str = Field(..., description="Short justification of the scores.")
+
+class BatchQualityOutput(BaseModel):
+    evaluations: List[CandidateEvaluation] = Field(..., description="One evaluation per candidate.")
+    best_candidate: conint(ge=1) = Field(..., description="Number of the best candidate.")
 
 
-    
 def create_quality_agent() -> LlmAgent:
-    class QualityOutput(BaseModel):
-        reasoning: str = Field(...)
-        completeness_score: confloat(ge=0.0, le=1.0) = Field(...)
-        clarity_score: confloat(ge=0.0, le=1.0) = Field(...)
-        reduction_score: confloat(ge=0.0, le=1.0) = Field(...)
-        consistency_score: confloat(ge=0.0, le=1.0) = Field(...)
-        feedback: str = Field(...)
-        approved: bool = Field(...)
-        exit_loop: bool = Field(..., description="True if loop should exit")
-    
     agent = LlmAgent(
         name="QualityAgent",
         model=config.MODEL_FLASH_THINKING,
-        instruction=config.SYSTEM_PROMPT_QUALITY + "\n\nSet 'exit_loop: true' when approved=true.",
+        instruction=scoped_instruction(
+            config.SYSTEM_PROMPT_QUALITY + "\n\nSet 'exit_loop: true' when approved=true."
+            + (DELTA_FEEDBACK_RULES if config.QUALITY_DELTA_FEEDBACK else ""),
+            CONTEXT_KEYS
+        ),
+        include_contents=history_mode(),
         # tools=[] entfernt!
-        output_schema=QualityOutput,
+        output_schema=DeltaQualityOutput if config.QUALITY_DELTA_FEEDBACK else QualityOutput,
+        output_key="quality_output",  # Parsed by the QualityLoopController
         generate_content_config=types.GenerateContentConfig(
             temperature=0.4,
             response_mime_type="application/json"
-        )
+        ),
+        # Local structure/coverage checks first; the LLM judge only runs if they pass
+        before_agent_callback=structural_pre_gate
     )
     return agent
 
+
+def create_batch_quality_agent(candidates: Dict[int, Dict[str, Any]]) -> LlmAgent:
+    """
+    Creates a single-use judge that scores several conversion candidates in one call.
+    
+    Used by the BestOfNConversionAgent instead of one QualityAgent call per
+    candidate.
+    
+    Args:
+        candidates: Candidate number (1-based) -> ConversionOutput as dict
+        
+    Returns:
+        LlmAgent configured for the batched evaluation
+    """
+    
+    def instruction(context: ReadonlyContext) -> str:
+        analysis = context.state.get("pdf_analysis") or {}
+        listed = "\n\n".join(
+            f"CANDIDATE {number}:\n{json.dumps(graph, ensure_ascii=False)}"
+            for number, graph in candidates.items()
+        )
+        return (
+            config.SYSTEM_PROMPT_QUALITY
+            + "\n\nYou get SEVERAL candidate structures for the same process elements. "
+            "Evaluate EACH candidate on the four dimensions (one entry in 'evaluations' "
+            "per candidate) and set 'best_candidate' to the number of the best one. "
+            "Your output must strictly adhere to the BatchQualityOutput JSON schema.\n\n"
+            f"ORIGINAL PROCESS ELEMENTS (JSON):\n{json.dumps(analysis, ensure_ascii=False)}\n\n"
+            f"{listed}"
+        )
+    
+    return LlmAgent(
+        name="BatchQualityAgent",
+        model=config.MODEL_FLASH_THINKING,
+        instruction=instruction,
+        description="Scores all conversion candidates in a single call.",
+        include_contents="none",
+        output_schema=BatchQualityOutput,
+        output_key="quality_batch_output",
+        generate_content_config=types.GenerateContentConfig(
+            temperature=0.2,
+            response_mime_type="application/json"
+        )
+    )
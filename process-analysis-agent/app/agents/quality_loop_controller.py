@@ -0,0 +1,159 @@
+"""
+agents/quality_loop_controller.py
+Agent 3.5 (deterministic): Quality Loop Controller
+Ends the QualityLoopAgent as soon as the graph is good enough or stops improving.
+"""
+
+from typing import Any, AsyncGenerator, Dict, List
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from pydantic import ValidationError
+from typing_extensions import override
+
+from app import config
+from app.agents.quality_agent import SCORE_FIELDS, QualityOutput
+
+
+class QualityLoopController(BaseAgent):
+    """
+    Last sub-agent of the QualityLoopAgent.
+
+    Parses the QualityAgent verdict from 'quality_output' and escalates (which
+    terminates the LoopAgent) when
+    - all scores reach config.MIN_QUALITY_SCORE, or
+    - the score improved by less than config.QUALITY_MIN_IMPROVEMENT since
+      the previous judged iteration (plateau / regression).
+
+    The best judged graph is kept: on a regression 'conversion_output' is
+    restored to it. The loop state lives in 'quality_loop' and a summary with
+    the saved iterations/tokens in 'quality_loop_report'.
+    """
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        loop = dict(state.get("quality_loop") or {})
+        if loop.get("invocation_id") != ctx.invocation_id:
+            loop = {"invocation_id": ctx.invocation_id, "iterations": 0, "history": [], "best": None}
+        loop["iterations"] += 1
+        iteration = loop["iterations"]
+        history: List[Dict[str, Any]] = list(loop["history"])
+        state_delta: Dict[str, Any] = {}
+
+        verdict = None
+        if state.get("quality_output"):
+            try:
+                verdict = QualityOutput.model_validate(state["quality_output"])
+            except ValidationError as e:
+                print(f"[{self.name}] ⚠️ Unreadable quality output: {e.errors()[0]['msg']}")
+
+        stop_reason = None
+        score = None
+        if verdict is None:
+            # Structural pre-gate failed (or no parsable verdict): keep iterating
+            message = f"Iteration {iteration}: no quality score (structural checks failed), continuing."
+        else:
+            score = min(getattr(verdict, f) for f in SCORE_FIELDS)
+            judged = [h for h in history if h["score"] is not None]
+            previous = judged[-1]["score"] if judged else None
+
+            best = loop["best"]
+            if best is None or score > best["score"]:
+                best = {"score": score, "iteration": iteration, "conversion_output": state.get("conversion_output")}
+                loop["best"] = best
+
+            if score >= config.MIN_QUALITY_SCORE:
+                stop_reason = "threshold"
+                message = f"Iteration {iteration}: score {score:.2f} >= {config.MIN_QUALITY_SCORE}, graph accepted."
+            elif previous is not None and score - previous < config.QUALITY_MIN_IMPROVEMENT:
+                stop_reason = "plateau"
+                message = (
+                    f"Iteration {iteration}: score {score:.2f} (previous {previous:.2f}) is not improving, "
+                    f"keeping the best graph (iteration {best['iteration']})."
+                )
+            else:
+                message = f"Iteration {iteration}: score {score:.2f} < {config.MIN_QUALITY_SCORE}, refining."
+
+            if stop_reason == "plateau" and best["iteration"] != iteration:
+                state_delta["conversion_output"] = best["conversion_output"]
+
+        history.append({"iteration": iteration, "score": None if score is None else round(score, 3)})
+        loop["history"] = history
+
+        if iteration >= config.MAX_QUALITY_ITERATIONS and not stop_reason:
+            stop_reason = "max_iterations"
+            best = loop["best"]
+            if best and best["iteration"] != iteration:
+                state_delta["conversion_output"] = best["conversion_output"]
+
+        print(f"[{self.name}] {message}")
+        if stop_reason:
+            state_delta["quality_loop_report"] = self._report(ctx, loop, stop_reason)
+        state_delta["quality_loop"] = loop
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=message)]),
+            # escalate terminates the LoopAgent
+            actions=EventActions(state_delta=state_delta, escalate=True if stop_reason else None),
+        )
+
+    def _report(self, ctx: InvocationContext, loop: Dict[str, Any], stop_reason: str) -> Dict[str, Any]:
+        """Iterations used/saved and the tokens saved (estimated from the iterations that ran)."""
+        loop_agents = {a.name for a in self.parent_agent.sub_agents} if self.parent_agent else set()
+        tokens_used = sum(
+            (e.usage_metadata.total_token_count or 0)
+            for e in ctx.session.events
+            if e.invocation_id == ctx.invocation_id and e.author in loop_agents and e.usage_metadata
+        )
+        iterations = loop["iterations"]
+        saved = max(0, config.MAX_QUALITY_ITERATIONS - iterations)
+        report = {
+            "stop_reason": stop_reason,
+            "iterations": iterations,
+            "max_iterations": config.MAX_QUALITY_ITERATIONS,
+            "iterations_saved": saved,
+            "tokens_used": tokens_used,
+            "tokens_saved_estimate": round(tokens_used / iterations * saved) if iterations else 0,
+            "best_score": loop["best"]["score"] if loop["best"] else None,
+            "best_iteration": loop["best"]["iteration"] if loop["best"] else None,
+            "scores": [h["score"] for h in loop["history"]],
+        }
+        patches = ctx.session.state.get("graph_patches") or []
+        if config.QUALITY_DELTA_FEEDBACK:
+            report["edits_applied"] = sum(p["applied"] for p in patches)
+            report["conversions_skipped"] = sum(1 for p in patches if p["llm_skipped"])
+        print(
+            f"[{self.name}] 🏁 Loop finished ({stop_reason}) after {iterations}/{config.MAX_QUALITY_ITERATIONS} "
+            f"iterations, saved {saved} iteration(s) / ~{report['tokens_saved_estimate']} tokens"
+        )
+        return report
+
+
+def create_quality_loop_controller() -> QualityLoopController:
+    """
+    Creates the deterministic Quality Loop Controller.
+
+    Must be the last sub-agent of the QualityLoopAgent (after the QualityAgent).
+
+    Returns:
+        QualityLoopController (custom BaseAgent)
+    """
+
+    agent = QualityLoopController(
+        name="QualityLoopController",
+        description=(
+            "Terminates the quality loop once all quality scores reach "
+            "MIN_QUALITY_SCORE or stop improving."
+        ),
+    )
+
+    print(f"✅ {agent.name} created (deterministic, no LLM)")
+    return agent
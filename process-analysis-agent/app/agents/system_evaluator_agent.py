@@ -8,6 +8,7 @@ from google.adk.agents import LlmAgent
 from google.genai import types
 from pydantic import BaseModel, Field, confloat
 from app import config
+from app.app_utils.context_builder import history_mode, scoped_instruction
 
 # Pydantic Model for structured output
 class SystemEvaluationOutput(BaseModel):
@@ -22,6 +23,9 @@ class SystemEvaluationOutput(BaseModel):
     strengths: List[str] = Field(..., description="What the system did well.")
     weaknesses: List[str] = Field(..., description="What needs improvement.")
 
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ()
+
 
 def create_system_evaluator_agent() -> LlmAgent:
     """
@@ -43,14 +47,16 @@ def create_system_evaluator_agent() -> LlmAgent:
     agent = LlmAgent(
         name="SystemEvaluatorAgent",
         model=config.MODEL_PRO,
-        instruction=(
+        instruction=scoped_instruction(
             config.SYSTEM_PROMPT_SYSTEM_EVALUATOR + 
             "\n\nCRITICAL OUTPUT RULES:\n"
             "1. Return raw JSON only.\n"
             "2. Do NOT use Markdown code blocks (no ```json ... ```).\n"
             "3. Do NOT include any introductory text or explanations outside the JSON object.\n"
-            "4. Ensure all boolean values are lowercase (true/false) and nulls are null."
+            "4. Ensure all boolean values are lowercase (true/false) and nulls are null.",
+            CONTEXT_KEYS
         ),
+        include_contents=history_mode(),
         description=(
             "Evaluates the entire multi-agent system performance. "
             "Analyzes planning, tool use, context handling, collaboration, "
@@ -0,0 +1,71 @@
+"""
+agents/text_preprocessing_stage.py
+Agent 1.2 (deterministic): Text Preprocessing Stage
+Strips headers, footers, page numbers and hyphenation before the analysis.
+"""
+
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from typing_extensions import override
+
+from app.tools.text_preprocessor import preprocess_text
+
+
+class TextPreprocessingStage(BaseAgent):
+    """
+    Non-LLM stage between text extraction and analysis.
+
+    Replaces 'extracted_pdf_text' with the cleaned text (so every later agent
+    gets the smaller prompt) and stores the token estimates in
+    'preprocessing_stats'.
+    """
+
+    @override
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        text = ctx.session.state.get("extracted_pdf_text", "")
+        result = preprocess_text(text)
+        stats = result["stats"]
+
+        message = (
+            f"📉 Preprocessed text: ~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens "
+            f"(-{stats['token_reduction']:.0%}), removed {stats['removed_boilerplate_lines']} "
+            f"boilerplate and {stats['removed_page_number_lines']} page number lines."
+        )
+        print(f"[{self.name}] {message}")
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=message)]),
+            actions=EventActions(state_delta={
+                "extracted_pdf_text": result["text"],
+                "preprocessing_stats": stats,
+            }),
+        )
+
+
+def create_text_preprocessing_stage() -> TextPreprocessingStage:
+    """
+    Creates the deterministic Text Preprocessing Stage.
+
+    Returns:
+        TextPreprocessingStage (custom BaseAgent)
+    """
+
+    agent = TextPreprocessingStage(
+        name="TextPreprocessingStage",
+        description=(
+            "Removes repeated headers/footers, page numbers and hyphenation "
+            "from 'extracted_pdf_text' to shrink all later prompts."
+        ),
+    )
+
+    print(f"✅ {agent.name} created (deterministic, no LLM)")
+    return agent
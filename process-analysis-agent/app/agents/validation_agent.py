@@ -9,6 +9,7 @@ from google.adk.tools import FunctionTool
 from google.genai import types
 from pydantic import BaseModel, Field
 from app import config
+from app.app_utils.context_builder import history_mode, scoped_instruction
 from app.tools import validate_mermaid_syntax
 
 # Pydantic Model for structured output
@@ -19,6 +20,9 @@ class ValidationOutput(BaseModel):
     warnings: List[str] = Field(..., description="A list of warnings or suggestions for improvement.")
     overall_status: str = Field(..., description="Overall status: 'valid', 'invalid', or 'needs_improvement'.")
 
+# Session-state keys this agent consumes (see app_utils/context_builder.py)
+CONTEXT_KEYS = ("current_mermaid_code",)
+
 
 def create_validation_agent() -> LlmAgent:
     """
@@ -34,12 +38,14 @@ def create_validation_agent() -> LlmAgent:
         name="ValidationAgent",
         model=config.MODEL_FLASH_THINKING,
         # --- UPDATE: Explicit Handoff Instruction ---
-        instruction=(
+        instruction=scoped_instruction(
             config.SYSTEM_PROMPT_VALIDATION + 
             "\n\nIMPORTANT FINAL STEP:\n"
             "After validating the diagram, output the JSON result.\n"
-            "Then, explicitly state: 'Validation complete. Proceeding to publication.'"
+            "Then, explicitly state: 'Validation complete. Proceeding to publication.'",
+            CONTEXT_KEYS
         ),
+        include_contents=history_mode(),
         # --------------------------------------------
         description=(
             "Validates Mermaid flowcharts. Passes control to PublicationAgent upon completion."
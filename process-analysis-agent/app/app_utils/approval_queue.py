@@ -0,0 +1,266 @@
+"""
+app_utils/approval_queue.py
+Persistent approval queue (SQLite, next to the checkpoints).
+
+With config.APPROVAL_QUEUE, a run that reaches the ApprovalAgent outside
+CLI_MODE does not wait for the Web UI confirmation: the request is queued
+here, the run ends as 'paused' (checkpoint) and its session is released.
+Reviewers decide asynchronously (app/approvals.py: API + CLI); decided
+items are picked up by the approval worker pool, which resumes the run at
+the ApprovalAgent so the PublicationAgent publishes (or halts) it.
+
+Item lifecycle: pending -> approved/rejected (decided) -> done (resumed).
+
+Items carry their document (revision_store.document_key); approving one
+makes its graph the document's baseline in approved_graphs, which reviewers
+diff against (app/approvals.py review) and which auto-approves later runs
+with an unchanged graph (config.AUTO_APPROVE_UNCHANGED).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS approvals (
+    session_id   TEXT PRIMARY KEY,
+    app_name     TEXT NOT NULL,
+    user_id      TEXT NOT NULL,
+    pdf_path     TEXT,
+    mermaid_code TEXT,
+    graph_json   TEXT,
+    status       TEXT NOT NULL,
+    reason       TEXT,
+    reviewer     TEXT,
+    requested_at REAL NOT NULL,
+    decided_at   REAL,
+    done_at      REAL,
+    result_json  TEXT,
+    document     TEXT
+);
+CREATE TABLE IF NOT EXISTS approved_graphs (
+    document     TEXT PRIMARY KEY,
+    session_id   TEXT NOT NULL,
+    graph_json   TEXT,
+    approved_at  REAL NOT NULL
+);
+"""
+_COLUMNS = ("session_id", "app_name", "user_id", "pdf_path", "mermaid_code", "graph_json", "status",
+            "reason", "reviewer", "requested_at", "decided_at", "done_at", "result_json", "document")
+DECIDED = ("approved", "rejected")
+# Reviewer recorded for decisions taken without a human
+AUTO_REVIEWER = "auto (unchanged graph)"
+
+
+class ApprovalQueue:
+    """
+    Approval requests and decisions in SQLite (WAL, shared with other processes).
+
+    Every call commits immediately: decisions are rare and must not be lost.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(approvals)")}
+        if "document" not in columns:  # Queue created before documents were tracked
+            self._db.execute("ALTER TABLE approvals ADD COLUMN document TEXT")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def _rows(self, query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM approvals {query}", params).fetchall()
+        items = []
+        for row in rows:
+            item = dict(zip(_COLUMNS, row))
+            item["graph"] = json.loads(item.pop("graph_json") or "null")
+            item["result"] = json.loads(item.pop("result_json") or "null")
+            items.append(item)
+        return items
+
+    def _execute(self, query: str, params: tuple) -> int:
+        with self._lock:
+            cursor = self._db.execute(query, params)
+            self._db.commit()
+            return cursor.rowcount
+
+    # --- Producer (workflow) ---
+
+    def enqueue(
+        self,
+        *,
+        session_id: str,
+        app_name: str,
+        user_id: str,
+        pdf_path: Optional[str],
+        mermaid_code: str,
+        graph: Optional[Dict[str, Any]] = None,
+        document: Optional[str] = None,
+    ) -> None:
+        """Adds (or re-opens) the approval request of a session."""
+        self._execute(
+            "INSERT INTO approvals (session_id, app_name, user_id, pdf_path, mermaid_code, graph_json, "
+            "status, requested_at, document) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET mermaid_code=excluded.mermaid_code, "
+            "graph_json=excluded.graph_json, status='pending', reason=NULL, reviewer=NULL, "
+            "requested_at=excluded.requested_at, decided_at=NULL, done_at=NULL, result_json=NULL, "
+            "document=excluded.document",
+            (session_id, app_name, user_id, pdf_path, mermaid_code,
+             json.dumps(graph, ensure_ascii=False) if graph is not None else None, time.time(), document),
+        )
+
+    def record_auto_approval(
+        self,
+        *,
+        session_id: str,
+        app_name: str,
+        user_id: str,
+        pdf_path: Optional[str],
+        mermaid_code: str,
+        graph: Optional[Dict[str, Any]],
+        document: str,
+    ) -> None:
+        """Records a run approved without review (its run continues, so it is done at once)."""
+        self.enqueue(session_id=session_id, app_name=app_name, user_id=user_id, pdf_path=pdf_path,
+                     mermaid_code=mermaid_code, graph=graph, document=document)
+        now = time.time()
+        self._execute(
+            "UPDATE approvals SET status = 'approved', reviewer = ?, decided_at = ?, done_at = ? "
+            "WHERE session_id = ?",
+            (AUTO_REVIEWER, now, now, session_id),
+        )
+
+    # --- Reviewers ---
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        items = self._rows("WHERE session_id = ?", (session_id,))
+        return items[0] if items else None
+
+    def pending(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Pending requests, oldest first."""
+        query = "WHERE status = 'pending' ORDER BY requested_at"
+        return self._rows(query + (f" LIMIT {int(limit)}" if limit else ""))
+
+    def decide(self, session_id: str, approved: bool, reason: str = "", reviewer: str = "") -> bool:
+        """Records a decision; False if the session has no pending request."""
+        return bool(self.decide_many([session_id], approved, reason, reviewer))
+
+    def decide_many(
+        self, session_ids: List[str], approved: bool, reason: str = "", reviewer: str = ""
+    ) -> List[str]:
+        """
+        Records one decision for many requests in a single transaction.
+
+        Approved graphs become their document's baseline (the most recently
+        requested one if several of a document are approved together).
+
+        Returns:
+            The session ids that were pending (others are ignored)
+        """
+        if not session_ids:
+            return []
+        now = time.time()
+        marks = ", ".join("?" * len(session_ids))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT session_id, document, graph_json FROM approvals "
+                f"WHERE session_id IN ({marks}) AND status = 'pending' ORDER BY requested_at",
+                tuple(session_ids),
+            ).fetchall()
+            decided = [row[0] for row in rows]
+            if decided:
+                self._db.execute(
+                    f"UPDATE approvals SET status = ?, reason = ?, reviewer = ?, decided_at = ? "
+                    f"WHERE session_id IN ({', '.join('?' * len(decided))})",
+                    ("approved" if approved else "rejected", reason, reviewer, now, *decided),
+                )
+                if approved:
+                    self._db.executemany(
+                        "INSERT INTO approved_graphs (document, session_id, graph_json, approved_at) "
+                        "VALUES (?, ?, ?, ?) ON CONFLICT(document) DO UPDATE SET "
+                        "session_id=excluded.session_id, graph_json=excluded.graph_json, "
+                        "approved_at=excluded.approved_at",
+                        [(document, session_id, graph_json, now)
+                         for session_id, document, graph_json in rows if document],
+                    )
+                self._db.commit()
+        return decided
+
+    def last_approved(self, document: str) -> Optional[Dict[str, Any]]:
+        """Baseline of a document: session_id, graph and approved_at of its last approval."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT session_id, graph_json, approved_at FROM approved_graphs WHERE document = ?",
+                (document,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"session_id": row[0], "graph": json.loads(row[1] or "null"), "approved_at": row[2]}
+
+    # --- Workers ---
+
+    def decided(self) -> List[Dict[str, Any]]:
+        """Decided requests whose run was not resumed yet, oldest decision first."""
+        return self._rows("WHERE status IN ('approved', 'rejected') AND done_at IS NULL ORDER BY decided_at")
+
+    def mark_done(self, session_id: str, result: Dict[str, Any]) -> None:
+        """Stores the outcome of the resumed run (publication paths or error)."""
+        self._execute(
+            "UPDATE approvals SET done_at = ?, result_json = ? WHERE session_id = ?",
+            (time.time(), json.dumps(result, ensure_ascii=False, default=str), session_id),
+        )
+
+    # --- Metrics ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and age (pending), backlog of decided runs, decision latency."""
+        now = time.time()
+        with self._lock:
+            pending = self._db.execute(
+                "SELECT COUNT(*), MIN(requested_at), AVG(requested_at) FROM approvals WHERE status = 'pending'"
+            ).fetchone()
+            decided = self._db.execute(
+                # Latencies of human decisions only (auto-approvals take no time)
+                "SELECT COUNT(*), SUM(done_at IS NULL), "
+                "AVG(CASE WHEN reviewer IS NOT ? THEN decided_at - requested_at END), "
+                "AVG(CASE WHEN reviewer IS NOT ? THEN done_at - decided_at END), "
+                "SUM(reviewer IS ?) FROM approvals WHERE status IN ('approved', 'rejected')",
+                (AUTO_REVIEWER, AUTO_REVIEWER, AUTO_REVIEWER),
+            ).fetchone()
+        return {
+            "pending": pending[0],
+            "oldest_pending_age_s": round(now - pending[1], 1) if pending[1] else 0.0,
+            "mean_pending_age_s": round(now - pending[2], 1) if pending[2] else 0.0,
+            "decided": decided[0],
+            "auto_approved": decided[4] or 0,
+            "awaiting_worker": decided[1] or 0,
+            "mean_decision_s": round(decided[2], 1) if decided[2] is not None else None,
+            "mean_resume_lag_s": round(decided[3], 1) if decided[3] is not None else None,
+        }
+
+
+_queue: Optional[ApprovalQueue] = None
+
+
+def get_approval_queue() -> Optional[ApprovalQueue]:
+    """
+    The process-wide queue (stored in config.CHECKPOINT_DB).
+
+    None unless APPROVAL_QUEUE is on - resuming a queued run needs its
+    checkpoint, so CHECKPOINTS must be on as well.
+    """
+    global _queue
+    if _queue is None and config.APPROVAL_QUEUE and config.CHECKPOINTS:
+        _queue = ApprovalQueue(config.CHECKPOINT_DB)
+    return _queue
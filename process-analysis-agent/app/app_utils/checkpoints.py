@@ -0,0 +1,308 @@
+"""
+app_utils/checkpoints.py
+Persistent, checkpointed workflow sessions (SQLite store + ADK plugin).
+
+CheckpointPlugin saves the session state before each stage (direct sub-agent)
+of the root SequentialAgent and marks the run 'completed' - or 'paused' while
+the approval is PENDING - when it ends. A run that crashed or was paused
+keeps its last checkpoint ('running'/'paused'): resume_workflow() recreates
+the session from it and the plugin skips every stage that already finished.
+
+CheckpointStore keeps one row per session (the latest checkpoint) in SQLite
+with WAL journaling. save() only coalesces the checkpoint in memory; a
+background thread commits all pending checkpoints in one transaction every
+config.CHECKPOINT_FLUSH_MS (and at exit / on flush()), so a checkpoint costs
+the workflow one JSON serialisation, not a disk sync. A hard crash loses at
+most the last flush interval - the run then resumes one stage earlier.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents import SequentialAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+from app import config
+
+# Stage that leaves a run waiting for a human decision (approval_status PENDING)
+PAUSE_STAGE = "ApprovalAgent"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    session_id   TEXT PRIMARY KEY,
+    app_name     TEXT NOT NULL,
+    user_id      TEXT NOT NULL,
+    pdf_path     TEXT,
+    user_message TEXT,
+    status       TEXT NOT NULL,
+    next_stage   INTEGER NOT NULL,
+    stage        TEXT,
+    state_json   TEXT NOT NULL,
+    created_at   TEXT NOT NULL,
+    updated_at   TEXT NOT NULL
+)
+"""
+_COLUMNS = ("session_id", "app_name", "user_id", "pdf_path", "user_message", "status",
+            "next_stage", "stage", "state_json", "created_at", "updated_at")
+
+
+class CheckpointStore:
+    """
+    Latest checkpoint per session in SQLite (WAL), written in batches.
+
+    Args:
+        path: Database file (directory created on open)
+        flush_interval_s: Maximum delay before a saved checkpoint is committed
+    """
+
+    def __init__(self, path: str, flush_interval_s: float = config.CHECKPOINT_FLUSH_MS / 1000):
+        self.path = path
+        self.flush_interval_s = flush_interval_s
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, no fsync per commit
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+        self._pending: Dict[str, Dict[str, Any]] = {}  # session_id -> latest row (coalesced)
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.counts = {"saves": 0, "rows_written": 0, "batches": 0, "write_ms": 0.0}
+        self._writer = threading.Thread(target=self._run_writer, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- Writing ---
+
+    def save(
+        self,
+        *,
+        session_id: str,
+        app_name: str,
+        user_id: str,
+        status: str,
+        next_stage: int,
+        stage: Optional[str],
+        state: Dict[str, Any],
+        pdf_path: Optional[str] = None,
+        user_message: Optional[str] = None,
+    ) -> None:
+        """Queues the latest checkpoint of a session (replaces a pending one)."""
+        now = datetime.now().isoformat()
+        row = {
+            "session_id": session_id,
+            "app_name": app_name,
+            "user_id": user_id,
+            "pdf_path": pdf_path,
+            "user_message": user_message,
+            "status": status,
+            "next_stage": next_stage,
+            "stage": stage,
+            "state_json": json.dumps(state, ensure_ascii=False, default=str),
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._pending_lock:
+            previous = self._pending.get(session_id)
+            if previous:
+                row["created_at"] = previous["created_at"]
+                row["pdf_path"] = row["pdf_path"] or previous["pdf_path"]
+                row["user_message"] = row["user_message"] or previous["user_message"]
+            self._pending[session_id] = row
+            self.counts["saves"] += 1
+        self._wake.set()
+
+    def _run_writer(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            time.sleep(self.flush_interval_s)  # Collect more checkpoints into this batch
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Commits all pending checkpoints in one transaction; returns the row count."""
+        with self._db_lock:
+            with self._pending_lock:
+                rows = list(self._pending.values())
+                self._pending.clear()
+            if not rows:
+                return 0
+            start = time.perf_counter()
+            # Keep created_at / pdf_path / user_message of the stored row
+            self._db.executemany(
+                f"INSERT INTO checkpoints ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "status=excluded.status, next_stage=excluded.next_stage, stage=excluded.stage, "
+                "state_json=excluded.state_json, updated_at=excluded.updated_at, "
+                "pdf_path=COALESCE(excluded.pdf_path, pdf_path), "
+                "user_message=COALESCE(excluded.user_message, user_message)",
+                [tuple(row[c] for c in _COLUMNS) for row in rows],
+            )
+            self._db.commit()
+            self.counts["rows_written"] += len(rows)
+            self.counts["batches"] += 1
+            self.counts["write_ms"] += (time.perf_counter() - start) * 1000
+            return len(rows)
+
+    def close(self) -> None:
+        """Flushes and stops the writer (registered with atexit)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self.flush()
+
+    # --- Reading ---
+
+    @staticmethod
+    def _decode(row: Dict[str, Any]) -> Dict[str, Any]:
+        checkpoint = {k: v for k, v in row.items() if k != "state_json"}
+        checkpoint["state"] = json.loads(row["state_json"])
+        return checkpoint
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Latest checkpoint of a session (pending or committed) with its 'state', or None."""
+        with self._pending_lock:
+            pending = self._pending.get(session_id)
+            if pending:
+                return self._decode(dict(pending))
+        with self._db_lock:
+            cursor = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM checkpoints WHERE session_id = ?", (session_id,)
+            )
+            row = cursor.fetchone()
+        return self._decode(dict(zip(_COLUMNS, row))) if row else None
+
+    def list_runs(self, statuses: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Checkpointed runs without their state, most recently updated first."""
+        self.flush()
+        columns = [c for c in _COLUMNS if c != "state_json"]
+        query = f"SELECT {', '.join(columns)} FROM checkpoints"
+        params: List[Any] = []
+        if statuses:
+            query += f" WHERE status IN ({', '.join('?' * len(statuses))})"
+            params = list(statuses)
+        with self._db_lock:
+            rows = self._db.execute(query + " ORDER BY updated_at DESC", params).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def delete(self, session_id: str) -> None:
+        with self._pending_lock:
+            self._pending.pop(session_id, None)
+        with self._db_lock:
+            self._db.execute("DELETE FROM checkpoints WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Write counters: saves vs. rows actually written, batches, total write time."""
+        return {
+            **self.counts,
+            "write_ms": round(self.counts["write_ms"], 1),
+            "pending": len(self._pending),
+        }
+
+
+_store: Optional[CheckpointStore] = None
+
+
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    """The process-wide store at config.CHECKPOINT_DB (None if CHECKPOINTS is off)."""
+    global _store
+    if _store is None and config.CHECKPOINTS:
+        _store = CheckpointStore(config.CHECKPOINT_DB)
+    return _store
+
+
+class CheckpointPlugin(BasePlugin):
+    """Checkpoints each stage of the root SequentialAgent and skips finished stages on resume."""
+
+    def __init__(self, store: CheckpointStore):
+        super().__init__(name="checkpoints")
+        self.store = store
+        # session id -> index of the first stage to run (set by resume())
+        self._resume_from: Dict[str, int] = {}
+        # invocation id -> index of the last stage started in that run
+        self._runs: Dict[str, int] = {}
+
+    def resume(self, session_id: str, next_stage: int) -> None:
+        """Makes the next run of this session skip stages before next_stage."""
+        self._resume_from[session_id] = next_stage
+
+    @staticmethod
+    def _stage_index(agent) -> Optional[int]:
+        """Position of the agent among the root's stages (None if not a root stage)."""
+        parent = agent.parent_agent
+        if isinstance(parent, SequentialAgent) and parent.parent_agent is None:
+            return parent.sub_agents.index(agent)
+        return None
+
+    async def before_agent_callback(self, *, agent, callback_context: CallbackContext):
+        index = self._stage_index(agent)
+        if index is None:
+            return None
+
+        session = callback_context.session
+        self._runs[callback_context.invocation_id] = index
+        resume_from = self._resume_from.get(session.id)
+        if resume_from is not None and index < resume_from:
+            print(f"[Checkpoints] ⏩ {agent.name}: finished before the restart, skipped")
+            return types.Content(role="model", parts=[types.Part(text=f"{agent.name} restored from checkpoint.")])
+
+        user_content = callback_context.user_content
+        self.store.save(
+            session_id=session.id,
+            app_name=session.app_name,
+            user_id=session.user_id,
+            status="running",
+            next_stage=index,
+            stage=agent.name,
+            state=callback_context.state.to_dict(),
+            pdf_path=callback_context.state.get("pdf_path"),
+            user_message=user_content.parts[0].text if user_content and user_content.parts else None,
+        )
+        return None
+
+    async def after_run_callback(self, *, invocation_context) -> None:
+        if self._runs.pop(invocation_context.invocation_id, None) is None:
+            return None  # Not a run of the checkpointed root agent
+        session = invocation_context.session
+        self._resume_from.pop(session.id, None)
+        stages = [a.name for a in invocation_context.agent.sub_agents]
+
+        if session.state.get("approval_status") == "PENDING" and PAUSE_STAGE in stages:
+            status, next_stage = "paused", stages.index(PAUSE_STAGE)
+        else:
+            status, next_stage = "completed", len(stages)
+        self.store.save(
+            session_id=session.id,
+            app_name=session.app_name,
+            user_id=session.user_id,
+            status=status,
+            next_stage=next_stage,
+            stage=stages[next_stage] if next_stage < len(stages) else None,
+            state=dict(session.state),
+        )
+        print(f"[Checkpoints] 💾 {session.id}: {status}"
+              + (f" (resumes at {stages[next_stage]})" if status == "paused" else ""))
+        return None
+
+
+def create_checkpoint_plugin() -> Optional[CheckpointPlugin]:
+    """Creates the plugin according to config.CHECKPOINTS (None if off)."""
+    store = get_checkpoint_store()
+    if store is None:
+        return None
+    return CheckpointPlugin(store)
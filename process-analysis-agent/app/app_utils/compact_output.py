@@ -0,0 +1,299 @@
+"""
+app_utils/compact_output.py
+Compact wire format for the graph outputs of the LLM agents (ADK plugin).
+
+As JSON objects, PdfAnalysisOutput and ConversionOutput repeat "id", "type",
+"label", "from", "to", ... for every step/node and edge, and output tokens
+dominate the generation time. With config.COMPACT_OUTPUT the model emits
+positional arrays instead - actors and types interned in tables, steps
+referenced by their 1-based position, nodes by their id:
+
+    analysis:   {"actors": ["Clerk"], "types": ["start_event", "task"],
+                 "steps": [[0, -1, "Start", ""], [1, 0, "Review invoice", ""]],
+                 "deps": [[1, 2, ""]]}
+                 step = [type index, actor index or -1, action, condition]
+    conversion: {"actors": [...], "types": [...],
+                 "nodes": [[id, type index, actor index or -1, label]],
+                 "edges": [[from node id, to node id, label]]}
+
+CompactOutputPlugin swaps the response schema of every LLM request for one
+of these models (matched by the agent's output_schema) and expands the
+response into the regular JSON before anything else sees it, so
+output_key, the model cache and all later stages are unchanged. Expanded
+step ids are the positions. Node ids are kept as emitted, so the judge's
+GraphEdits, delta feedback and structural diffs still match the nodes when
+a refinement reorders them.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+from pydantic import BaseModel, Field, ValidationError
+
+from app import config
+from app.agents.conversion_agent import NODE_TYPES
+from app.app_utils.tokens import estimate_tokens
+
+Row = List[Union[int, str]]
+
+
+class CompactPdfAnalysisOutput(BaseModel):
+    actors: List[str] = Field(..., description="Actor table.")
+    types: List[str] = Field(..., description="Step type table (e.g. 'start_event', 'task', 'decision', 'end_event').")
+    steps: List[Row] = Field(..., description="[type index, actor index or -1, action, condition or ''] per step; step number = position (1-based).")
+    deps: List[Row] = Field(..., description="[from step number, to step number, label or ''] per dependency.")
+
+
+class CompactConversionOutput(BaseModel):
+    actors: List[str] = Field(..., description="Actor table.")
+    types: List[str] = Field(..., description=f"Node type table ({', '.join(NODE_TYPES)}).")
+    nodes: List[Row] = Field(..., description="[id, type index, actor index or -1, label] per node.")
+    edges: List[Row] = Field(..., description="[from node id, to node id, label or ''] per edge.")
+
+
+_RULES = (
+    "\n\nOUTPUT FORMAT (compact, overrides the object layout described above): "
+    "Return one JSON object with an actor table 'actors' and a type table 'types'. "
+    "{rows} "
+    "Refer to actors and types by their 0-based index in the tables (actor -1 = no actor) "
+    "and {refs}. Use '' for empty text."
+)
+ANALYSIS_RULES = _RULES.format(
+    rows="'steps' holds one array per step: [type, actor, action, condition]; "
+         "'deps' one array per dependency: [from step, to step, label].",
+    refs="to steps by their 1-based position in 'steps'",
+)
+CONVERSION_RULES = _RULES.format(
+    rows="'nodes' holds one array per node: [id, type, actor, label]; "
+         "'edges' one array per edge: [from node id, to node id, label].",
+    refs="to nodes by their id (keep the ids of a previous graph)",
+)
+
+
+# =============================================================================
+# Decoding (compact -> regular models)
+# =============================================================================
+
+def _table_ref(table: List[str], value: Any, what: str, optional: bool = False) -> Optional[str]:
+    if optional and value == -1:
+        return None
+    if not isinstance(value, int) or not 0 <= value < len(table):
+        raise ValueError(f"{what} index {value!r} outside the table ({len(table)} entries)")
+    return table[value]
+
+
+def _position(value: Any, count: int, what: str) -> int:
+    if not isinstance(value, int) or not 1 <= value <= count:
+        raise ValueError(f"{what} reference {value!r} outside 1..{count}")
+    return value
+
+
+def _node_id(value: Any) -> str:
+    if value in (None, ""):
+        raise ValueError("node row without id")
+    return str(value)
+
+
+def _node_ref(value: Any, ids: Set[str]) -> str:
+    if str(value) not in ids:
+        raise ValueError(f"edge references unknown node {value!r}")
+    return str(value)
+
+
+def _row(row: Row, length: int, what: str) -> Row:
+    if len(row) < length - 1 or len(row) > length:
+        raise ValueError(f"{what} row {row!r} needs {length} fields")
+    return list(row) + [""] * (length - len(row))  # Trailing empty text may be omitted
+
+
+def _text(value: Any) -> Optional[str]:
+    return str(value) if value not in (None, "") else None
+
+
+def decode_analysis(compact: Dict[str, Any]):
+    """Expands a compact analysis into a PdfAnalysisOutput (ValueError/ValidationError if malformed)."""
+    from app.agents.pdf_analysis_agent import PdfAnalysisOutput
+
+    data = CompactPdfAnalysisOutput.model_validate(compact)
+    steps = []
+    for number, raw in enumerate(data.steps, start=1):
+        type_ref, actor_ref, action, condition = _row(raw, 4, "step")
+        steps.append({
+            "id": number,
+            "type": _table_ref(data.types, type_ref, "type"),
+            "action": str(action),
+            "actor": _table_ref(data.actors, actor_ref, "actor", optional=True),
+            "condition": _text(condition),
+        })
+    dependencies = []
+    for raw in data.deps:
+        source, target, label = _row(raw, 3, "dependency")
+        dependencies.append({
+            "from": _position(source, len(steps), "step"),
+            "to": _position(target, len(steps), "step"),
+            "label": _text(label),
+        })
+    return PdfAnalysisOutput.model_validate({"actors": data.actors, "steps": steps, "dependencies": dependencies})
+
+
+def decode_conversion(compact: Dict[str, Any]):
+    """Expands a compact graph into a ConversionOutput (ValueError/ValidationError if malformed)."""
+    from app.agents.conversion_agent import ConversionOutput
+
+    data = CompactConversionOutput.model_validate(compact)
+    nodes = []
+    for raw in data.nodes:
+        node_id, type_ref, actor_ref, label = _row(raw, 4, "node")
+        nodes.append({
+            "id": _node_id(node_id),
+            "type": _table_ref(data.types, type_ref, "type"),
+            "label": str(label),
+            "actor": _table_ref(data.actors, actor_ref, "actor", optional=True),
+        })
+    ids = {node["id"] for node in nodes}
+    edges = []
+    for raw in data.edges:
+        source, target, label = _row(raw, 3, "edge")
+        edges.append({
+            "from": _node_ref(source, ids),
+            "to": _node_ref(target, ids),
+            "label": _text(label),
+        })
+    return ConversionOutput.model_validate({"nodes": nodes, "edges": edges})
+
+
+# =============================================================================
+# Encoding (regular dicts -> compact; benchmarks, few-shot examples)
+# =============================================================================
+
+def _intern(table: List[str], value: Optional[str]) -> int:
+    if value in (None, ""):
+        return -1
+    if value not in table:
+        table.append(value)
+    return table.index(value)
+
+
+def encode_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact form of a PdfAnalysisOutput dict (steps renumbered by position)."""
+    actors = list(analysis.get("actors") or [])
+    types_: List[str] = []
+    positions = {}
+    steps = []
+    for number, step in enumerate(analysis.get("steps") or [], start=1):
+        positions[step["id"]] = number
+        steps.append([_intern(types_, step["type"]), _intern(actors, step.get("actor")),
+                      step["action"], step.get("condition") or ""])
+    deps = [
+        [positions[d.get("from", d.get("from_"))], positions[d["to"]], d.get("label") or ""]
+        for d in analysis.get("dependencies") or []
+    ]
+    return {"actors": actors, "types": types_, "steps": steps, "deps": deps}
+
+
+def encode_conversion(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact form of a ConversionOutput dict (node ids kept)."""
+    actors: List[str] = []
+    types_: List[str] = []
+    nodes = [
+        [node["id"], _intern(types_, node["type"]), _intern(actors, node.get("actor")), node["label"]]
+        for node in graph.get("nodes") or []
+    ]
+    edges = [
+        [e.get("from", e.get("from_")), e["to"], e.get("label") or ""]
+        for e in graph.get("edges") or []
+    ]
+    return {"actors": actors, "types": types_, "nodes": nodes, "edges": edges}
+
+
+# Regular output schema name -> (compact schema, extra instruction, decoder)
+COMPACT_FORMATS = {
+    "PdfAnalysisOutput": (CompactPdfAnalysisOutput, ANALYSIS_RULES, decode_analysis),
+    "ConversionOutput": (CompactConversionOutput, CONVERSION_RULES, decode_conversion),
+}
+
+
+# =============================================================================
+# Plugin
+# =============================================================================
+
+class CompactOutputPlugin(BasePlugin):
+    """
+    Requests the compact format for graph outputs and expands the responses.
+
+    Must come before the metrics and model cache plugins: the response is
+    expanded in place, so they record and cache the regular JSON.
+    """
+
+    def __init__(self):
+        super().__init__(name="compact_output")
+        # (invocation id, agent name) -> schema name of the pending compact call
+        self._pending: Dict[Tuple[str, str], str] = {}
+        self.counts = {"calls": 0, "compact_chars": 0, "expanded_chars": 0, "decode_ms": 0.0, "failed": 0}
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        schema = llm_request.config.response_schema if llm_request.config else None
+        name = getattr(schema, "__name__", None)
+        if name not in COMPACT_FORMATS:
+            return None
+        compact_schema, rules, _ = COMPACT_FORMATS[name]
+        llm_request.config.response_schema = compact_schema
+        llm_request.append_instructions([rules])
+        self._pending[(callback_context.invocation_id, callback_context.agent_name)] = name
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        name = self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        if name is None or llm_response.partial or not llm_response.content or not llm_response.content.parts:
+            return None
+        parts = llm_response.content.parts
+        text = "".join(p.text for p in parts if p.text and not p.thought)
+        if not text.strip():
+            return None
+
+        start = time.perf_counter()
+        try:
+            expanded = COMPACT_FORMATS[name][2](json.loads(text)).model_dump_json(by_alias=True)
+        except (ValueError, ValidationError) as e:
+            # Left as is: fails the agent's output_schema like any malformed response
+            self.counts["failed"] += 1
+            print(f"[Compact Output] ⚠️ {callback_context.agent_name}: could not expand the response: {e}")
+            return None
+        self.counts["decode_ms"] += (time.perf_counter() - start) * 1000
+        self.counts["calls"] += 1
+        self.counts["compact_chars"] += len(text)
+        self.counts["expanded_chars"] += len(expanded)
+
+        # In place (returning a response would skip the later plugins)
+        llm_response.content.parts = [p for p in parts if p.thought or not p.text] + [types.Part(text=expanded)]
+        print(
+            f"[Compact Output] 📦 {callback_context.agent_name}: ~{estimate_tokens(text)} output tokens "
+            f"instead of ~{estimate_tokens(expanded)}"
+        )
+        return None
+
+    async def on_model_error_callback(self, *, callback_context: CallbackContext, llm_request, error):
+        self._pending.pop((callback_context.invocation_id, callback_context.agent_name), None)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Expanded calls, characters emitted vs. expanded, total decode time."""
+        return {**self.counts, "decode_ms": round(self.counts["decode_ms"], 2)}
+
+
+def create_compact_output_plugin() -> Optional[CompactOutputPlugin]:
+    """Creates the plugin according to config.COMPACT_OUTPUT (None if off)."""
+    if not config.COMPACT_OUTPUT:
+        return None
+    print("✅ CompactOutputPlugin created (positional graph outputs, expanded locally)")
+    return CompactOutputPlugin()
@@ -0,0 +1,169 @@
+"""
+app_utils/context_builder.py
+Per-agent context scoping.
+
+Every LLM agent declares the session-state keys it consumes (CONTEXT_KEYS in
+its module). With config.SCOPED_CONTEXT the agent gets an instruction
+provider that appends exactly those keys (compact JSON) to its instruction,
+and include_contents="none" drops the shared conversation history - so late
+agents no longer re-read the extracted PDF text and all earlier outputs.
+
+The provider also estimates the prompt size with and without scoping
+(scoped: instruction + the current turn ADK still sends with
+include_contents="none"; unscoped: instruction + the whole history); see
+context_report() / print_context_report().
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event
+from google.adk.utils.instructions_utils import inject_session_state
+
+from app import config
+from app.app_utils.tokens import estimate_tokens
+
+# session id -> agent name -> {"calls", "scoped_tokens", "unscoped_tokens"} (summed over calls)
+_report: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+
+def _compact(value: Any) -> Any:
+    """Drops None values and empty containers recursively."""
+    if isinstance(value, dict):
+        return {k: _compact(v) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    return value
+
+
+def serialize_state_value(value: Any) -> str:
+    """Compact text form of a state value (strings as-is, everything else as minified JSON)."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(_compact(value), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _event_tokens(event: Event) -> int:
+    """Estimated size of one event's text and function call/response parts."""
+    total = 0
+    for part in (event.content.parts or []) if event.content else []:
+        if part.text:
+            total += estimate_tokens(part.text)
+        elif part.function_call or part.function_response:
+            payload = part.function_call or part.function_response
+            total += estimate_tokens(json.dumps(payload.model_dump(mode="json", exclude_none=True)))
+    return total
+
+
+def _history_tokens(context: ReadonlyContext) -> int:
+    """Estimated size of the conversation history an unscoped agent would receive."""
+    return sum(_event_tokens(event) for event in context.session.events)
+
+
+def _current_turn_tokens(context: ReadonlyContext) -> int:
+    """
+    Estimated size of the contents a scoped agent still receives.
+
+    With include_contents="none" ADK sends the current turn: everything from
+    the latest user message or other agent's reply on (that reply plus the
+    agent's own tool calls/responses since).
+    """
+    events = context.session.events
+    for index in range(len(events) - 1, -1, -1):
+        if events[index].content and events[index].author != context.agent_name:
+            return sum(_event_tokens(event) for event in events[index:])
+    return 0
+
+
+def scoped_instruction(
+    instruction: str, context_keys: Sequence[str]
+) -> Union[str, Callable[[ReadonlyContext], Any]]:
+    """
+    Builds the instruction of an agent that only sees its declared state keys.
+
+    '{key}' / '{key?}' placeholders in the instruction are still resolved
+    (ADK's own templating); declared keys that are not referenced by a
+    placeholder are appended in a CONTEXT block.
+
+    Args:
+        instruction: The agent's instruction template
+        context_keys: Session-state keys the agent consumes
+
+    Returns:
+        An instruction provider, or the unchanged template if SCOPED_CONTEXT is off
+    """
+    if not config.SCOPED_CONTEXT:
+        return instruction
+
+    appended = [k for k in context_keys if "{" + k + "}" not in instruction and "{" + k + "?}" not in instruction]
+
+    async def provider(context: ReadonlyContext) -> str:
+        rendered = await inject_session_state(instruction, context)
+        blocks = [
+            f"[{key}]\n{serialize_state_value(context.state.get(key))}"
+            for key in appended
+            if context.state.get(key) not in (None, "", [], {})
+        ]
+        scoped = rendered + ("\n\nCONTEXT (session state):\n" + "\n\n".join(blocks) if blocks else "")
+        record_scoped_prompt(context, scoped, rendered)
+        return scoped
+
+    return provider
+
+
+def record_scoped_prompt(context: ReadonlyContext, scoped: str, instruction: str) -> None:
+    """Adds one prompt to the context report (scoped + current turn vs. instruction + full history)."""
+    agents = _report.setdefault(context.session.id, {})
+    entry = agents.setdefault(context.agent_name, {"calls": 0, "scoped_tokens": 0, "unscoped_tokens": 0})
+    entry["calls"] += 1
+    entry["scoped_tokens"] += estimate_tokens(scoped) + _current_turn_tokens(context)
+    entry["unscoped_tokens"] += estimate_tokens(instruction) + _history_tokens(context)
+
+
+def history_mode() -> str:
+    """include_contents value matching scoped_instruction ('none' drops the history)."""
+    return "none" if config.SCOPED_CONTEXT else "default"
+
+
+def context_report(session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-agent estimated prompt tokens with/without scoping and the reduction (one or all sessions)."""
+    totals: Dict[str, Dict[str, int]] = {}
+    sessions = [_report.get(session_id, {})] if session_id is not None else list(_report.values())
+    for agents in sessions:
+        for agent, entry in agents.items():
+            total = totals.setdefault(agent, {"calls": 0, "scoped_tokens": 0, "unscoped_tokens": 0})
+            for key, value in entry.items():
+                total[key] += value
+    return [
+        {
+            "agent": agent,
+            "calls": entry["calls"],
+            "scoped_tokens": entry["scoped_tokens"],
+            "unscoped_tokens": entry["unscoped_tokens"],
+            "reduction": round(1 - entry["scoped_tokens"] / entry["unscoped_tokens"], 3)
+            if entry["unscoped_tokens"] else 0.0,
+        }
+        for agent, entry in totals.items()
+    ]
+
+
+def reset_context_report(session_id: Optional[str] = None) -> None:
+    """Clears the collected estimates of one session (once its run is reported) or of all."""
+    if session_id is None:
+        _report.clear()
+    else:
+        _report.pop(session_id, None)
+
+
+def print_context_report(session_id: Optional[str] = None) -> None:
+    """Prints the per-agent prompt token reduction."""
+    rows = context_report(session_id)
+    if not rows:
+        return
+    print("\n✂️ Context Scoping (estimated prompt tokens):")
+    for row in rows:
+        print(
+            f"   {row['agent']:<28} {row['calls']:>3}x "
+            f"~{row['unscoped_tokens']:>7} -> ~{row['scoped_tokens']:>6} tokens ({-row['reduction']:+.0%})"
+        )
@@ -0,0 +1,108 @@
+"""
+app_utils/disk_cache.py
+Size-bounded, LRU-evicting JSON cache on the local filesystem.
+
+Safe to share between concurrent worker processes:
+- Writes go to a temp file in the same directory and are published with
+  os.replace (atomic on POSIX and Windows), so readers never see partial data.
+- Recency is tracked through the file mtime (touched on every hit), so every
+  process sees the same LRU order without a shared index file.
+- Eviction tolerates files disappearing underneath it (another worker won).
+"""
+
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+
+class DiskCache:
+    """
+    Key/value store mapping string keys to JSON-serialisable values.
+
+    Args:
+        directory: Cache directory (created lazily on first write)
+        max_bytes: Total size budget; least recently used entries are evicted
+    """
+
+    SUFFIX = ".json"
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value (and marks it as recently used) or None."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # LRU touch
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Atomically stores a value, then evicts old entries if over budget."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Removes least recently used entries until the size budget holds."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, name in sorted(entries):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # Evicted concurrently by another worker
+            total -= size
+            with self._lock:
+                self.evictions += 1
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters of this process."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
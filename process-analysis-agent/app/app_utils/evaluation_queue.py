@@ -0,0 +1,186 @@
+"""
+app_utils/evaluation_queue.py
+Sampled background evaluation (SystemEvaluatorAgent off the critical path).
+
+run_workflow() returns as soon as the diagram is published and only submits
+an evaluation job here. A sampled share of runs (config.EVAL_SAMPLE_RATE,
+decided per session id, so a resumed run keeps its decision) is evaluated
+by config.EVAL_WORKERS asyncio tasks. The queue is bounded
+(config.EVAL_QUEUE_MAX): when it is full the job is dropped and counted -
+evaluation is telemetry and must never hold back workflows.
+
+Workers live on the event loop of the first submit; call drain() before
+that loop ends (CLI, batch) or jobs still queued are lost.
+"""
+
+import asyncio
+import hashlib
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app import config
+
+Evaluator = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# The p95 of queue lag / latency covers the most recent evaluations only, so
+# a long-running server keeps a constant memory footprint (mean and max are
+# exact over all evaluations)
+STATS_WINDOW = 1000
+
+
+def sampled(session_id: str, rate: float) -> bool:
+    """Deterministic sampling decision for a session (same answer on every call)."""
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) / 0x100000000 < rate
+
+
+class _Timings:
+    """Running count/sum/max of durations plus a bounded window for the p95."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def describe(self) -> Dict[str, Optional[float]]:
+        if not self.count:
+            return {"mean": None, "p95": None, "max": None}
+        ordered = sorted(self.recent)
+        return {
+            "mean": round(self.total / self.count, 3),
+            "p95": round(ordered[math.ceil(len(ordered) * 0.95) - 1], 3),
+            "max": round(self.max, 3),
+        }
+
+
+class EvaluationQueue:
+    """
+    Bounded queue of evaluation jobs processed by background tasks.
+
+    Args:
+        evaluate: Coroutine function run for each job (returns the evaluation)
+        workers: Evaluations running at once
+        max_size: Queued jobs beyond this are dropped
+        sample_rate: Share of runs evaluated (0..1)
+    """
+
+    def __init__(
+        self,
+        evaluate: Evaluator,
+        workers: int = config.EVAL_WORKERS,
+        max_size: int = config.EVAL_QUEUE_MAX,
+        sample_rate: float = config.EVAL_SAMPLE_RATE,
+    ):
+        self.evaluate = evaluate
+        self.workers = max(1, workers)
+        self.max_size = max(1, max_size)
+        self.sample_rate = sample_rate
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self.counts = {"submitted": 0, "sampled": 0, "dropped": 0, "completed": 0, "failed": 0}
+        self._lags = _Timings()
+        self._latencies = _Timings()
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First submit, or the previous event loop is gone (e.g. a new asyncio.run)
+        self._loop = loop
+        self._queue = asyncio.Queue(self.max_size)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def submit(self, job: Dict[str, Any]) -> bool:
+        """
+        Queues a job if its run is sampled (must be called on the event loop).
+
+        Args:
+            job: Needs 'session_id'; everything else is passed to evaluate()
+
+        Returns:
+            True if the job was queued
+        """
+        self.counts["submitted"] += 1
+        if not sampled(job["session_id"], self.sample_rate):
+            return False
+        self.counts["sampled"] += 1
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait({**job, "queued_at": time.perf_counter()})
+        except asyncio.QueueFull:
+            self.counts["dropped"] += 1
+            print(f"[Evaluation Queue] ⚠️ Queue full ({self.max_size}), evaluation of {job['session_id']} dropped")
+            return False
+        return True
+
+    async def evaluate_now(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Evaluates a sampled job inline (EVAL_BACKGROUND=false); None if not sampled."""
+        self.counts["submitted"] += 1
+        if not sampled(job["session_id"], self.sample_rate):
+            return None
+        self.counts["sampled"] += 1
+        self._lags.add(0.0)
+        start = time.perf_counter()
+        try:
+            evaluation = await self.evaluate(job)
+            self.counts["completed"] += 1
+            return evaluation
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        finally:
+            self._latencies.add(time.perf_counter() - start)
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            start = time.perf_counter()
+            self._lags.add(start - job.pop("queued_at"))
+            try:
+                await self.evaluate(job)
+                self.counts["completed"] += 1
+            except Exception as e:  # One failed evaluation must not stop the workers
+                self.counts["failed"] += 1
+                print(f"[Evaluation Queue] ❌ {job['session_id']}: {e}")
+            finally:
+                self._latencies.add(time.perf_counter() - start)
+                self._queue.task_done()
+
+    async def drain(self) -> None:
+        """Waits until every queued evaluation finished (no-op on another event loop)."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """Sample rate, job counts, queue lag and evaluator latency (seconds, p95 of the last STATS_WINDOW)."""
+        return {
+            "sample_rate": self.sample_rate,
+            **self.counts,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "queue_lag_s": self._lags.describe(),
+            "latency_s": self._latencies.describe(),
+        }
+
+    def print_summary(self) -> None:
+        stats = self.stats()
+        print(
+            f"🏅 Evaluations: {stats['completed']} done / {stats['sampled']} sampled of "
+            f"{stats['submitted']} runs (rate {stats['sample_rate']}), {stats['failed']} failed, "
+            f"{stats['dropped']} dropped, {stats['pending']} pending | "
+            f"queue lag mean {stats['queue_lag_s']['mean']}s | latency mean {stats['latency_s']['mean']}s "
+            f"p95 {stats['latency_s']['p95']}s"
+        )
@@ -0,0 +1,287 @@
+"""
+app_utils/instrumentation.py
+Token, latency and cost instrumentation (ADK plugin).
+
+Extends the per-stage wall time of StageTimingPlugin with
+- per agent: model calls, cache hits, input/output/thinking tokens, model
+  latency, retries (backoff retries of the model call scheduler), failed
+  calls (errors that reached the agent) and estimated cost (config.MODEL_PRICING)
+- per tool: calls, errors and wall time
+
+run_summary(session_id) aggregates everything for one workflow run (all
+metrics are kept per session, like the stage timings); the workflow stores
+it in the saved metadata JSON and appends it to config.METRICS_JSONL.
+Must be registered BEFORE the model cache plugin, otherwise cache hits
+are invisible (a short-circuiting plugin skips all later callbacks).
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.tool_context import ToolContext
+
+from app import config
+from app.app_utils.model_scheduler import observe_retries
+from app.app_utils.stage_timing import StageTimingPlugin
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimated USD cost of a model call (thinking tokens count as output)."""
+    pricing = config.MODEL_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    return (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
+
+
+def _new_agent_entry() -> Dict[str, Any]:
+    return {
+        "model": None,
+        "model_calls": 0,
+        "cache_hits": 0,
+        "retries": 0,
+        "failed_calls": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "thinking_tokens": 0,
+        "cached_input_tokens": 0,
+        "model_ms": 0.0,
+        "cost_usd": 0.0,
+    }
+
+
+class InstrumentationPlugin(StageTimingPlugin):
+    """Collects tokens, latency, retries and cost per agent and per tool."""
+
+    def __init__(self):
+        super().__init__()
+        self.name = "instrumentation"
+        # session id -> agent/tool name -> counters
+        self.agents: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.tools: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # (invocation_id, agent_name) -> (start time, model) of the model call in flight
+        self._model_started: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        # function_call_id -> start time of the tool call in flight
+        self._tool_started: Dict[str, float] = {}
+
+    # --- Model calls ---
+
+    def _agent_entry(self, callback_context: CallbackContext) -> Dict[str, Any]:
+        return self._entry(self._session_id(callback_context), callback_context.agent_name)
+
+    def _entry(self, session_id: str, agent_name: str) -> Dict[str, Any]:
+        return self.agents.setdefault(session_id, {}).setdefault(agent_name, _new_agent_entry())
+
+    def _count_retry(self, session_id: str, agent_name: str, error: Exception) -> None:
+        self._entry(session_id, agent_name)["retries"] += 1
+
+    def _close_as_cache_hit(self, callback_context: CallbackContext) -> None:
+        """A call without after_model_callback was answered by a later plugin (cache)."""
+        if self._model_started.pop(self._key(callback_context), None) is not None:
+            self._agent_entry(callback_context)["cache_hits"] += 1
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        key = self._key(callback_context)
+        self._close_as_cache_hit(callback_context)
+        self._model_started[key] = (time.perf_counter(), llm_request.model or "")
+        # The scheduler retries inside the model call, out of sight of the callbacks
+        observe_retries(
+            partial(self._count_retry, self._session_id(callback_context), callback_context.agent_name)
+        )
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+        started = self._model_started.pop(self._key(callback_context), None)
+        if started is None:
+            return None
+
+        start, model = started
+        entry = self._agent_entry(callback_context)
+        usage = llm_response.usage_metadata
+        input_tokens = (usage.prompt_token_count or 0) if usage else 0
+        output_tokens = (usage.candidates_token_count or 0) if usage else 0
+        thinking_tokens = (usage.thoughts_token_count or 0) if usage else 0
+
+        entry["model"] = model
+        entry["model_calls"] += 1
+        entry["input_tokens"] += input_tokens
+        entry["output_tokens"] += output_tokens
+        entry["thinking_tokens"] += thinking_tokens
+        entry["cached_input_tokens"] += (usage.cached_content_token_count or 0) if usage else 0
+        entry["model_ms"] += (time.perf_counter() - start) * 1000
+        entry["cost_usd"] += estimate_cost(model, input_tokens, output_tokens + thinking_tokens)
+        return None
+
+    async def on_model_error_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> Optional[LlmResponse]:
+        self._model_started.pop(self._key(callback_context), None)
+        self._agent_entry(callback_context)["failed_calls"] += 1  # Failed even after the scheduler's retries
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context: CallbackContext):
+        self._close_as_cache_hit(callback_context)
+        return await super().after_agent_callback(agent=agent, callback_context=callback_context)
+
+    # --- Tool calls ---
+
+    async def before_tool_callback(
+        self, *, tool, tool_args: Dict[str, Any], tool_context: ToolContext
+    ) -> Optional[dict]:
+        self._tool_started[tool_context.function_call_id or tool.name] = time.perf_counter()
+        return None
+
+    def _record_tool(self, tool_name: str, tool_context: ToolContext, failed: bool) -> None:
+        start = self._tool_started.pop(tool_context.function_call_id or tool_name, None)
+        tools = self.tools.setdefault(self._session_id(tool_context), {})
+        entry = tools.setdefault(tool_name, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["calls"] += 1
+        entry["errors"] += int(failed)
+        if start is not None:
+            duration_ms = (time.perf_counter() - start) * 1000
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+    async def after_tool_callback(
+        self, *, tool, tool_args: Dict[str, Any], tool_context: ToolContext, result: dict
+    ) -> Optional[dict]:
+        # Repo tools report failures as {"success": False, ...} instead of raising
+        failed = isinstance(result, dict) and result.get("success") is False
+        self._record_tool(tool.name, tool_context, failed)
+        return None
+
+    async def on_tool_error_callback(
+        self, *, tool, tool_args: Dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> Optional[dict]:
+        self._record_tool(tool.name, tool_context, True)
+        return None
+
+    # --- Reporting ---
+
+    @staticmethod
+    def _sum_entries(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Adds up the counters of one agent/tool over several sessions."""
+        merged = dict(entries[0])
+        for entry in entries[1:]:
+            for key, value in entry.items():
+                if key == "max_ms":
+                    merged[key] = max(merged[key], value)
+                elif isinstance(value, (int, float)):
+                    merged[key] += value
+        return merged
+
+    def run_summary(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Aggregated metrics of one run/session, or of all sessions (JSON-serialisable)."""
+        agents = {
+            name: self._sum_entries(entries)
+            for name, entries in self._merged(self.agents, session_id).items()
+        }
+        tools = {
+            name: self._sum_entries(entries)
+            for name, entries in self._merged(self.tools, session_id).items()
+        }
+        totals = {
+            key: sum(entry[key] for entry in agents.values())
+            for key in ("model_calls", "cache_hits", "retries", "failed_calls", "input_tokens",
+                        "output_tokens", "thinking_tokens", "cached_input_tokens")
+        }
+        totals["model_ms"] = round(sum(e["model_ms"] for e in agents.values()), 1)
+        totals["cost_usd"] = round(sum(e["cost_usd"] for e in agents.values()), 6)
+        totals["tool_calls"] = sum(e["calls"] for e in tools.values())
+        return {
+            "totals": totals,
+            "agents": {
+                name: {**e, "model_ms": round(e["model_ms"], 1), "cost_usd": round(e["cost_usd"], 6)}
+                for name, e in agents.items()
+            },
+            "tools": {
+                name: {**e, "total_ms": round(e["total_ms"], 1), "max_ms": round(e["max_ms"], 1)}
+                for name, e in tools.items()
+            },
+            "stages": self.summary(session_id),
+        }
+
+    def export_jsonl(self, path: str, session_id: Optional[str] = None, **fields: Any) -> str:
+        """
+        Appends the run summary as one JSON line (for trend analysis).
+
+        Args:
+            path: JSONL file (created if missing)
+            session_id: Session of the run (None: all sessions)
+            **fields: Extra top-level fields (e.g. pdf_path)
+
+        Returns:
+            The path written to
+        """
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "session_id": session_id,
+            **fields,
+            **self.run_summary(session_id),
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        return path
+
+    def reset(self, session_id: Optional[str] = None) -> None:
+        super().reset(session_id)
+        if session_id is None:
+            self.agents.clear()
+            self.tools.clear()
+            self._model_started.clear()
+            self._tool_started.clear()
+        else:
+            self.agents.pop(session_id, None)
+            self.tools.pop(session_id, None)
+
+    def print_summary(self, session_id: Optional[str] = None) -> None:
+        super().print_summary(session_id)
+        summary = self.run_summary(session_id)
+        if summary["agents"]:
+            print("\n💰 Model Usage (tokens in / out / thinking, est. cost):")
+            for name, entry in summary["agents"].items():
+                print(
+                    f"   {name:<28} {entry['model_calls']:>3}x "
+                    f"{entry['input_tokens']:>7} / {entry['output_tokens']:>6} / {entry['thinking_tokens']:>6} "
+                    f"${entry['cost_usd']:.4f}"
+                    + (f" ({entry['cache_hits']} cached)" if entry["cache_hits"] else "")
+                    + (f" ({entry['retries']} retries)" if entry["retries"] else "")
+                    + (f" ({entry['failed_calls']} failed)" if entry["failed_calls"] else "")
+                )
+        if summary["tools"]:
+            print("\n🔧 Tool Calls:")
+            for name, entry in summary["tools"].items():
+                print(
+                    f"   {name:<28} {entry['calls']:>3}x {entry['total_ms']:>10.1f} ms"
+                    + (f" ({entry['errors']} errors)" if entry["errors"] else "")
+                )
+        if not summary["agents"] and not summary["tools"]:
+            return
+        totals = summary["totals"]
+        print(
+            f"\n   Total: {totals['model_calls']} model calls, "
+            f"{totals['input_tokens'] + totals['output_tokens'] + totals['thinking_tokens']} tokens, "
+            f"~${totals['cost_usd']:.4f}"
+        )
+
+
+def create_instrumentation_plugin() -> Optional[InstrumentationPlugin]:
+    """Creates the plugin according to config.INSTRUMENTATION (None if off)."""
+    if not config.INSTRUMENTATION:
+        return None
+    return InstrumentationPlugin()
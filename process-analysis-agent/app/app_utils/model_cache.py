@@ -0,0 +1,165 @@
+"""
+app_utils/model_cache.py
+Record/replay cache for all LLM calls (ADK plugin).
+
+Key: model name + system instruction + rendered contents + generation config.
+Modes (config.MODEL_CACHE_MODE):
+- "off":    plugin is not installed.
+- "record": read-through cache - hits are served locally, misses call Gemini
+            and the response is stored.
+- "replay": hits are served locally, misses raise ModelCacheMissError. Lets
+            run_process_diagram_workflow run offline and deterministically
+            in tests and benchmarks.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from pydantic import BaseModel
+
+from app import config
+from app.app_utils.disk_cache import DiskCache
+
+MODE_OFF = "off"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# Bump when the key derivation changes
+KEY_VERSION = "2"
+
+
+class ModelCacheMissError(RuntimeError):
+    """Raised in replay mode when a model call has no recorded response."""
+
+
+class CacheBackend(Protocol):
+    """Anything with DiskCache's get/put interface can back the model cache."""
+
+    def get(self, key: str) -> Optional[Any]: ...
+
+    def put(self, key: str, value: Any) -> None: ...
+
+
+def _strip_volatile(contents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Removes the per-run ids of function calls/responses from dumped contents.
+
+    Only parts[*].function_call.id and parts[*].function_response.id - 'id'
+    keys inside the call arguments or the response payload (e.g. node ids of
+    a graph) are part of the request.
+    """
+    stripped = []
+    for content in contents:
+        parts = []
+        for part in content.get("parts") or []:
+            part = dict(part)
+            for field in ("function_call", "function_response"):
+                if isinstance(part.get(field), dict):
+                    part[field] = {k: v for k, v in part[field].items() if k != "id"}
+            parts.append(part)
+        stripped.append({**content, "parts": parts} if "parts" in content else content)
+    return stripped
+
+
+def request_cache_key(llm_request: LlmRequest) -> str:
+    """
+    Derives the cache key of a model call.
+
+    Args:
+        llm_request: The fully rendered request (after instruction templating)
+
+    Returns:
+        Hex SHA-256 key
+    """
+    # output_schema is set as a Pydantic class, which is not JSON-dumpable
+    schema = llm_request.config.response_schema
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        schema = schema.model_json_schema()
+    generation_config = llm_request.config.model_dump(
+        mode="json", exclude_none=True, exclude={"response_schema"}
+    )
+
+    payload = {
+        "version": KEY_VERSION,
+        "model": llm_request.model,
+        "config": generation_config,
+        "response_schema": schema,
+        "contents": _strip_volatile(
+            [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]
+        ),
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ModelCachePlugin(BasePlugin):
+    """
+    Serves model calls from a cache and records new responses.
+
+    Args:
+        mode: "record" or "replay"
+        backend: Storage with get/put (default: DiskCache in MODEL_CACHE_DIR)
+    """
+
+    def __init__(self, mode: str = MODE_RECORD, backend: Optional[CacheBackend] = None):
+        super().__init__(name="model_cache")
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unsupported model cache mode: {mode}")
+        self.mode = mode
+        self.backend = backend or DiskCache(
+            config.MODEL_CACHE_DIR, config.MODEL_CACHE_MAX_MB * 1024 * 1024
+        )
+        self.hits = 0
+        self.misses = 0
+        # (invocation_id, agent_name) -> key of the call in flight
+        self._pending: Dict[Tuple[str, str], str] = {}
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        key = request_cache_key(llm_request)
+        cached = self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return LlmResponse.model_validate(cached)
+
+        self.misses += 1
+        if self.mode == MODE_REPLAY:
+            raise ModelCacheMissError(
+                f"No recorded response for {callback_context.agent_name} "
+                f"({llm_request.model}, key {key[:12]}). Re-run with MODEL_CACHE_MODE=record."
+            )
+
+        self._pending[(callback_context.invocation_id, callback_context.agent_name)] = key
+        return None
+
+    async def after_model_callback(
+        self, *, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        if llm_response.partial:
+            return None
+
+        key = self._pending.pop(
+            (callback_context.invocation_id, callback_context.agent_name), None
+        )
+        if key and not llm_response.error_code:
+            self.backend.put(key, llm_response.model_dump(mode="json", exclude_none=True))
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this plugin instance."""
+        return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
+
+
+def create_model_cache_plugin() -> Optional[ModelCachePlugin]:
+    """Creates the plugin according to config.MODEL_CACHE_MODE (None if off)."""
+    if config.MODEL_CACHE_MODE == MODE_OFF:
+        return None
+    plugin = ModelCachePlugin(mode=config.MODEL_CACHE_MODE)
+    print(f"✅ Model call cache enabled (mode: {plugin.mode}, dir: {config.MODEL_CACHE_DIR})")
+    return plugin
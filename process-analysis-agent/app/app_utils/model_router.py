@@ -0,0 +1,219 @@
+"""
+app_utils/model_router.py
+Adaptive model routing (ADK plugin).
+
+Instead of the model hardwired in each agent, every LLM call gets its model
+and thinking budget from measurable signals in the session state:
+- document size: length of the extracted text (analysis agents)
+- graph size: node count of the conversion graph (or of the analysis steps)
+- previous result: quality loop scores / structural check, Mermaid fix-ups
+
+Every call starts on MODEL_FLASH_THINKING; a stage is escalated to MODEL_PRO
+only after Flash failed it in the same run (quality loop iteration below
+MIN_QUALITY_SCORE or failing the structural checks, Mermaid fix-up that did
+not validate). The SystemEvaluatorAgent (the Pro system judge) stays pinned
+to MODEL_PRO unless config.ROUTE_SYSTEM_EVALUATOR allows routing it too - a
+downgraded judge would change the scores, not the pipeline. Stages that skip
+the LLM entirely (approval/publication, see log_direct_route) are logged
+here as well.
+
+Must be registered BEFORE the instrumentation and model cache plugins: both
+read llm_request.model (the cache key includes model and config).
+"""
+
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.genai import types
+
+from app import config
+
+# Agent name prefix -> size signal that sets the thinking budget
+# (agents not listed are simple stages and get no thinking budget)
+_SIZE_SIGNALS = {
+    "PDFAnalysisAgent": "text",
+    "PDFAnalysisChunkAgent": "text",
+    "ConversionAgent": "graph",
+    "ConversionCandidate": "graph",
+    "QualityAgent": "graph",
+    "BatchQualityAgent": "graph",
+    "BPMNGenerationAgent": "graph",
+    "ValidationAgent": "graph",
+    "MermaidFixupAgent": "graph",
+    "SystemEvaluatorAgent": "graph",
+}
+# Pro cannot switch thinking off
+_PRO_MIN_THINKING_BUDGET = 128
+
+# Routing decisions (in call order, tagged with the session id)
+_log: List[Dict[str, Any]] = []
+
+
+def _size_signal(agent_name: str) -> Optional[str]:
+    for prefix, signal in _SIZE_SIGNALS.items():
+        if agent_name.startswith(prefix):
+            return signal
+    return None
+
+
+def routing_signals(state: Any, invocation_id: str) -> Dict[str, Any]:
+    """Measurable inputs of the routing policy (also logged with each decision)."""
+    text_chars = len(state.get("extracted_pdf_text") or "")
+    conversion = state.get("conversion_output")
+    analysis = state.get("pdf_analysis")
+    if isinstance(conversion, dict) and conversion.get("nodes"):
+        nodes = len(conversion["nodes"])
+    elif isinstance(analysis, dict):
+        nodes = len(analysis.get("steps") or [])
+    else:
+        nodes = 0
+
+    # Previous quality loop iteration of THIS run (QualityLoopController state)
+    loop = state.get("quality_loop") or {}
+    history = loop.get("history") if loop.get("invocation_id") == invocation_id else None
+    previous = history[-1] if history else None
+
+    validation = state.get("validation_result") or {}
+    return {
+        "text_chars": text_chars,
+        "nodes": nodes,
+        "loop_iteration": len(history or []),
+        # None: no judged iteration yet (or the structural pre-gate failed it)
+        "previous_score": previous["score"] if previous else None,
+        "previous_failed": bool(previous) and (
+            previous["score"] is None or previous["score"] < config.MIN_QUALITY_SCORE
+        ),
+        "fix_attempts": validation.get("fix_attempts", 0) if validation.get("errors") else 0,
+    }
+
+
+def route_model_call(agent_name: str, state: Any, invocation_id: str) -> Dict[str, Any]:
+    """
+    Decides model and thinking budget of one LLM call.
+
+    Args:
+        agent_name: Name of the calling agent
+        state: Session state (read only)
+        invocation_id: Current invocation (escalation only looks at this run)
+
+    Returns:
+        Decision dict with 'agent', 'model', 'thinking_budget', 'reason' and 'signals'
+    """
+    signals = routing_signals(state, invocation_id)
+    size_signal = _size_signal(agent_name)
+
+    if size_signal == "text":
+        text_chars = signals["text_chars"]
+        if agent_name.startswith("PDFAnalysisChunkAgent"):
+            text_chars = min(text_chars, config.ANALYSIS_CHUNK_CHARS)
+        large = text_chars > config.ROUTING_LARGE_TEXT_CHARS
+        reason = f"{'large' if large else 'small'} document ({text_chars} chars)"
+    elif size_signal == "graph":
+        large = signals["nodes"] > config.ROUTING_LARGE_GRAPH_NODES
+        reason = f"{'large' if large else 'small'} graph ({signals['nodes']} nodes)"
+    else:
+        large = None
+        reason = "simple stage"
+
+    budget = config.THINKING_BUDGETS["simple" if large is None else "large" if large else "small"]
+    model = config.MODEL_FLASH_THINKING
+
+    # Escalate only after Flash failed this stage in the current run
+    if agent_name.startswith("ConversionAgent") and signals["previous_failed"]:
+        model = config.MODEL_PRO
+        score = signals["previous_score"]
+        reason = (
+            f"previous iteration failed ({'structural checks' if score is None else f'score {score:.2f}'}), "
+            + reason
+        )
+    elif agent_name.startswith("MermaidFixupAgent") and signals["fix_attempts"] >= 1:
+        model = config.MODEL_PRO
+        reason = f"Flash fix-up did not validate ({signals['fix_attempts']} attempt(s)), " + reason
+
+    # Keep the system judge constant across runs (scores compare pipelines, not judges)
+    if agent_name.startswith("SystemEvaluatorAgent") and not config.ROUTE_SYSTEM_EVALUATOR:
+        model = config.MODEL_PRO
+        reason = "system judge pinned to Pro (ROUTE_SYSTEM_EVALUATOR=false)"
+
+    if model == config.MODEL_PRO:
+        budget = max(config.THINKING_BUDGETS["large"], _PRO_MIN_THINKING_BUDGET)
+
+    return {
+        "agent": agent_name,
+        "model": model,
+        "thinking_budget": budget,
+        "reason": reason,
+        "signals": signals,
+    }
+
+
+def log_direct_route(callback_context: CallbackContext, reason: str) -> None:
+    """Logs a stage that was handled without any LLM call."""
+    _log.append({
+        "session_id": callback_context.session.id,
+        "agent": callback_context.agent_name,
+        "model": None,
+        "thinking_budget": None,
+        "reason": reason,
+        "signals": {},
+    })
+    print(f"[Model Router] ⏩ {callback_context.agent_name}: no LLM ({reason})")
+
+
+class ModelRoutingPlugin(BasePlugin):
+    """Applies route_model_call() to every LLM request and logs the decision."""
+
+    def __init__(self):
+        super().__init__(name="model_routing")
+
+    async def before_model_callback(
+        self, *, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        decision = route_model_call(
+            callback_context.agent_name, callback_context.state, callback_context.invocation_id
+        )
+        decision["session_id"] = callback_context.session.id
+        decision["configured_model"] = llm_request.model
+        llm_request.model = decision["model"]
+        llm_request.config.thinking_config = types.ThinkingConfig(thinking_budget=decision["thinking_budget"])
+        _log.append(decision)
+        print(
+            f"[Model Router] 🧭 {decision['agent']}: {decision['model']} "
+            f"(thinking {decision['thinking_budget']}) - {decision['reason']}"
+        )
+        return None
+
+
+def routing_report(session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Routing decisions of one session or of all (JSON-serialisable, for tuning)."""
+    return [dict(d) for d in _log if session_id is None or d["session_id"] == session_id]
+
+
+def reset_routing_log(session_id: Optional[str] = None) -> None:
+    """Clears the logged decisions of one session (once its run is reported) or of all."""
+    _log[:] = [] if session_id is None else [d for d in _log if d["session_id"] != session_id]
+
+
+def print_routing_report(session_id: Optional[str] = None) -> None:
+    """Prints the number of calls per agent and model (nothing if no agent called a model)."""
+    decisions = routing_report(session_id)
+    if not any(decision["model"] for decision in decisions):
+        return
+    counts: Dict[str, Dict[str, int]] = {}
+    for decision in decisions:
+        model = decision["model"] or "no LLM"
+        counts.setdefault(decision["agent"], {}).setdefault(model, 0)
+        counts[decision["agent"]][model] += 1
+    print("\n🧭 Model Routing:")
+    for agent, models in counts.items():
+        print(f"   {agent:<28} " + ", ".join(f"{n}x {model}" for model, n in models.items()))
+
+
+def create_model_routing_plugin() -> Optional[ModelRoutingPlugin]:
+    """Creates the plugin according to config.MODEL_ROUTING (None if off)."""
+    if not config.MODEL_ROUTING:
+        return None
+    return ModelRoutingPlugin()
@@ -0,0 +1,451 @@
+"""
+app_utils/model_scheduler.py
+Process-wide, rate-limit-aware scheduler for Gemini calls.
+
+Every Gemini call of the process (all agents, all concurrent workflow runs)
+goes through one ModelCallScheduler:
+- token buckets per model for requests and tokens per minute
+  (config.MODEL_RATE_LIMITS); the token bucket is charged with an estimate
+  before the call and corrected with the reported usage afterwards
+- priority classes: waiting calls are dispatched by class ("interactive"
+  before "batch", see priority_class()), FIFO within a class
+- jittered exponential backoff on retryable errors (429 / 5xx / connection
+  errors), honouring the server's RetryInfo delay
+- a circuit breaker per model: after CIRCUIT_BREAKER_THRESHOLD consecutive
+  failures no calls are sent for CIRCUIT_BREAKER_COOLDOWN_S, then a single
+  trial call decides whether it closes again
+
+install_model_scheduler() registers ScheduledGemini for all 'gemini-*'
+model names, so agents keep their plain model strings. GEMINI_BASE_URL points
+the client at another endpoint (e.g. tests/fake_model_server.py).
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from functools import cached_property
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import Client, errors, types
+
+from app import config
+from app.app_utils.tokens import estimate_tokens
+
+# Lower value = dispatched first
+PRIORITY_CLASSES = {"interactive": 0, "batch": 1}
+
+_priority: ContextVar[str] = ContextVar("model_call_priority", default="interactive")
+
+# Notified of every retry of the model calls made from the current context
+# (set per call by the InstrumentationPlugin to count retries per agent)
+_retry_observer: ContextVar[Optional[Callable[[Exception], None]]] = ContextVar(
+    "model_call_retry_observer", default=None
+)
+
+
+@contextmanager
+def priority_class(name: str) -> Iterator[None]:
+    """Runs all model calls made inside the block (incl. spawned tasks) with this priority class."""
+    if name not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class: {name} (expected one of {list(PRIORITY_CLASSES)})")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def observe_retries(observer: Optional[Callable[[Exception], None]]) -> None:
+    """Sets the callback called with the error of each retry of the following model calls in this context."""
+    _retry_observer.set(observer)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a model's circuit is open longer than the caller may wait."""
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most one minute of budget."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until 'amount' is available (requests above capacity wait for a full bucket)."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate else 0.0
+
+    def consume(self, amount: float, now: float) -> None:
+        """Takes 'amount' (negative values give budget back; the level may go below 0)."""
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+    def drain(self, now: float) -> None:
+        """Empties the bucket (the server rejected a call the bucket allowed)."""
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open (one trial) after the cooldown."""
+
+    def __init__(self, threshold: int, cooldown_s: float):
+        self.threshold = threshold
+        self.cooldown_s = cooldown_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.opened_count = 0
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a call may be sent (0 = now)."""
+        if self.state == "closed":
+            return 0.0
+        if self.state == "open":
+            return max(0.0, self.opened_at + self.cooldown_s - now)
+        # Half-open: only one trial call at a time (poll until it finishes)
+        return min(self.cooldown_s, 1.0) if self.trial_in_flight else 0.0
+
+    def on_dispatch(self, now: float) -> None:
+        if self.state == "open" and now >= self.opened_at + self.cooldown_s:
+            self.state = "half_open"
+        if self.state == "half_open":
+            self.trial_in_flight = True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self, now: float) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+            self.state = "open"
+            self.opened_at = now
+            self.opened_count += 1
+
+
+class _ModelLane:
+    """Buckets, breaker, wait queue and counters of one model."""
+
+    def __init__(self, limits: Dict[str, int], breaker: CircuitBreaker, now: float):
+        self.rpm = TokenBucket(limits["rpm"], now)
+        self.tpm = TokenBucket(limits["tpm"], now)
+        self.breaker = breaker
+        self.waiters: List[Tuple[int, int]] = []  # heap of (priority, sequence)
+        self.condition: Optional[asyncio.Condition] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {
+            "calls": 0, "succeeded": 0, "failed": 0, "retries": 0,
+            "rate_limited": 0, "rejected": 0, "throttled_ms": 0.0,
+            "queued_ms_by_priority": {name: 0.0 for name in PRIORITY_CLASSES},
+        }
+
+    def get_condition(self) -> asyncio.Condition:
+        # asyncio primitives are bound to one event loop (each asyncio.run() has its own)
+        loop = asyncio.get_running_loop()
+        if self.condition is None or self.loop is not loop:
+            self.condition = asyncio.Condition()
+            self.loop = loop
+            self.waiters = []
+        return self.condition
+
+
+def _retry_delay_hint(error: Exception) -> Optional[float]:
+    """Server-suggested delay from a google.rpc.RetryInfo detail (e.g. '12s')."""
+    details = getattr(error, "details", None)
+    match = re.search(r"'retryDelay': '([\d.]+)s'", str(details)) if details else None
+    return float(match.group(1)) if match else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """429, 5xx from the API and transport-level failures are retried."""
+    if isinstance(error, errors.APIError):
+        return error.code in config.RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+class ModelCallScheduler:
+    """Rate limiting, prioritisation, retries and circuit breaking for model calls."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, int]]] = None,
+        default_limits: Optional[Dict[str, int]] = None,
+        max_retries: int = config.MODEL_CALL_MAX_RETRIES,
+        backoff_base_s: float = config.MODEL_BACKOFF_BASE_S,
+        backoff_max_s: float = config.MODEL_BACKOFF_MAX_S,
+        breaker_threshold: int = config.CIRCUIT_BREAKER_THRESHOLD,
+        breaker_cooldown_s: float = config.CIRCUIT_BREAKER_COOLDOWN_S,
+        max_wait_s: float = config.MODEL_CALL_MAX_WAIT_S,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+        rng: Callable[[], float] = random.random,
+    ):
+        self.limits = limits if limits is not None else config.MODEL_RATE_LIMITS
+        self.default_limits = default_limits or config.DEFAULT_MODEL_RATE_LIMIT
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown_s = breaker_cooldown_s
+        self.max_wait_s = max_wait_s
+        # Throttling waits and backoffs use these two (tests pass a fake clock)
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._sequence = itertools.count()
+
+    def _lane(self, model: str) -> _ModelLane:
+        if model not in self._lanes:
+            self._lanes[model] = _ModelLane(
+                self.limits.get(model, self.default_limits),
+                CircuitBreaker(self.breaker_threshold, self.breaker_cooldown_s),
+                self.clock(),
+            )
+        return self._lanes[model]
+
+    async def acquire(self, model: str, tokens: int, priority: Optional[str] = None) -> None:
+        """
+        Waits until a call of 'tokens' estimated tokens may be sent to 'model'.
+
+        Raises:
+            CircuitOpenError: The circuit stays open longer than MODEL_CALL_MAX_WAIT_S
+        """
+        priority = priority or _priority.get()
+        lane = self._lane(model)
+        condition = lane.get_condition()
+        waiter = (PRIORITY_CLASSES[priority], next(self._sequence))
+        start = self.clock()
+
+        async with condition:
+            heapq.heappush(lane.waiters, waiter)
+            try:
+                while True:
+                    timeout = None
+                    if lane.waiters[0] == waiter:
+                        now = self.clock()
+                        breaker_wait = lane.breaker.wait_time(now)
+                        if lane.breaker.state == "open" and now - start + breaker_wait > self.max_wait_s:
+                            lane.stats["rejected"] += 1
+                            raise CircuitOpenError(
+                                f"Circuit for {model} is open (retry in {breaker_wait:.0f}s)"
+                            )
+                        timeout = max(breaker_wait, lane.rpm.wait_time(1, now), lane.tpm.wait_time(tokens, now))
+                        if timeout <= 0:
+                            lane.breaker.on_dispatch(now)
+                            lane.rpm.consume(1, now)
+                            lane.tpm.consume(tokens, now)
+                            break
+                    # Woken early when the head of the queue changes
+                    await self._wait(condition, timeout)
+            finally:
+                lane.waiters.remove(waiter)
+                heapq.heapify(lane.waiters)
+                condition.notify_all()
+
+        waited_ms = (self.clock() - start) * 1000
+        lane.stats["calls"] += 1
+        lane.stats["throttled_ms"] += waited_ms
+        lane.stats["queued_ms_by_priority"][priority] += waited_ms
+
+    async def _wait(self, condition: asyncio.Condition, timeout: Optional[float]) -> None:
+        """Waits until notified or until 'timeout' seconds passed on self.clock (None: until notified)."""
+        if timeout is None:
+            await condition.wait()
+            return
+        notified = asyncio.ensure_future(condition.wait())
+        timer = asyncio.ensure_future(self.sleep(timeout))
+        try:
+            await asyncio.wait({notified, timer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            timer.cancel()
+            if not notified.done():
+                notified.cancel()
+            with suppress(asyncio.CancelledError):
+                await notified  # Holds the lock again afterwards, like condition.wait()
+
+    def settle(self, model: str, estimated_tokens: int, actual_tokens: int) -> None:
+        """Corrects the token bucket once the real usage of a call is known."""
+        self._lane(model).tpm.consume(actual_tokens - estimated_tokens, self.clock())
+
+    def record_success(self, model: str) -> None:
+        lane = self._lane(model)
+        lane.breaker.record_success()
+        lane.stats["succeeded"] += 1
+
+    def retry_delay(self, model: str, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Records a failed call and returns the backoff before the next attempt.
+
+        Returns:
+            Seconds to wait, or None if the error is not retryable / retries are exhausted
+        """
+        lane = self._lane(model)
+        if not is_retryable(error):
+            lane.breaker.record_success()  # A bad request says nothing about the backend
+            lane.stats["failed"] += 1
+            return None
+
+        lane.breaker.record_failure(self.clock())
+        if isinstance(error, errors.APIError) and error.code == 429:
+            lane.stats["rate_limited"] += 1
+            # The server saw more than the bucket allows: drain it
+            lane.rpm.drain(self.clock())
+        if attempt >= self.max_retries:
+            lane.stats["failed"] += 1
+            return None
+
+        lane.stats["retries"] += 1
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        backoff = self.rng() * min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt)
+        return max(backoff, _retry_delay_hint(error) or 0.0)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model counters (JSON-serialisable)."""
+        return {
+            model: {
+                **{k: v for k, v in lane.stats.items() if k not in ("throttled_ms", "queued_ms_by_priority")},
+                "throttled_ms": round(lane.stats["throttled_ms"], 1),
+                "queued_ms_by_priority": {
+                    k: round(v, 1) for k, v in lane.stats["queued_ms_by_priority"].items()
+                },
+                "circuit": lane.breaker.state,
+                "circuit_opened": lane.breaker.opened_count,
+            }
+            for model, lane in self._lanes.items()
+        }
+
+    def reset_stats(self) -> None:
+        """Clears the counters (buckets and breakers keep their state)."""
+        for lane in self._lanes.values():
+            for key in ("calls", "succeeded", "failed", "retries", "rate_limited", "rejected"):
+                lane.stats[key] = 0
+            lane.stats["throttled_ms"] = 0.0
+            lane.stats["queued_ms_by_priority"] = {name: 0.0 for name in PRIORITY_CLASSES}
+            lane.breaker.opened_count = 0
+
+    def print_summary(self) -> None:
+        """Prints calls, retries and throttling per model (models without calls are left out)."""
+        rows = {model: row for model, row in self.stats().items() if row["calls"]}
+        if not rows:
+            return
+        print("\n🚦 Model Call Scheduler:")
+        for model, row in rows.items():
+            print(
+                f"   {model:<28} {row['calls']:>3} calls, {row['retries']} retries, "
+                f"{row['rate_limited']}x 429, {row['failed']} failed, {row['rejected']} rejected, "
+                f"throttled {row['throttled_ms']:.0f} ms, circuit {row['circuit']}"
+            )
+
+
+_scheduler: Optional[ModelCallScheduler] = None
+
+
+def get_model_scheduler() -> ModelCallScheduler:
+    """The process-wide scheduler (created on first use)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ModelCallScheduler()
+    return _scheduler
+
+
+def set_model_scheduler(scheduler: Optional[ModelCallScheduler]) -> None:
+    """Replaces the process-wide scheduler (e.g. with custom limits in load tests)."""
+    global _scheduler
+    _scheduler = scheduler
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+    """Prompt (instruction + contents) plus the expected output, for the token bucket."""
+    text = str(llm_request.config.system_instruction or "") if llm_request.config else ""
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            text += part.text or ""
+            if part.function_call or part.function_response:
+                text += str(part.function_call or part.function_response)
+    return estimate_tokens(text) + config.MODEL_CALL_OUTPUT_TOKEN_ESTIMATE
+
+
+class ScheduledGemini(Gemini):
+    """Gemini whose calls go through the process-wide ModelCallScheduler."""
+
+    @cached_property
+    def api_client(self) -> Client:
+        if not config.GEMINI_BASE_URL:
+            return super().api_client
+        return Client(
+            http_options=types.HttpOptions(
+                base_url=config.GEMINI_BASE_URL,
+                headers=self._tracking_headers,
+                retry_options=self.retry_options,
+            )
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        scheduler = get_model_scheduler()
+        model = llm_request.model or self.model
+        estimate = estimate_request_tokens(llm_request)
+        attempt = 0
+        while True:
+            await scheduler.acquire(model, estimate)
+            yielded = False
+            try:
+                async for response in super().generate_content_async(llm_request, stream):
+                    if response.usage_metadata and not response.partial:
+                        scheduler.settle(model, estimate, response.usage_metadata.total_token_count or 0)
+                    if not yielded:
+                        # The backend answered - recorded now, as the consumer may stop
+                        # reading early (a half-open trial would otherwise never finish)
+                        scheduler.record_success(model)
+                        yielded = True
+                    yield response
+                if not yielded:
+                    scheduler.record_success(model)
+                return
+            except Exception as e:
+                delay = scheduler.retry_delay(model, e, attempt)
+                # A partially streamed answer cannot be retried transparently
+                if delay is None or yielded:
+                    raise
+                attempt += 1
+                observer = _retry_observer.get()
+                if observer:
+                    observer(e)
+                print(
+                    f"[Model Scheduler] 🔁 {model}: {type(e).__name__} "
+                    f"({getattr(e, 'code', '')}), retry {attempt}/{scheduler.max_retries} in {delay:.1f}s"
+                )
+                await scheduler.sleep(delay)
+
+
+def install_model_scheduler() -> bool:
+    """Routes all 'gemini-*' models through ScheduledGemini (if config.MODEL_SCHEDULER)."""
+    if not config.MODEL_SCHEDULER:
+        return False
+    LLMRegistry.register(ScheduledGemini)
+    LLMRegistry.resolve.cache_clear()  # Model names resolved before stay on plain Gemini otherwise
+    return True
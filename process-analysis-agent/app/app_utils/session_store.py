@@ -0,0 +1,158 @@
+"""
+app_utils/session_store.py
+Bounded in-memory session store.
+
+InMemorySessionService keeps every session (with all its events, incl. the
+extracted PDF text) forever. BoundedInMemorySessionService evicts finished
+sessions:
+- TTL: sessions not accessed for config.SESSION_TTL_S
+- LRU: least recently used sessions while the estimated store size exceeds
+  config.SESSION_STORE_MAX_MB
+
+Sessions of a running workflow are pinned (mark_active / mark_finished) and
+never evicted. stats() reports the store size for monitoring.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+
+from app import config
+
+SessionKey = Tuple[str, str, str]  # (app_name, user_id, session_id)
+
+
+class BoundedInMemorySessionService(InMemorySessionService):
+    """InMemorySessionService with TTL/LRU eviction under a memory cap."""
+
+    def __init__(
+        self,
+        ttl_s: float = config.SESSION_TTL_S,
+        max_bytes: int = int(config.SESSION_STORE_MAX_MB * 1024 * 1024),
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__()
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.clock = clock
+        # LRU order (oldest first): key -> {"bytes": int, "last_access": float}
+        self._entries: "OrderedDict[SessionKey, Dict[str, float]]" = OrderedDict()
+        self._active: Dict[SessionKey, int] = {}
+        self.evicted = {"ttl": 0, "lru": 0}
+
+    def _touch(self, key: SessionKey, added_bytes: int = 0) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry["bytes"] += added_bytes
+        entry["last_access"] = self.clock()
+        self._entries.move_to_end(key)
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        await self.evict()
+        session = await super().create_session(
+            app_name=app_name, user_id=user_id, state=state, session_id=session_id
+        )
+        self._entries[(app_name, user_id, session.id)] = {
+            "bytes": len(json.dumps(state or {}, default=str)),
+            "last_access": self.clock(),
+        }
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config=None) -> Optional[Session]:
+        session = await super().get_session(
+            app_name=app_name, user_id=user_id, session_id=session_id, config=config
+        )
+        if session:
+            self._touch((app_name, user_id, session_id))
+        return session
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        if not event.partial:
+            self._touch(
+                (session.app_name, session.user_id, session.id),
+                len(event.model_dump_json(exclude_none=True)),
+            )
+        return event
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._entries.pop((app_name, user_id, session_id), None)
+
+    # --- Pinning ---
+
+    def mark_active(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Pins a session while a workflow runs on it."""
+        key = (app_name, user_id, session_id)
+        self._active[key] = self._active.get(key, 0) + 1
+
+    def mark_finished(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Releases the pin; the session becomes evictable."""
+        key = (app_name, user_id, session_id)
+        remaining = self._active.get(key, 0) - 1
+        if remaining > 0:
+            self._active[key] = remaining
+        else:
+            self._active.pop(key, None)
+        self._touch(key)
+
+    def is_active(self, app_name: str, user_id: str, session_id: str) -> bool:
+        return (app_name, user_id, session_id) in self._active
+
+    # --- Eviction ---
+
+    async def evict(self) -> int:
+        """
+        Deletes expired sessions, then least recently used ones until the
+        store fits into max_bytes. Active sessions are skipped.
+
+        Returns:
+            Number of evicted sessions
+        """
+        now = self.clock()
+        evicted = 0
+        for key, entry in list(self._entries.items()):
+            if key not in self._active and now - entry["last_access"] > self.ttl_s:
+                await self.delete_session(app_name=key[0], user_id=key[1], session_id=key[2])
+                self.evicted["ttl"] += 1
+                evicted += 1
+
+        for key in list(self._entries):  # Oldest first
+            if self.size_bytes() <= self.max_bytes:
+                break
+            if key not in self._active:
+                await self.delete_session(app_name=key[0], user_id=key[1], session_id=key[2])
+                self.evicted["lru"] += 1
+                evicted += 1
+        return evicted
+
+    def size_bytes(self) -> int:
+        """Estimated size of all stored sessions (serialised events + initial state)."""
+        return int(sum(entry["bytes"] for entry in self._entries.values()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Store size metrics (JSON-serialisable)."""
+        now = self.clock()
+        return {
+            "sessions": len(self._entries),
+            "active": len(self._active),
+            "size_mb": round(self.size_bytes() / (1024 * 1024), 3),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 3),
+            "ttl_s": self.ttl_s,
+            "oldest_age_s": round(now - min(e["last_access"] for e in self._entries.values()), 1)
+            if self._entries else 0.0,
+            "evicted_ttl": self.evicted["ttl"],
+            "evicted_lru": self.evicted["lru"],
+        }
@@ -0,0 +1,114 @@
+"""
+app_utils/stage_timing.py
+Per-stage wall-clock timing (ADK plugin).
+
+Measures every agent run (LLM agents, deterministic stages and the
+composite Sequential/Loop agents) from before_agent_callback to
+after_agent_callback and aggregates by agent name, so deterministic stages
+can be compared with the LLM round-trips they replace.
+
+Measurements are kept per session, so concurrent workflow runs do not mix
+(summary(session_id) / reset(session_id); without an id all sessions).
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.plugins.base_plugin import BasePlugin
+
+from app import config
+
+
+class StageTimingPlugin(BasePlugin):
+    """Collects call counts and wall time per session and agent name."""
+
+    def __init__(self):
+        super().__init__(name="stage_timing")
+        # session id -> agent name -> {"calls": int, "total_ms": float, "max_ms": float}
+        self.timings: Dict[str, Dict[str, Dict[str, float]]] = {}
+        # (invocation_id, agent_name) -> start time of the run in flight
+        self._started: Dict[Tuple[str, str], float] = {}
+        # Names of Sequential/Loop agents (their rows only wrap the stages)
+        self._composites: Set[str] = set()
+
+    @staticmethod
+    def _key(callback_context: CallbackContext) -> Tuple[str, str]:
+        return (callback_context.invocation_id, callback_context.agent_name)
+
+    @staticmethod
+    def _session_id(callback_context: CallbackContext) -> str:
+        return callback_context.session.id
+
+    @staticmethod
+    def _merged(per_session: Dict[str, Dict[str, Any]], session_id: Optional[str]) -> Dict[str, List[Any]]:
+        """name -> entries of one session (or of all sessions), in first-seen order."""
+        sessions = [per_session.get(session_id, {})] if session_id is not None else per_session.values()
+        merged: Dict[str, List[Any]] = {}
+        for entries in sessions:
+            for name, entry in entries.items():
+                merged.setdefault(name, []).append(entry)
+        return merged
+
+    async def before_agent_callback(self, *, agent, callback_context: CallbackContext):
+        if getattr(agent, "sub_agents", None):
+            self._composites.add(agent.name)
+        self._started[self._key(callback_context)] = time.perf_counter()
+        return None
+
+    async def after_agent_callback(self, *, agent, callback_context: CallbackContext):
+        started = self._started.pop(self._key(callback_context), None)
+        if started is not None:
+            self.record(
+                callback_context.agent_name,
+                (time.perf_counter() - started) * 1000,
+                self._session_id(callback_context),
+            )
+        return None
+
+    def record(self, stage: str, duration_ms: float, session_id: str = "") -> None:
+        """Adds one measured run of a stage."""
+        timings = self.timings.setdefault(session_id, {})
+        entry = timings.setdefault(stage, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["calls"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+    def summary(self, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-stage rows in first-run order (total/max rounded to 0.1 ms)."""
+        return [
+            {
+                "stage": stage,
+                "calls": int(sum(e["calls"] for e in entries)),
+                "total_ms": round(sum(e["total_ms"] for e in entries), 1),
+                "max_ms": round(max(e["max_ms"] for e in entries), 1),
+            }
+            for stage, entries in self._merged(self.timings, session_id).items()
+        ]
+
+    def reset(self, session_id: Optional[str] = None) -> None:
+        """Clears the measurements of one session (e.g. once its run is reported) or of all."""
+        if session_id is None:
+            self.timings.clear()
+            self._started.clear()
+        else:
+            self.timings.pop(session_id, None)
+
+    def print_summary(self, session_id: Optional[str] = None) -> None:
+        """Prints the per-stage timing table (nothing if no stage ran, e.g. a resumed run that only skipped)."""
+        rows = self.summary(session_id)
+        if all(row["stage"] in self._composites for row in rows):
+            return
+        print("\n⏱️ Stage Timing:")
+        for row in rows:
+            print(
+                f"   {row['stage']:<28} {row['calls']:>3}x "
+                f"{row['total_ms']:>10.1f} ms (max {row['max_ms']:.1f} ms)"
+            )
+
+
+def create_stage_timing_plugin() -> Optional[StageTimingPlugin]:
+    """Creates the plugin according to config.STAGE_TIMING (None if off)."""
+    if not config.STAGE_TIMING:
+        return None
+    return StageTimingPlugin()
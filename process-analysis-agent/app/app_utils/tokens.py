@@ -0,0 +1,23 @@
+"""
+app_utils/tokens.py
+Cheap, dependency-free token estimates for prompt sizing and benchmarks.
+"""
+
+# Gemini tokenizes typical English/German business prose at roughly
+# 4 characters per token. Good enough for relative comparisons.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of model tokens for a piece of text.
+
+    Args:
+        text: Arbitrary text (prompt, tool output, model response)
+
+    Returns:
+        Approximate token count (0 for empty input)
+    """
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
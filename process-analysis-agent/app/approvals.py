@@ -0,0 +1,345 @@
+"""
+approvals.py
+APPROVAL ENTRY POINT: reviews queued diagrams and publishes them on a worker pool
+
+Usage:
+    uv run python -m app.approvals list
+    uv run python -m app.approvals review [--document NAME] [--details]
+    uv run python -m app.approvals approve <session_id>... | --all | --document NAME
+                                           [--reason TEXT] [--reviewer NAME] [--no-publish]
+    uv run python -m app.approvals reject <session_id>... | --all | --document NAME
+                                          [--reason TEXT] [--reviewer NAME] [--no-publish]
+    uv run python -m app.approvals work [--workers N]
+    uv run python -m app.approvals stats
+
+Runs paused at the ApprovalAgent (config.APPROVAL_QUEUE) hold no session or
+worker while they wait. submit_decision() records a reviewer's decision;
+ApprovalWorkerPool resumes decided runs from their checkpoint at the
+ApprovalAgent, so the PublicationAgent publishes (or halts) them.
+approve/reject publish right away unless --no-publish; 'work' processes
+every decision that is still waiting for a worker.
+
+'review' groups pending requests by document and shows each graph's
+structural diff against the document's last approved version, so many
+runs can be decided in one approve/reject. Approving a graph makes it the
+new baseline: pending runs of that document with an identical graph are
+then approved as well (config.AUTO_APPROVE_UNCHANGED).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from app import config
+from app.app_utils.approval_queue import AUTO_REVIEWER, get_approval_queue
+from app.tools.graph_diff import diff_graphs, format_diff
+
+
+def _require_queue():
+    queue = get_approval_queue()
+    if queue is None:
+        raise RuntimeError("Approval queue is off (set APPROVAL_QUEUE=true and CHECKPOINTS=true)")
+    return queue
+
+
+def list_pending(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Pending approval requests, oldest first."""
+    return _require_queue().pending(limit)
+
+
+def queue_stats() -> Dict[str, Any]:
+    """Pending-queue depth and age, decisions waiting for a worker."""
+    return _require_queue().stats()
+
+
+def review_batches(document: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Pending requests grouped by document, oldest group first.
+
+    Args:
+        document: Only this document: its key as shown by 'review'
+            (revision_store.document_key) or its PDF file name without
+            extension (same-named PDFs of every folder)
+
+    Returns:
+        [{'document', 'baseline' (session_id/approved_at of the last approved
+        version, or None), 'items' (pending requests, each with its 'diff'
+        against the baseline)}]
+    """
+    queue = _require_queue()
+    batches: Dict[str, Dict[str, Any]] = {}
+    for item in queue.pending():
+        key = item["document"] or "unknown_source"
+        if document is not None and document not in (key, key.rsplit("-", 1)[0]):
+            continue
+        if key not in batches:
+            baseline = queue.last_approved(key)
+            batches[key] = {"document": key, "baseline": baseline, "items": []}
+        baseline = batches[key]["baseline"]
+        item["diff"] = diff_graphs(baseline["graph"] if baseline else None, item["graph"])
+        batches[key]["items"].append(item)
+    for batch in batches.values():
+        if batch["baseline"]:
+            batch["baseline"] = {k: v for k, v in batch["baseline"].items() if k != "graph"}
+    return list(batches.values())
+
+
+def auto_approve_unchanged() -> List[str]:
+    """Approves pending requests whose graph equals their document's approved one."""
+    if not config.AUTO_APPROVE_UNCHANGED:
+        return []
+    unchanged = [
+        item["session_id"]
+        for batch in review_batches()
+        for item in batch["items"]
+        if item["graph"] and item["diff"]["unchanged"]
+    ]
+    return _require_queue().decide_many(unchanged, True, "", AUTO_REVIEWER)
+
+
+class ApprovalWorkerPool:
+    """
+    Resumes decided runs with bounded concurrency.
+
+    Args:
+        workers: Runs resumed at once (config.APPROVAL_WORKERS)
+    """
+
+    def __init__(self, workers: int = config.APPROVAL_WORKERS):
+        self.workers = max(1, workers)
+        self.results: List[Dict[str, Any]] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight: Set[str] = set()
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def notify(self) -> int:
+        """Queues every decided, not yet resumed run; returns how many were added."""
+        added = 0
+        for item in _require_queue().decided():
+            if item["session_id"] not in self._in_flight:
+                self._in_flight.add(item["session_id"])
+                self._queue.put_nowait(item)
+                added += 1
+        return added
+
+    async def drain(self) -> List[Dict[str, Any]]:
+        """Processes all decisions recorded so far and waits for them."""
+        self.notify()
+        await self._queue.join()
+        return self.results
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _work(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                outcome = await self._resume(item)
+                if outcome:
+                    self.results.append(outcome)
+            except Exception as e:  # One broken run must not stop the pool
+                print(f"[Approval Workers] ❌ {item['session_id']}: {e}")
+            finally:
+                self._in_flight.discard(item["session_id"])
+                self._queue.task_done()
+
+    async def _resume(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        from app import agent as workflow
+        from app.app_utils.checkpoints import get_checkpoint_store
+
+        session_id = item["session_id"]
+        checkpoint = get_checkpoint_store().load(session_id)
+        if checkpoint is None or checkpoint["status"] == "completed":
+            outcome = {"error": "No resumable checkpoint"}
+            _require_queue().mark_done(session_id, outcome)
+            return {"session_id": session_id, **outcome}
+        if checkpoint["status"] != "paused" or workflow.get_session_service().is_active(
+            checkpoint["app_name"], checkpoint["user_id"], session_id
+        ):
+            # Decided before the run was released - picked up by the next notify()
+            print(f"[Approval Workers] ⏳ {session_id}: run not released yet, retried later")
+            return None
+
+        start = time.perf_counter()
+        status = "APPROVED" if item["status"] == "approved" else "REJECTED"
+        print(f"[Approval Workers] ▶️ {session_id}: {status}, resuming publication")
+        result = await workflow.resume_workflow(
+            session_id, priority="batch", state_updates={"approval_status": status}
+        )
+        outcome = {
+            "approval_status": result["state"].get("approval_status"),
+            "metadata_path": result["metadata_path"],
+            "publication_result": result["state"].get("publication_result"),
+            "error": result["error"],
+            "duration_s": round(time.perf_counter() - start, 2),
+        }
+        _require_queue().mark_done(session_id, outcome)
+        return {"session_id": session_id, **outcome}
+
+
+async def submit_decisions(
+    session_ids: List[str],
+    approved: bool,
+    reason: str = "",
+    reviewer: str = "",
+    pool: Optional[ApprovalWorkerPool] = None
+) -> List[str]:
+    """
+    Records one reviewer decision for many runs (async API for servers).
+
+    Approving also approves pending runs that are unchanged from the new
+    baselines (config.AUTO_APPROVE_UNCHANGED).
+
+    Args:
+        session_ids: Sessions of the paused runs
+        approved: True publishes, False rejects
+        reason: Optional comment (kept in the queue)
+        reviewer: Optional reviewer name
+        pool: Running worker pool to hand the runs to right away
+
+    Returns:
+        The sessions decided, including auto-approved ones (sessions without
+        a pending approval request are ignored)
+    """
+    queue = _require_queue()
+    decided = await asyncio.to_thread(queue.decide_many, session_ids, approved, reason, reviewer)
+    if decided and approved:
+        decided += await asyncio.to_thread(auto_approve_unchanged)
+    if decided and pool is not None:
+        pool.notify()
+    return decided
+
+
+async def submit_decision(
+    session_id: str,
+    approved: bool,
+    reason: str = "",
+    reviewer: str = "",
+    pool: Optional[ApprovalWorkerPool] = None
+) -> bool:
+    """
+    Records a reviewer decision for one run (see submit_decisions).
+
+    Returns:
+        False if the session has no pending approval request
+    """
+    return session_id in await submit_decisions([session_id], approved, reason, reviewer, pool)
+
+
+async def process_decisions(workers: int = config.APPROVAL_WORKERS) -> List[Dict[str, Any]]:
+    """Resumes every decided run once (worker pool of the given size)."""
+    from app import agent as workflow
+
+    pool = ApprovalWorkerPool(workers)
+    await pool.start()
+    try:
+        return await pool.drain()
+    finally:
+        await pool.stop()
+        await workflow.drain_evaluations()  # Resumed runs evaluate when they complete
+
+
+def print_pending(items: List[Dict[str, Any]]) -> None:
+    now = time.time()
+    print(f"\n📥 {len(items)} pending approval(s):")
+    for item in items:
+        graph = item["graph"] or {}
+        print(
+            f"   {item['session_id']:<40} {now - item['requested_at']:>8.0f}s  "
+            f"{len(graph.get('nodes') or [])} nodes / {len(graph.get('edges') or [])} edges  "
+            f"{os.path.basename(item['pdf_path'] or '')}"
+        )
+
+
+def print_review(batches: List[Dict[str, Any]], details: bool = False) -> None:
+    now = time.time()
+    total = sum(len(batch["items"]) for batch in batches)
+    print(f"\n📥 {total} pending approval(s) in {len(batches)} document(s):")
+    for batch in batches:
+        baseline = batch["baseline"]
+        print(f"\n   📄 {batch['document']}  (last approved: "
+              + (f"{baseline['session_id']}, {now - baseline['approved_at']:.0f}s ago)" if baseline else "never)"))
+        for item in batch["items"]:
+            print(f"      {item['session_id']:<40} {now - item['requested_at']:>8.0f}s  {item['diff']['summary']}")
+            if details:
+                for line in format_diff(item["diff"], indent=" " * 9):
+                    print(line)
+
+
+def _selected_sessions(args) -> List[str]:
+    if args.all or args.document:
+        return [item["session_id"] for batch in review_batches(args.document) for item in batch["items"]]
+    return args.session_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Pending approvals, oldest first")
+    review = commands.add_parser("review", help="Pending approvals by document with diffs to the approved version")
+    review.add_argument("--document", help="Only this document (key from 'review' or PDF file name without extension)")
+    review.add_argument("--details", action="store_true", help="List every node/edge change")
+    commands.add_parser("stats", help="Queue depth/age as JSON")
+    work = commands.add_parser("work", help="Resume all decided runs")
+    work.add_argument("--workers", type=int, default=config.APPROVAL_WORKERS)
+    for name in ("approve", "reject"):
+        decide = commands.add_parser(name)
+        decide.add_argument("session_ids", nargs="*", metavar="session_id")
+        decide.add_argument("--all", action="store_true", help="Every pending approval")
+        decide.add_argument("--document", help="Every pending approval of this document")
+        decide.add_argument("--reason", default="")
+        decide.add_argument("--reviewer", default=os.getenv("USER", ""))
+        decide.add_argument("--no-publish", action="store_true", help="Only record the decision")
+        decide.add_argument("--workers", type=int, default=config.APPROVAL_WORKERS)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print_pending(list_pending())
+        return
+    if args.command == "review":
+        print_review(review_batches(args.document), args.details)
+        return
+    if args.command == "stats":
+        print(json.dumps(queue_stats(), indent=2))
+        return
+    if args.command in ("approve", "reject"):
+        session_ids = _selected_sessions(args)
+        if not session_ids:
+            if args.all or args.document:
+                print("📭 No pending approvals")
+                return
+            parser.error(f"{args.command}: give session ids, --all or --document")
+        approved = args.command == "approve"
+        decided = asyncio.run(submit_decisions(session_ids, approved, args.reason, args.reviewer))
+        for session_id in session_ids:
+            if session_id not in decided:
+                print(f"❌ No pending approval for session '{session_id}'")
+        for session_id in decided:
+            auto = " (unchanged graph)" if session_id not in session_ids else ""
+            print(f"✅ {session_id}: {'approved' if approved else 'rejected'}{auto}")
+        if not decided:
+            sys.exit(1)
+        if args.no_publish:
+            return
+
+    results = asyncio.run(process_decisions(args.workers))
+    print(f"\n📤 {len(results)} run(s) resumed:")
+    for result in results:
+        print(f"   {result['session_id']:<40} {result.get('approval_status')}  "
+              f"{result.get('metadata_path') or result.get('error') or 'not published'}")
+    print(f"   Queue: {queue_stats()}")
+
+
+if __name__ == "__main__":
+    main()
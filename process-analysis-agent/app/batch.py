@@ -0,0 +1,223 @@
+"""
+batch.py
+BATCH ENTRY POINT: runs the workflow for a directory or glob of PDFs
+
+Usage:
+    uv run python -m app.batch <dir|glob|pdf> [--concurrency N] [--manifest PATH] [--retry-failed]
+
+Runs up to BATCH_CONCURRENCY workflows at once (each in its own session,
+model calls with "batch" priority) and records per-file status, timings and
+outputs in a JSON manifest after every file. Re-running the same command
+skips files that already completed unchanged (same SHA-256), so a crashed
+batch resumes where it stopped; files that were in flight continue from
+their last stage checkpoint (config.CHECKPOINTS).
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app import config
+
+
+def discover_pdfs(target: str) -> List[str]:
+    """PDF paths of a directory (recursive), a glob pattern or a single file, sorted."""
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "**", "*.pdf"), recursive=True)
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(os.path.abspath(p) for p in paths if os.path.isfile(p) and p.lower().endswith(".pdf"))
+
+
+def file_fingerprint(path: str) -> str:
+    """SHA-256 of the file bytes (a changed PDF is processed again)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BatchManifest:
+    """Per-file batch status, persisted as JSON (atomic replace on every update)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def is_done(self, pdf_path: str, fingerprint: str, retry_failed: bool) -> bool:
+        entry = self.files.get(pdf_path)
+        if not entry or entry.get("sha256") != fingerprint:
+            return False
+        return entry["status"] == "completed" or (entry["status"] == "failed" and not retry_failed)
+
+    def update(self, pdf_path: str, **fields: Any) -> None:
+        self.files.setdefault(pdf_path, {}).update(fields)
+        self.save()
+
+    def save(self, summary: Optional[Dict[str, Any]] = None) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {"updated_at": datetime.now().isoformat(), "files": self.files}
+        if summary is not None:
+            data["last_batch"] = summary
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)  # A crash never leaves a half-written manifest
+
+
+async def process_file(pdf_path: str, fingerprint: str, manifest: BatchManifest) -> Dict[str, Any]:
+    """Runs one workflow in its own session and returns the manifest entry."""
+    from app import agent as workflow
+
+    # A run of the same file version that crashed or paused continues from its checkpoint
+    previous = manifest.files.get(pdf_path) or {}
+    resumable = {run["session_id"] for run in workflow.resumable_runs()}
+    resume = previous.get("sha256") == fingerprint and previous.get("session_id") in resumable
+
+    session_id = previous["session_id"] if resume else f"batch_{fingerprint[:12]}_{uuid.uuid4().hex[:8]}"
+    started = time.perf_counter()
+    manifest.update(
+        pdf_path, sha256=fingerprint, status="running", session_id=session_id,
+        started_at=datetime.now().isoformat(), error=None, resumed=resume,
+    )
+
+    # The session may already be evicted afterwards: use the returned state snapshot
+    if resume:
+        result = await workflow.resume_workflow(session_id, priority="batch")
+    else:
+        result = await workflow.run_workflow(pdf_path, priority="batch", session_id=session_id)
+    response = result["response"]
+    state = result["state"]
+    published = state.get("publication_result") or {}
+    metadata_path = result["metadata_path"]
+
+    if metadata_path:
+        status = "completed"
+    elif (response or "").startswith("Error:"):
+        status = "failed"
+    else:
+        status = "incomplete"  # e.g. approval pending/rejected - processed again next time
+
+    loop_report = state.get("quality_loop_report") or {}
+    entry = {
+        "status": status,
+        "finished_at": datetime.now().isoformat(),
+        "duration_s": round(time.perf_counter() - started, 2),
+        "approval_status": state.get("approval_status"),
+        "validation_status": (state.get("validation_result") or {}).get("overall_status"),
+        "quality_score": loop_report.get("best_score"),
+        "outputs": {
+            "metadata": metadata_path,
+            "mermaid": published.get("mermaid_path"),
+            "report": published.get("report_path"),
+            "svg": published.get("svg_path"),
+        },
+        "error": response if status == "failed" else None,
+    }
+    manifest.update(pdf_path, **entry)
+    return entry
+
+
+async def run_batch(
+    target: str,
+    concurrency: int = config.BATCH_CONCURRENCY,
+    manifest_path: str = config.BATCH_MANIFEST,
+    retry_failed: bool = False
+) -> Dict[str, Any]:
+    """
+    Processes all PDFs of a directory/glob with bounded concurrency.
+
+    Args:
+        target: Directory, glob pattern or single PDF
+        concurrency: Maximum number of workflows running at once
+        manifest_path: JSON manifest (created or resumed)
+        retry_failed: Also re-run files that failed in an earlier batch
+
+    Returns:
+        Batch summary (counts, wall time, throughput in docs/min)
+    """
+    manifest = BatchManifest(manifest_path)
+    pdfs = discover_pdfs(target)
+    fingerprints = {p: file_fingerprint(p) for p in pdfs}
+    todo = [p for p in pdfs if not manifest.is_done(p, fingerprints[p], retry_failed)]
+    print(f"\n📚 Batch: {len(pdfs)} PDF(s), {len(pdfs) - len(todo)} already done, "
+          f"{len(todo)} to process (concurrency {concurrency})")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded(pdf_path: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await process_file(pdf_path, fingerprints[pdf_path], manifest)
+            except Exception as e:  # One broken file must not stop the batch
+                entry = {"status": "failed", "finished_at": datetime.now().isoformat(), "error": str(e)}
+                manifest.update(pdf_path, **entry)
+                return entry
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(bounded(p) for p in todo))
+    wall_s = time.perf_counter() - start
+    from app import agent as workflow
+    await workflow.drain_evaluations()  # Not part of the throughput: the diagrams are done
+
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("completed", "incomplete", "failed")}
+    summary = {
+        "target": target,
+        "finished_at": datetime.now().isoformat(),
+        "files": len(pdfs),
+        "skipped": len(pdfs) - len(todo),
+        **counts,
+        "concurrency": concurrency,
+        "wall_s": round(wall_s, 2),
+        "docs_per_min": round(len(results) / wall_s * 60, 2) if results and wall_s else 0.0,
+    }
+    manifest.save(summary)
+    return summary
+
+
+def print_batch_summary(summary: Dict[str, Any], manifest_path: str) -> None:
+    print("\n" + "=" * 70)
+    print("📚 BATCH SUMMARY")
+    print("=" * 70)
+    print(f"   Files:      {summary['files']} ({summary['skipped']} skipped as already done)")
+    print(f"   Completed:  {summary['completed']}   Incomplete: {summary['incomplete']}   Failed: {summary['failed']}")
+    print(f"   Wall time:  {summary['wall_s']:.1f}s   Throughput: {summary['docs_per_min']:.2f} docs/min")
+    print(f"   Manifest:   {manifest_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", help="Directory, glob pattern (quoted) or PDF file")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY)
+    parser.add_argument("--manifest", default=config.BATCH_MANIFEST)
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run files that failed before")
+    args = parser.parse_args()
+    # Unattended: the approval step auto-approves like 'make run'
+    os.environ.setdefault("CLI_MODE", "true")
+
+    if not discover_pdfs(args.target):
+        print(f"No PDF files found for: {args.target}")
+        sys.exit(1)
+
+    summary = asyncio.run(run_batch(args.target, args.concurrency, args.manifest, args.retry_failed))
+    print_batch_summary(summary, args.manifest)
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
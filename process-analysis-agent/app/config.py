@@ -46,12 +46,153 @@ GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", "global")
 MODEL_FLASH_THINKING = "gemini-2.5-flash"  # Fast and cost-effective
 MODEL_PRO = "gemini-2.5-pro"             # High reasoning capability
 
+# USD per 1M tokens (paid tier, prompts <= 200k tokens), used for cost
+# estimates only. Thinking tokens are billed as output.
+MODEL_PRICING = {
+    MODEL_FLASH_THINKING: {"input": 0.30, "output": 2.50},
+    MODEL_PRO: {"input": 1.25, "output": 10.00},
+}
+
+# Adaptive model routing (ModelRoutingPlugin, app_utils/model_router.py):
+# the model configured in each agent is only the fallback. Every call starts
+# on MODEL_FLASH_THINKING with a thinking budget by input size, and a stage is
+# escalated to MODEL_PRO only after Flash failed it in the same run (quality
+# loop iteration below MIN_QUALITY_SCORE or failing the structural checks,
+# Mermaid fix-up that did not validate). Decisions are printed and added to
+# the run metrics (METRICS_JSONL).
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "true") == "true"
+ROUTING_LARGE_TEXT_CHARS = int(os.getenv("ROUTING_LARGE_TEXT_CHARS", "40000"))  # ~10k tokens
+ROUTING_LARGE_GRAPH_NODES = int(os.getenv("ROUTING_LARGE_GRAPH_NODES", "30"))
+THINKING_BUDGETS = {
+    "simple": 0,     # Stages without a size signal (approval, publication, ...)
+    "small": 1024,
+    "large": 8192,   # Also used for every call escalated to MODEL_PRO
+}
+# The SystemEvaluatorAgent always runs on MODEL_PRO; "true" lets the router
+# downgrade it by graph size like every other agent (scores then also
+# reflect the judge model).
+ROUTE_SYSTEM_EVALUATOR = os.getenv("ROUTE_SYSTEM_EVALUATOR", "false") == "true"
+
+# Approval and publication without an LLM call whenever the outcome is
+# deterministic: a decided/auto-approved status (CLI_MODE) needs no model,
+# and publication calls render/save directly. Only the Web UI confirmation
+# still goes through the ApprovalAgent's tool call.
+DIRECT_APPROVAL_PUBLICATION = os.getenv("DIRECT_APPROVAL_PUBLICATION", "true") == "true"
+
 # =============================================================================
 # Agent Configuration
 # =============================================================================
 
-MAX_QUALITY_ITERATIONS = 2
-MIN_QUALITY_SCORE = 0.85
+MAX_QUALITY_ITERATIONS = int(os.getenv("MAX_QUALITY_ITERATIONS", "2"))
+# The QualityLoopController ends the loop once every QualityAgent score
+# reaches MIN_QUALITY_SCORE, or when the score improves by less than
+# QUALITY_MIN_IMPROVEMENT between two judged iterations (plateau).
+MIN_QUALITY_SCORE = float(os.getenv("MIN_QUALITY_SCORE", "0.85"))
+QUALITY_MIN_IMPROVEMENT = 0.02
+
+# "loop": sequential ConversionAgent -> QualityAgent rounds (QualityLoopAgent).
+# "best_of_n": CONVERSION_CANDIDATES concurrent conversions (temperatures
+# spread over CONVERSION_TEMPERATURE_RANGE) + one batched judge call.
+CONVERSION_MODE = os.getenv("CONVERSION_MODE", "loop")
+CONVERSION_CANDIDATES = int(os.getenv("CONVERSION_CANDIDATES", "3"))
+CONVERSION_TEMPERATURE_RANGE = (0.2, 0.8)
+
+# Delta refinement in the quality loop: the QualityAgent also returns graph
+# edits (add/remove/rename node, add/remove/reroute edge), which are applied
+# locally to the previous graph before the next iteration. The
+# ConversionAgent only runs again for issues the edits could not fix, and
+# then gets just the patched graph and those issues.
+QUALITY_DELTA_FEEDBACK = os.getenv("QUALITY_DELTA_FEEDBACK", "true") == "true"
+
+# Compact wire format for graph outputs: the PDF analysis and conversion
+# agents answer with positional arrays (interned actor/type tables, step/node
+# numbers) instead of verbose JSON objects, which are expanded locally into
+# PdfAnalysisOutput/ConversionOutput. Fewer output tokens, same state.
+COMPACT_OUTPUT = os.getenv("COMPACT_OUTPUT", "false") == "true"
+
+# Structural pre-gate in the quality loop: the QualityAgent (LLM judge) only
+# runs once the conversion graph has no hard structural errors (start/end
+# node, dangling edges, unreachable nodes, dead ends); otherwise the issue
+# list goes straight back to the ConversionAgent. Coverage below these
+# thresholds is only reported as a warning (label matching is approximate).
+STRUCTURE_PRE_GATE = os.getenv("STRUCTURE_PRE_GATE", "true") == "true"
+MIN_ACTOR_COVERAGE = 1.0  # Share of analysis actors expected as node actors
+MIN_STEP_COVERAGE = 0.6   # Share of analysis tasks/decisions expected to have a matching node
+
+# Map-reduce analysis for long documents: text longer than one chunk is
+# split on page markers/headings and analysed chunk by chunk in parallel.
+ANALYSIS_CHUNKING = os.getenv("ANALYSIS_CHUNKING", "true") == "true"
+ANALYSIS_CHUNK_CHARS = int(os.getenv("ANALYSIS_CHUNK_CHARS", "24000"))  # ~6k tokens
+ANALYSIS_MAX_CONCURRENCY = int(os.getenv("ANALYSIS_MAX_CONCURRENCY", "4"))
+
+# Incremental re-analysis: chunk analyses and the generated Mermaid code are
+# stored per document; a new revision only re-analyses changed chunks and
+# skips the quality loop + Mermaid generation if the graph is unchanged.
+INCREMENTAL_ANALYSIS = os.getenv("INCREMENTAL_ANALYSIS", "true") == "true"
+
+# Boilerplate stripping between extraction and analysis: lines in the first/
+# last BOILERPLATE_EDGE_LINES of a page that repeat on at least
+# BOILERPLATE_MIN_PAGE_RATIO of all pages are treated as headers/footers.
+PREPROCESS_TEXT = os.getenv("PREPROCESS_TEXT", "true") == "true"
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MIN_PAGE_RATIO = 0.5
+BOILERPLATE_EDGE_LINES = 3
+
+# Set to "true" to use the legacy LLM-based PDFTextExtractionAgent instead of
+# the deterministic PDFTextExtractionStage (which calls parse_pdf directly).
+USE_LLM_PDF_EXTRACTION = os.getenv("USE_LLM_PDF_EXTRACTION", "false") == "true"
+
+# Set to "true" to use the legacy LLM-based BPMNGenerationAgent instead of
+# the deterministic MermaidCompilerStage (which compiles 'conversion_output').
+USE_LLM_MERMAID_GENERATION = os.getenv("USE_LLM_MERMAID_GENERATION", "false") == "true"
+
+# Set to "true" to use the legacy LLM-based ValidationAgent instead of the
+# deterministic MermaidValidationStage. The stage only calls an LLM
+# (MermaidFixupAgent) if the validator reports errors; 0 disables the fix-up.
+USE_LLM_VALIDATION = os.getenv("USE_LLM_VALIDATION", "false") == "true"
+MERMAID_FIX_MAX_ATTEMPTS = int(os.getenv("MERMAID_FIX_MAX_ATTEMPTS", "1"))
+
+# Per-agent context scoping: LLM agents only get the session-state keys they
+# declare (CONTEXT_KEYS) as compact JSON instead of the whole conversation
+# history. The estimated prompt token reduction is printed after each run.
+SCOPED_CONTEXT = os.getenv("SCOPED_CONTEXT", "true") == "true"
+
+# Print wall time per agent/stage at the end of each workflow run
+STAGE_TIMING = os.getenv("STAGE_TIMING", "true") == "true"
+
+# Batch mode (python -m app.batch <dir|glob>): workflows running at once and
+# the manifest that records per-file status, timings and outputs (resume).
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MANIFEST = os.getenv("BATCH_MANIFEST", os.path.join("logs", "batch_manifest.json"))
+
+# Session memory bound: finished sessions (events incl. the extracted PDF
+# text) are evicted after SESSION_TTL_S without access, and least recently
+# used ones first once the store exceeds SESSION_STORE_MAX_MB. Sessions of
+# running workflows are never evicted.
+SESSION_TTL_S = float(os.getenv("SESSION_TTL_S", "3600"))
+SESSION_STORE_MAX_MB = float(os.getenv("SESSION_STORE_MAX_MB", "256"))
+
+# Checkpointed sessions (SQLite, WAL): the state is saved before each stage of
+# ProcessDiagramRootAgent and when the run ends (completed / paused on a
+# PENDING approval). 'python -m app.agent --resume <session_id>' restarts a
+# crashed or paused run at its first unfinished stage. Checkpoints are
+# committed in batches by a background thread every CHECKPOINT_FLUSH_MS.
+CHECKPOINTS = os.getenv("CHECKPOINTS", "true") == "true"
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", os.path.join("logs", "checkpoints.sqlite"))
+CHECKPOINT_FLUSH_MS = int(os.getenv("CHECKPOINT_FLUSH_MS", "200"))
+
+# Non-blocking approvals (server mode): outside CLI_MODE a run that reaches the
+# ApprovalAgent is queued for review, paused (checkpoint) and its session is
+# released instead of waiting on the Web UI confirmation. Decisions arrive via
+# app/approvals.py (python -m app.approvals ...); APPROVAL_WORKERS resumed
+# runs publish concurrently. Needs CHECKPOINTS. Off by default: 'adk web'
+# keeps its interactive confirmation buttons.
+APPROVAL_QUEUE = os.getenv("APPROVAL_QUEUE", "false") == "true"
+APPROVAL_WORKERS = int(os.getenv("APPROVAL_WORKERS", "4"))
+# Queued runs whose graph is structurally identical to the document's last
+# approved graph (same nodes, types, actors and edges; ids may differ) are
+# approved without review and publish immediately.
+AUTO_APPROVE_UNCHANGED = os.getenv("AUTO_APPROVE_UNCHANGED", "true") == "true"
 
 # =============================================================================
 # File Paths
@@ -60,10 +201,50 @@ MIN_QUALITY_SCORE = 0.85
 OUTPUT_DIR = "outputs"
 LOGS_DIR = "logs"
 TEST_DATA_DIR = "test_data"
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")  # Created lazily on first write
+# OUTPUT_DIR/LOGS_DIR are created when the workflow is built (not on import)
+
+# =============================================================================
+# Model Call Cache (Record/Replay)
+# =============================================================================
+
+# "off" | "record" (read-through cache) | "replay" (offline, fails on a miss)
+MODEL_CACHE_MODE = os.getenv("MODEL_CACHE_MODE", "off")
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(CACHE_DIR, "model_calls"))
+MODEL_CACHE_MAX_MB = int(os.getenv("MODEL_CACHE_MAX_MB", "512"))
+
+# =============================================================================
+# Model Call Scheduler (Rate Limits, Retries, Circuit Breaker)
+# =============================================================================
+
+# All Gemini calls of the process share one scheduler (app_utils/model_scheduler.py).
+MODEL_SCHEDULER = os.getenv("MODEL_SCHEDULER", "true") == "true"
+# Requests / tokens per minute per model (Gemini API paid tier 1; lower them
+# for the free tier). Unlisted models use DEFAULT_MODEL_RATE_LIMIT.
+MODEL_RATE_LIMITS = {
+    MODEL_FLASH_THINKING: {"rpm": int(os.getenv("FLASH_RPM", "1000")), "tpm": int(os.getenv("FLASH_TPM", "1000000"))},
+    MODEL_PRO: {"rpm": int(os.getenv("PRO_RPM", "150")), "tpm": int(os.getenv("PRO_TPM", "2000000"))},
+}
+DEFAULT_MODEL_RATE_LIMIT = {"rpm": 60, "tpm": 250000}
+MODEL_CALL_OUTPUT_TOKEN_ESTIMATE = 1024  # Charged up front, corrected with the reported usage
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(LOGS_DIR, exist_ok=True)
-os.makedirs(TEST_DATA_DIR, exist_ok=True)
+# Jittered exponential backoff on 429 / 5xx / connection errors
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+MODEL_CALL_MAX_RETRIES = int(os.getenv("MODEL_CALL_MAX_RETRIES", "5"))
+MODEL_BACKOFF_BASE_S = 1.0
+MODEL_BACKOFF_MAX_S = 60.0
+
+# After CIRCUIT_BREAKER_THRESHOLD consecutive failures no calls are sent to
+# the model for CIRCUIT_BREAKER_COOLDOWN_S; calls that would wait longer than
+# MODEL_CALL_MAX_WAIT_S fail fast (CircuitOpenError).
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN_S = 30.0
+MODEL_CALL_MAX_WAIT_S = float(os.getenv("MODEL_CALL_MAX_WAIT_S", "300"))
+
+# Alternative Gemini API endpoint, e.g. the local fake server for load tests:
+#   python -m tests.fake_model_server --port 8089
+#   GEMINI_BASE_URL=http://127.0.0.1:8089
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
 
 # =============================================================================
 # Logging
@@ -71,6 +252,23 @@ os.makedirs(TEST_DATA_DIR, exist_ok=True)
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+# Per-agent/tool tokens, latency, retries, failed calls and cost (InstrumentationPlugin).
+# The run summary is added to the saved metadata JSON and appended to
+# METRICS_JSONL (one line per run).
+INSTRUMENTATION = os.getenv("INSTRUMENTATION", "true") == "true"
+METRICS_JSONL = os.getenv("METRICS_JSONL", os.path.join(LOGS_DIR, "run_metrics.jsonl"))
+
+# SystemEvaluatorAgent (MODEL_PRO) off the critical path: run_workflow()
+# returns once the diagram is published and a sampled share of completed
+# runs (EVAL_SAMPLE_RATE, 0..1) is evaluated by EVAL_WORKERS background
+# tasks. Results go into the run's metadata JSON ('evaluation') and
+# EVAL_JSONL. EVAL_BACKGROUND=false evaluates before returning.
+EVAL_SAMPLE_RATE = float(os.getenv("EVAL_SAMPLE_RATE", "1.0"))
+EVAL_BACKGROUND = os.getenv("EVAL_BACKGROUND", "true") == "true"
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "2"))
+EVAL_QUEUE_MAX = int(os.getenv("EVAL_QUEUE_MAX", "100"))  # Further jobs are dropped (counted)
+EVAL_JSONL = os.getenv("EVAL_JSONL", os.path.join(LOGS_DIR, "evaluations.jsonl"))
+
 # =============================================================================
 # Tool Configuration
 # =============================================================================
@@ -81,15 +279,40 @@ MERMAID_CLI = "mmdc" # Assumes 'mmdc' is in the system PATH (via Nix)
 # PDF Configuration
 # =============================================================================
 
-PDF_MAX_PAGES = 50
+# Soft page budget: longer PDFs are truncated to this many pages (with a
+# warning in the tool result) instead of failing.
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+
+# Page extraction is spread over a process pool for larger documents (created
+# on the first such document, then reused).
+# PDF_WORKERS = 0 means "use all available cores".
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "0"))
+PDF_PARALLEL_MIN_PAGES = 16  # Below this, pool dispatch costs more than it saves
+PDF_PAGES_PER_TASK = 8       # Pages per pool task (bounds in-flight memory)
+
+# Content-addressed cache for extracted text (key: SHA-256 of the PDF bytes,
+# parser version and page budget). Shared safely between worker processes.
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "true") == "true"
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(CACHE_DIR, "pdf_text"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", "256"))
+
+# Per-document revision records for incremental re-analysis
+REVISION_STORE_DIR = os.getenv("REVISION_STORE_DIR", os.path.join(CACHE_DIR, "revisions"))
+REVISION_STORE_MAX_MB = int(os.getenv("REVISION_STORE_MAX_MB", "128"))
 
 # =============================================================================
 # Validation
 # =============================================================================
 
 def validate_config():
-    """Validates the configuration at startup."""
-    if not GOOGLE_API_KEY:
+    """
+    Validates the configuration at startup.
+
+    Called once when the workflow is built (app.agent), so importing the config
+    (tools, benchmarks, tests) neither needs an API key nor touches the disk.
+    """
+    # Replay mode serves every model call from the cache - no key needed
+    if not GOOGLE_API_KEY and MODEL_CACHE_MODE != "replay":
         raise ValueError(
             "GOOGLE_API_KEY not found! "
             "Please create a .env file with your API Key."
@@ -98,6 +321,3 @@ def validate_config():
     print("✅ Configuration loaded successfully")
     print(f"   Model: {MODEL_FLASH_THINKING}")
     print(f"   Max Quality Iterations: {MAX_QUALITY_ITERATIONS}")
-
-if __name__ != "__main__":
-    validate_config()
\ No newline at end of file
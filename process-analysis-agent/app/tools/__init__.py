@@ -1,14 +1,22 @@
-from .mermaid_generator import render_mermaid_to_svg
-from .mermaid_validator import validate_mermaid_syntax
-from .approval_tool import request_publication_approval
-from .filesystem_saver import save_diagram, save_report
-from .pdf_parser import parse_pdf
-
-__all__ = [
-    "render_mermaid_to_svg",
-    "validate_mermaid_syntax",
-    "request_publication_approval",
-    "save_diagram",
-    "save_report",
-    "parse_pdf"
-]
\ No newline at end of file
+# Tools are imported on first access (PEP 562): e.g. PyPDF2 and the ADK tool
+# classes are only loaded by code that actually uses them.
+import importlib
+
+_TOOLS = {
+    "render_mermaid_to_svg": ".mermaid_generator",
+    "validate_mermaid_syntax": ".mermaid_validator",
+    "request_publication_approval": ".approval_tool",
+    "save_diagram": ".filesystem_saver",
+    "save_report": ".filesystem_saver",
+    "parse_pdf": ".pdf_parser"
+}
+
+__all__ = list(_TOOLS)
+
+
+def __getattr__(name):
+    if name in _TOOLS:
+        value = getattr(importlib.import_module(_TOOLS[name], __name__), name)
+        globals()[name] = value  # Cache: later lookups skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
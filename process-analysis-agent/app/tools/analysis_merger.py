@@ -0,0 +1,137 @@
+"""
+tools/analysis_merger.py
+Merges per-chunk PdfAnalysisOutput graphs into a single process graph.
+
+Merge rules:
+- Actors are deduplicated case- and whitespace-insensitively (first spelling wins).
+- Step ids are renumbered globally (1..n) in document order.
+- Only the first chunk keeps its start event; later start events are dropped
+  and their successors become the entry points of that chunk.
+- Exits of chunk i (non-end steps without outgoing dependency) are stitched to
+  the entries of chunk i+1. If a chunk has no exits, its last end event is
+  treated as an artificial chunk boundary and replaced by that stitch.
+- Steps that repeat a step of the previous chunk (same type, action, actor -
+  typical for overlapping sections) are merged into the earlier step.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.agents.pdf_analysis_agent import Dependency, PdfAnalysisOutput, Step
+
+
+def _norm(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _step_signature(step: Step, actor: Optional[str]) -> Tuple[str, str, str]:
+    return (step.type, _norm(step.action), _norm(actor))
+
+
+def merge_analysis_outputs(outputs: List[PdfAnalysisOutput]) -> PdfAnalysisOutput:
+    """
+    Merges chunk analyses (in document order) into one PdfAnalysisOutput.
+
+    Args:
+        outputs: Per-chunk analysis results
+
+    Returns:
+        The merged process graph
+    """
+    actors: List[str] = []
+    canonical_actor: Dict[str, str] = {}
+
+    def resolve_actor(name: Optional[str]) -> Optional[str]:
+        if not name:
+            return name
+        key = _norm(name)
+        if key not in canonical_actor:
+            canonical_actor[key] = name.strip()
+            actors.append(name.strip())
+        return canonical_actor[key]
+
+    steps: List[Step] = []
+    dependencies: List[Dependency] = []
+    seen_edges: Set[Tuple[int, int]] = set()
+
+    def add_edge(from_id: int, to_id: int, label: Optional[str] = None) -> None:
+        if from_id == to_id or (from_id, to_id) in seen_edges:
+            return
+        seen_edges.add((from_id, to_id))
+        dependencies.append(Dependency(**{"from": from_id, "to": to_id, "label": label}))
+
+    next_id = 1
+    prev_exits: List[int] = []
+    prev_signatures: Dict[Tuple[str, str, str], int] = {}
+
+    for chunk_index, output in enumerate(outputs):
+        for actor in output.actors:
+            resolve_actor(actor)
+
+        step_ids = {step.id for step in output.steps}
+        deps = [d for d in output.dependencies if d.from_ in step_ids and d.to in step_ids]
+        outgoing: Dict[int, List[Dependency]] = {}
+        incoming: Dict[int, List[Dependency]] = {}
+        for dep in deps:
+            outgoing.setdefault(dep.from_, []).append(dep)
+            incoming.setdefault(dep.to, []).append(dep)
+
+        dropped: Set[int] = set()
+        entries: List[int] = []
+
+        # Later chunks continue the process - their start events are artificial
+        if chunk_index > 0:
+            for step in output.steps:
+                if step.type == "start_event":
+                    dropped.add(step.id)
+                    entries.extend(d.to for d in outgoing.get(step.id, []))
+
+        # Exits: where the flow leaves this chunk towards the next one
+        exits = [
+            s.id for s in output.steps
+            if s.id not in dropped and s.type != "end_event" and not outgoing.get(s.id)
+        ]
+        is_last = chunk_index == len(outputs) - 1
+        if not is_last and not exits:
+            end_events = [s for s in output.steps if s.type == "end_event"]
+            if end_events:
+                boundary = max(end_events, key=lambda s: s.id)
+                dropped.add(boundary.id)
+                exits = [d.from_ for d in incoming.get(boundary.id, [])]
+
+        entries.extend(
+            s.id for s in output.steps
+            if s.id not in dropped and s.type != "start_event" and not incoming.get(s.id)
+        )
+
+        # Renumber (merging repeats of the previous chunk's steps)
+        id_map: Dict[int, int] = {}
+        signatures: Dict[Tuple[str, str, str], int] = {}
+        for step in output.steps:
+            if step.id in dropped:
+                continue
+            actor = resolve_actor(step.actor)
+            signature = _step_signature(step, actor)
+            if signature in prev_signatures:
+                id_map[step.id] = prev_signatures[signature]
+            else:
+                id_map[step.id] = next_id
+                steps.append(step.model_copy(update={"id": next_id, "actor": actor}))
+                next_id += 1
+            signatures[signature] = id_map[step.id]
+
+        for dep in deps:
+            if dep.from_ in id_map and dep.to in id_map:
+                add_edge(id_map[dep.from_], id_map[dep.to], dep.label)
+
+        # Stitch previous chunk -> this chunk
+        entry_ids = list(dict.fromkeys(id_map[e] for e in entries if e in id_map))
+        if prev_exits and entry_ids:
+            for exit_id in prev_exits:
+                for entry_id in entry_ids:
+                    add_edge(exit_id, entry_id)
+
+        if id_map:
+            prev_exits = list(dict.fromkeys(id_map[e] for e in exits if e in id_map))
+            prev_signatures = signatures
+
+    return PdfAnalysisOutput(actors=actors, steps=steps, dependencies=dependencies)
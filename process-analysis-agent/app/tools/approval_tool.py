@@ -4,8 +4,15 @@ Human-in-the-Loop Tool using ADK's native confirmation mechanism.
 """
 
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import ToolContext
+from google.genai import types
+from app import config
+from app.app_utils.approval_queue import get_approval_queue
+from app.app_utils.model_router import log_direct_route
+from app.tools.graph_diff import diff_graphs
+from app.tools.revision_store import document_key
 
 def request_publication_approval(
     tool_context: ToolContext
@@ -57,4 +64,79 @@ def request_publication_approval(
     # WICHTIG: Status auf PENDING setzen, damit wir wissen, dass wir warten
     tool_context.session.state["approval_status"] = "PENDING"
     
-    return {"status": "waiting_for_user", "approved": False}
\ No newline at end of file
+    return {"status": "waiting_for_user", "approved": False}
+
+
+def resolve_approval_without_llm(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for the ApprovalAgent: answers without an LLM call
+    when the outcome is already determined (status decided, or CLI auto-approve).
+
+    Only the Web UI confirmation (tool_context.request_confirmation) needs the
+    agent's tool call, so that case falls through to the LLM.
+    """
+    status = callback_context.state.get("approval_status")
+    if status not in ("APPROVED", "REJECTED") and os.getenv("CLI_MODE") != "true":
+        queued = queue_for_review(callback_context)
+        if queued:
+            return queued
+
+    if not config.DIRECT_APPROVAL_PUBLICATION:
+        return None
+
+    if status == "APPROVED":
+        message = "Approval already granted. Proceeding."
+    elif status == "REJECTED":
+        message = "Approval denied previously."
+    elif os.getenv("CLI_MODE") == "true":
+        print("[Approval Tool] 🤖 CLI Mode detected: Auto-approving.")
+        callback_context.state["approval_status"] = "APPROVED"
+        message = "Approval confirmed."
+    else:
+        return None
+
+    log_direct_route(callback_context, f"approval status {callback_context.state.get('approval_status')}")
+    return types.Content(role="model", parts=[types.Part(text=message)])
+
+
+def queue_for_review(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    Server mode (config.APPROVAL_QUEUE): queues the approval request instead
+    of waiting for the Web UI. The status stays PENDING, so the run ends as
+    'paused' and is resumed by the approval workers once a reviewer decided.
+    A graph unchanged since the document's last approved version is approved
+    right away (config.AUTO_APPROVE_UNCHANGED) and the run continues.
+
+    Returns None (fall through to the confirmation flow) if the queue is off.
+    """
+    queue = get_approval_queue()
+    if queue is None:
+        return None
+
+    session = callback_context.session
+    state = callback_context.state
+    graph = state.get("conversion_output")
+    request = {
+        "session_id": session.id,
+        "app_name": session.app_name,
+        "user_id": session.user_id,
+        "pdf_path": state.get("pdf_path"),
+        "mermaid_code": state.get("current_mermaid_code", ""),
+        "graph": graph,
+        "document": document_key(state.get("pdf_path")),
+    }
+
+    baseline = queue.last_approved(request["document"])
+    if config.AUTO_APPROVE_UNCHANGED and graph and baseline and diff_graphs(baseline["graph"], graph)["unchanged"]:
+        queue.record_auto_approval(**request)
+        state["approval_status"] = "APPROVED"
+        print(f"[Approval Tool] ✅ Graph unchanged since the approved version "
+              f"({baseline['session_id']}): auto-approved.")
+        log_direct_route(callback_context, "approval auto-granted (unchanged graph)")
+        return types.Content(role="model", parts=[types.Part(text="Approval granted (graph unchanged).")])
+
+    queue.enqueue(**request)
+    state["approval_status"] = "PENDING"
+    print(f"[Approval Tool] 📥 Queued for review ({queue.stats()['pending']} pending). Run is released.")
+    log_direct_route(callback_context, "approval queued for review")
+    return types.Content(role="model", parts=[types.Part(text="Waiting for user approval (queued for review).")])
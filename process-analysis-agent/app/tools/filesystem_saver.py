@@ -7,7 +7,12 @@ import os
 import json
 from datetime import datetime
 from typing import Dict, Any, Optional 
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
 from app import config
+from app.app_utils.model_router import log_direct_route
+from app.tools.mermaid_generator import render_mermaid_to_svg
+from app.tools.revision_store import record_mermaid_revision
 
 def _sanitize_filename(filename: str) -> str:
     """Removes path characters from filename to avoid errors."""
@@ -25,8 +30,11 @@ def save_diagram(
     Saves the final diagram (.mmd) and metadata (.json).
     """
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Microseconds keep concurrent runs (batch mode) from overwriting each other
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         
+        os.makedirs(config.OUTPUT_DIR, exist_ok=True)
+
         # 1. Save Mermaid Code
         mermaid_filename = f"process_diagram_{timestamp}.mmd"
         mermaid_path = os.path.join(config.OUTPUT_DIR, mermaid_filename)
@@ -71,6 +79,48 @@ def save_diagram(
         return {"success": False, "error": error_msg}
 
 
+def attach_run_summary(metadata_path: str, run_summary: Dict[str, Any]) -> bool:
+    """
+    Adds the instrumentation summary of the run to a saved metadata JSON.
+
+    Not an agent tool: called by the workflow once the run (incl. the
+    evaluation) is complete.
+    """
+    try:
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        metadata["run_summary"] = run_summary
+        with open(metadata_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        print(f"[Filesystem Saver] ✅ Run summary added: {metadata_path}")
+        return True
+    except (OSError, ValueError) as e:
+        print(f"[Filesystem Saver] ⚠️ Could not add run summary: {e}")
+        return False
+
+
+def attach_evaluation(metadata_path: str, evaluation: Dict[str, Any]) -> bool:
+    """
+    Adds the SystemEvaluatorAgent result to a saved metadata JSON.
+
+    Not an agent tool: called by the background evaluation after the run
+    returned (see app_utils/evaluation_queue.py).
+    """
+    try:
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        metadata["evaluation"] = evaluation
+        tmp_path = f"{metadata_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, metadata_path)  # Readers never see a half-written file
+        print(f"[Filesystem Saver] ✅ Evaluation added: {metadata_path}")
+        return True
+    except (OSError, ValueError) as e:
+        print(f"[Filesystem Saver] ⚠️ Could not add evaluation: {e}")
+        return False
+
+
 def save_report(
     mermaid_code: str,
     analysis_text: str,
@@ -87,6 +137,7 @@ def save_report(
         ts = metadata.get("timestamp", datetime.now().strftime("%Y%m%d_%H%M%S"))
         
         report_filename = f"REPORT_{source_name}_{ts}.md"
+        os.makedirs(config.OUTPUT_DIR, exist_ok=True)
         report_path = os.path.join(config.OUTPUT_DIR, report_filename)
         
         workflow_id = metadata.get("workflow_id", "unknown")
@@ -125,4 +176,60 @@ Here is the visual representation of the process:
     except Exception as e:
         error_msg = f"Error creating report: {str(e)}"
         print(f"[Filesystem Saver] ❌ {error_msg}")
-        return {"success": False, "error": error_msg}
\ No newline at end of file
+        return {"success": False, "error": error_msg}
+
+
+def publish_without_llm(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for the PublicationAgent: performs the approval
+    check and the render/save steps directly instead of via LLM tool calls.
+
+    The saved paths are stored in 'publication_result'. Returning content
+    skips the agent's after_agent_callback, so the approved diagram is
+    recorded in the revision store here.
+    """
+    if not config.DIRECT_APPROVAL_PUBLICATION:
+        return None
+
+    state = callback_context.state
+    status = state.get("approval_status")
+    if status != "APPROVED":
+        log_direct_route(callback_context, f"approval status {status}, publication halted")
+        return types.Content(
+            role="model",
+            parts=[types.Part(text="Publication halted: Approval pending or rejected.")]
+        )
+
+    mermaid_code = state.get("current_mermaid_code", "")
+    pdf_path = state.get("pdf_path", "unknown")
+    validation = state.get("validation_result") or {}
+    metadata = {
+        "pdf_source": os.path.basename(pdf_path),
+        "workflow_id": callback_context.invocation_id,
+        "validation_status": validation.get("overall_status"),
+    }
+
+    render = render_mermaid_to_svg(mermaid_code)
+    svg_path = render.get("svg_path") if render.get("success") else None
+    diagram = save_diagram(mermaid_code, svg_path=svg_path, metadata=dict(metadata))
+    report = save_report(
+        mermaid_code,
+        json.dumps(state.get("pdf_analysis") or {}, ensure_ascii=False),
+        {**metadata, "timestamp": diagram.get("timestamp")} if diagram.get("success") else metadata,
+    )
+
+    state["publication_result"] = {
+        "svg_path": svg_path,
+        "mermaid_path": diagram.get("mermaid_path"),
+        "metadata_path": diagram.get("metadata_path"),
+        "report_path": report.get("report_path"),
+        "errors": [r["error"] for r in (render, diagram, report) if not r.get("success")],
+    }
+    log_direct_route(callback_context, "approved, render/save called directly")
+
+    if not diagram.get("success") or not report.get("success"):
+        message = f"Publication failed: {'; '.join(state['publication_result']['errors'])}"
+    else:
+        record_mermaid_revision(callback_context)
+        message = f"Analysis complete. Report saved at {report['report_path']}."
+    return types.Content(role="model", parts=[types.Part(text=message)])
@@ -0,0 +1,108 @@
+"""
+tools/graph_diff.py
+Structural diff of two process graphs (ConversionOutput dicts) for reviewers.
+
+LLM runs renumber node ids, so nodes are matched by their normalised label
+(repeated labels by occurrence) and edges by the labels of their end nodes
+plus the edge label. Type/actor differences of a matched node are reported
+as changes. Two graphs with an empty diff are 'unchanged' - the approval
+queue auto-approves those against the last approved version.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _norm(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _nodes_by_key(graph: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """(key -> node, node id -> key); key = normalised label (+ '#n' for repeats)."""
+    seen: Counter = Counter()
+    nodes: Dict[str, Dict[str, Any]] = {}
+    keys: Dict[str, str] = {}
+    for node in graph.get("nodes") or []:
+        label = _norm(node.get("label")) or _norm(node.get("id"))
+        seen[label] += 1
+        key = label if seen[label] == 1 else f"{label}#{seen[label]}"
+        nodes[key] = node
+        keys[str(node.get("id"))] = key
+    return nodes, keys
+
+
+def _edges(graph: Dict[str, Any], keys: Dict[str, str]) -> Counter:
+    edges: Counter = Counter()
+    for edge in graph.get("edges") or []:
+        source = str(edge.get("from", edge.get("from_", "")))
+        target = str(edge.get("to", ""))
+        edges[(keys.get(source, source), keys.get(target, target), _norm(edge.get("label")))] += 1
+    return edges
+
+
+def _edge_text(edge: Tuple[str, str, str]) -> str:
+    source, target, label = edge
+    return f"{source} -> {target}" + (f" [{label}]" if label else "")
+
+
+def diff_graphs(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Structural changes from the old to the new graph.
+
+    Args:
+        old: Last approved graph (None if the document was never approved)
+        new: Graph awaiting approval
+
+    Returns:
+        Dict with 'baseline' (False without an old graph), 'unchanged',
+        'nodes_added'/'nodes_removed' (labels), 'nodes_changed' (label,
+        field, old, new), 'edges_added'/'edges_removed' ('a -> b [label]')
+        and a one-line 'summary'
+    """
+    new = new or {}
+    if old is None:
+        nodes = len(new.get("nodes") or [])
+        return {
+            "baseline": False,
+            "unchanged": False,
+            "nodes_added": [], "nodes_removed": [], "nodes_changed": [],
+            "edges_added": [], "edges_removed": [],
+            "summary": f"no approved version yet ({nodes} nodes, {len(new.get('edges') or [])} edges)",
+        }
+
+    old_nodes, old_keys = _nodes_by_key(old)
+    new_nodes, new_keys = _nodes_by_key(new)
+    changed = []
+    for key in old_nodes.keys() & new_nodes.keys():
+        for field in ("type", "actor"):
+            before, after = old_nodes[key].get(field), new_nodes[key].get(field)
+            if _norm(before) != _norm(after):
+                changed.append({"label": new_nodes[key].get("label"), "field": field, "old": before, "new": after})
+
+    old_edges, new_edges = _edges(old, old_keys), _edges(new, new_keys)
+    diff = {
+        "baseline": True,
+        "nodes_added": sorted(new_nodes[k].get("label") or k for k in new_nodes.keys() - old_nodes.keys()),
+        "nodes_removed": sorted(old_nodes[k].get("label") or k for k in old_nodes.keys() - new_nodes.keys()),
+        "nodes_changed": sorted(changed, key=lambda c: (str(c["label"]), c["field"])),
+        "edges_added": sorted(_edge_text(e) for e in (new_edges - old_edges).elements()),
+        "edges_removed": sorted(_edge_text(e) for e in (old_edges - new_edges).elements()),
+    }
+    diff["unchanged"] = not any(diff[k] for k in (
+        "nodes_added", "nodes_removed", "nodes_changed", "edges_added", "edges_removed"
+    ))
+    diff["summary"] = "unchanged" if diff["unchanged"] else (
+        f"nodes +{len(diff['nodes_added'])}/-{len(diff['nodes_removed'])}/~{len(diff['nodes_changed'])}, "
+        f"edges +{len(diff['edges_added'])}/-{len(diff['edges_removed'])}"
+    )
+    return diff
+
+
+def format_diff(diff: Dict[str, Any], indent: str = "      ") -> List[str]:
+    """Printable lines of a diff (one change per line)."""
+    lines = [f"{indent}+ node  {label}" for label in diff["nodes_added"]]
+    lines += [f"{indent}- node  {label}" for label in diff["nodes_removed"]]
+    lines += [f"{indent}~ node  {c['label']}: {c['field']} {c['old']!r} -> {c['new']!r}" for c in diff["nodes_changed"]]
+    lines += [f"{indent}+ edge  {edge}" for edge in diff["edges_added"]]
+    lines += [f"{indent}- edge  {edge}" for edge in diff["edges_removed"]]
+    return lines
@@ -0,0 +1,192 @@
+"""
+tools/graph_patch.py
+Local application of the QualityAgent's graph edits (delta refinement).
+
+With config.QUALITY_DELTA_FEEDBACK the judge returns a list of edits
+(add/remove/rename a node, add/remove/reroute an edge) instead of only prose
+feedback. Before the next ConversionAgent iteration, apply_quality_edits
+patches the previous ConversionOutput with them locally:
+- every edit applied, nothing left open -> the ConversionAgent LLM call is
+  skipped and the patched graph goes straight back to the judge;
+- edits that could not be applied and the judge's open issues -> the
+  ConversionAgent only gets the patched graph and these issues
+  ('graph_refinement'), not the analysis and the judge's reasoning again.
+"""
+
+import json
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from app import config
+from app.app_utils.model_router import log_direct_route
+
+
+class GraphEdit(BaseModel):
+    """One edit of the process graph, referring to the node ids of the judged graph."""
+    model_config = ConfigDict(populate_by_name=True)
+
+    op: Literal["add_node", "remove_node", "rename_node", "add_edge", "remove_edge", "reroute_edge"] = Field(
+        ..., description="Edit operation."
+    )
+    node_id: Optional[str] = Field(None, description="add/remove/rename_node: id of the node.")
+    label: Optional[str] = Field(None, description="add_node/rename_node: (new) node label; edges: edge label.")
+    type: Optional[str] = Field(None, description="add_node (required) / rename_node (optional): node type.")
+    actor: Optional[str] = Field(None, description="add_node/rename_node: actor of the node.")
+    from_: Optional[str] = Field(None, alias="from", description="Edge ops: source node id of the edge.")
+    to: Optional[str] = Field(None, description="Edge ops: target node id of the edge.")
+    new_from: Optional[str] = Field(None, description="reroute_edge: new source node id (if it changes).")
+    new_to: Optional[str] = Field(None, description="reroute_edge: new target node id (if it changes).")
+
+
+def _find_edge(edges: List[Dict[str, Any]], source: str, target: str) -> Optional[Dict[str, Any]]:
+    return next((e for e in edges if e["from_"] == source and e["to"] == target), None)
+
+
+def _apply(nodes: Dict[str, Dict[str, Any]], edges: List[Dict[str, Any]], edit: GraphEdit) -> None:
+    """Applies one edit in place; raises ValueError (with the reason) if it does not fit the graph."""
+    from app.agents.conversion_agent import NODE_TYPES  # conversion_agent imports this module
+
+    if edit.op == "add_node":
+        if not edit.node_id or not edit.label or edit.type not in NODE_TYPES:
+            raise ValueError("needs node_id, label and a valid type")
+        if edit.node_id in nodes:
+            raise ValueError(f"node '{edit.node_id}' already exists")
+        nodes[edit.node_id] = {"id": edit.node_id, "type": edit.type, "label": edit.label, "actor": edit.actor}
+
+    elif edit.op == "remove_node":
+        if edit.node_id not in nodes:
+            raise ValueError(f"unknown node '{edit.node_id}'")
+        del nodes[edit.node_id]
+        incoming = [e for e in edges if e["to"] == edit.node_id]
+        outgoing = [e for e in edges if e["from_"] == edit.node_id]
+        edges[:] = [e for e in edges if e not in incoming and e not in outgoing]
+        # Keep the flow connected through a removed pass-through node
+        if len(incoming) == 1 or len(outgoing) == 1:
+            for before in incoming:
+                for after in outgoing:
+                    source, target = before["from_"], after["to"]
+                    if source != target and not _find_edge(edges, source, target):
+                        edges.append({"from_": source, "to": target, "label": after["label"] or before["label"]})
+
+    elif edit.op == "rename_node":
+        node = nodes.get(edit.node_id)
+        if node is None:
+            raise ValueError(f"unknown node '{edit.node_id}'")
+        if edit.type is not None and edit.type not in NODE_TYPES:
+            raise ValueError(f"invalid type '{edit.type}'")
+        for field in ("label", "type", "actor"):
+            if getattr(edit, field) is not None:
+                node[field] = getattr(edit, field)
+
+    else:  # Edge operations
+        for node_id in (edit.from_, edit.to, edit.new_from, edit.new_to):
+            if node_id is not None and node_id not in nodes:
+                raise ValueError(f"unknown node '{node_id}'")
+        if not edit.from_ or not edit.to:
+            raise ValueError("needs from and to")
+        edge = _find_edge(edges, edit.from_, edit.to)
+        if edit.op == "add_edge":
+            if edge is not None:
+                raise ValueError(f"edge {edit.from_} -> {edit.to} already exists")
+            edges.append({"from_": edit.from_, "to": edit.to, "label": edit.label})
+        elif edge is None:
+            raise ValueError(f"unknown edge {edit.from_} -> {edit.to}")
+        elif edit.op == "remove_edge":
+            edges.remove(edge)
+        else:  # reroute_edge
+            if not edit.new_from and not edit.new_to:
+                raise ValueError("needs new_from and/or new_to")
+            edge["from_"] = edit.new_from or edit.from_
+            edge["to"] = edit.new_to or edit.to
+            if edit.label is not None:
+                edge["label"] = edit.label
+
+
+def apply_graph_edits(
+    graph: Dict[str, Any], edits: List[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[str]]:
+    """
+    Applies edits to a ConversionOutput dict (the input is not modified).
+
+    Edits are applied in order; one that does not fit the graph (unknown
+    node, duplicate id, ...) is skipped and reported. The patched graph uses
+    the keys of ConversionOutput.model_dump() (edges: 'from_'), like the
+    ConversionAgent's output_key.
+
+    Returns:
+        (patched graph, applied edits, reasons of the rejected edits)
+    """
+    nodes = {str(n["id"]): dict(n) for n in graph.get("nodes") or []}
+    edges = [
+        {"from_": str(e.get("from", e.get("from_"))), "to": str(e.get("to")), "label": e.get("label")}
+        for e in graph.get("edges") or []
+    ]
+    applied, rejected = [], []
+    for raw in edits:
+        try:
+            edit = GraphEdit.model_validate(raw)
+            _apply(nodes, edges, edit)
+            applied.append(edit.model_dump(by_alias=True, exclude_none=True))
+        except (ValidationError, ValueError) as e:
+            reason = e.errors()[0]["msg"] if isinstance(e, ValidationError) else str(e)
+            rejected.append(f"Edit {json.dumps(raw, ensure_ascii=False, default=str)} could not be applied: {reason}")
+    return {"nodes": list(nodes.values()), "edges": edges}, applied, rejected
+
+
+# =============================================================================
+# Agent callback
+# =============================================================================
+
+def apply_quality_edits(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for the ConversionAgent (QUALITY_DELTA_FEEDBACK):
+    from the 2nd loop iteration on, patches 'conversion_output' with the
+    judge's edits and skips the LLM if nothing is left to fix.
+
+    Otherwise sets 'graph_refinement' (open issues) for the ConversionAgent's
+    reduced refinement prompt. The first iteration always converts from scratch.
+    """
+    if not config.QUALITY_DELTA_FEEDBACK:
+        return None
+    state = callback_context.state
+    state["graph_refinement"] = None
+    loop = state.get("quality_loop") or {}
+    graph = state.get("conversion_output")
+    if not isinstance(graph, dict) or loop.get("invocation_id") != callback_context.invocation_id:
+        state["graph_patches"] = []  # First iteration of this run
+        return None
+
+    verdict = state.get("quality_output") or {}
+    edits = verdict.get("edits") or []
+    issues = list(verdict.get("open_issues") or [])
+    structure = state.get("structure_check") or {}
+    if not verdict and structure and not structure.get("passed", True):
+        issues += structure.get("issues") or []  # Pre-gate failed: no judge verdict this iteration
+
+    applied: List[Dict[str, Any]] = []
+    if edits:
+        graph, applied, rejected = apply_graph_edits(graph, edits)
+        issues += rejected
+        state["conversion_output"] = graph
+        state["graph_patches"] = list(state.get("graph_patches") or []) + [{
+            "iteration": loop.get("iterations", 0) + 1,
+            "applied": len(applied),
+            "rejected": len(rejected),
+            "llm_skipped": bool(applied) and not issues,
+        }]
+        print(f"[Graph Patch] 🩹 Applied {len(applied)}/{len(edits)} judge edit(s) locally")
+
+    if applied and not issues:
+        log_direct_route(callback_context, f"{len(applied)} judge edits applied locally")
+        return types.Content(
+            role="model",
+            parts=[types.Part(text=f"Applied {len(applied)} quality edit(s) to the graph locally.")]
+        )
+
+    if issues:
+        state["graph_refinement"] = {"issues": [str(issue) for issue in issues]}
+        print(f"[Graph Patch] ✏️ {len(issues)} open issue(s) - refining the patched graph")
+    return None
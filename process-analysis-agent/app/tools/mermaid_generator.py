@@ -4,10 +4,12 @@ Tools for Mermaid diagram generation and rendering
 """
 
 import json
+import re
 import subprocess
 import os
 from typing import Dict, Any
 from app import config
+from app.agents.conversion_agent import NODE_TYPES
 
 def render_mermaid_to_svg(mermaid_code: str, output_path: str = "auto") -> Dict[str, Any]:
     """
@@ -118,66 +120,191 @@ def render_mermaid_to_svg(mermaid_code: str, output_path: str = "auto") -> Dict[
         }
 
 
-def generate_mermaid_code(process_structure: Dict[str, Any]) -> Dict[str, Any]:
+# =============================================================================
+# Graph -> Mermaid Compiler
+# =============================================================================
+
+# Mermaid entity codes for characters that break quoted labels or that the
+# validator's regexes would misread ('-->' inside a label, '|' in edge labels)
+_LABEL_ESCAPES = {
+    "#": "#35;",
+    '"': "#quot;",
+    "<": "#lt;",
+    ">": "#gt;",
+    "{": "#123;",
+    "}": "#125;",
+    "|": "#124;",
+    "[": "#91;",
+    "]": "#93;",
+}
+_LABEL_ESCAPE_PATTERN = re.compile("|".join(re.escape(c) for c in _LABEL_ESCAPES))
+
+_DEFAULT_SHAPE = ('["', '"]')  # task, user_task, service_task, ...
+
+# node type -> (opening, closing) delimiters around the quoted label; every
+# ConversionOutput node type (NODE_TYPES) has an entry
+_NODE_SHAPES = {
+    **{node_type: _DEFAULT_SHAPE for node_type in NODE_TYPES},
+    "start_event": ('(["', '"])'),
+    "end_event": ('(["', '"])'),
+    "exclusive_gateway": ('{"', '"}'),
+    "inclusive_gateway": ('{"', '"}'),
+    "decision": ('{"', '"}'),
+    "parallel_gateway": ('{{"', '"}}'),
+    "intermediate_event": ('(("', '"))'),
+    "event": ('(("', '"))'),
+    "subprocess": ('[["', '"]]'),
+}
+
+# Shown if a node has no label of its own
+_DEFAULT_LABELS = {
+    "parallel_gateway": "+",
+    "exclusive_gateway": "?",
+    "inclusive_gateway": "o",
+    "decision": "?",
+}
+
+
+def escape_mermaid_label(text: Any) -> str:
     """
-    Converts a Process Structure (Nodes + Edges) into Mermaid code.
-    
-    This function is technically redundant as the BPMN Generation Agent
-    creates Mermaid code directly. We keep it as a fallback or utility.
+    Makes arbitrary text safe for a double-quoted Mermaid label.
+
+    Collapses whitespace/newlines and replaces special characters with
+    Mermaid entity codes (e.g. '"' -> '#quot;').
+    """
+    collapsed = " ".join(str(text or "").split())
+    return _LABEL_ESCAPE_PATTERN.sub(lambda m: _LABEL_ESCAPES[m.group(0)], collapsed)
+
+
+def _mermaid_id(raw_id: str, used: set) -> str:
+    """
+    Stable, collision-free Mermaid ID for a graph node ID.
+
+    The 'n_' prefix keeps IDs clear of Mermaid keywords ('end', 'graph',
+    'subgraph') and of leading digits; the same graph always yields the same IDs.
+    """
+    base = "n_" + (re.sub(r"[^A-Za-z0-9_]", "_", str(raw_id)).strip("_") or "node")
+    candidate, suffix = base, 2
+    while candidate in used:
+        candidate, suffix = f"{base}_{suffix}", suffix + 1
+    used.add(candidate)
+    return candidate
+
+
+def generate_mermaid_code(
+    process_structure: Dict[str, Any],
+    direction: str = "TD",
+    group_by_actor: bool = True
+) -> Dict[str, Any]:
+    """
+    Compiles a Process Structure (ConversionOutput: Nodes + Edges) into Mermaid code.
+
+    Deterministic replacement for the LLM-based Mermaid generation: labels are
+    always quoted and escaped, IDs are sanitised, nodes with an actor are
+    grouped into one subgraph per actor. Edges pointing to unknown nodes and
+    duplicate node IDs are dropped and reported in 'warnings'.
+
+    Args:
+        process_structure: Dict with 'nodes' and 'edges' (edge keys 'from' or 'from_')
+        direction: Flowchart direction ('TD' or 'LR')
+        group_by_actor: Wrap the nodes of each actor in a subgraph
+
+    Returns:
+        Dict with 'success', 'mermaid_code' (raw, no ``` fences), 'message',
+        'warnings' and 'stats'
     """
     try:
-        nodes = process_structure.get("nodes", [])
-        edges = process_structure.get("edges", [])
-        
+        nodes = process_structure.get("nodes") or []
+        edges = process_structure.get("edges") or []
+
         if not nodes:
             return {
                 "success": False,
                 "error": "No nodes found in process structure",
                 "mermaid_code": ""
             }
-        
-        # Start Mermaid Flowchart
-        mermaid_lines = ["flowchart TD"]
-        
-        # Generate Node Definitions
+
+        warnings = []
+        used_ids = set()
+        id_map = {}        # graph node ID -> Mermaid ID
+        node_lines = {}    # Mermaid ID -> definition
+        lanes = {}         # actor -> [Mermaid IDs] (first-appearance order)
+        top_level = []
+
+        # 1. Node definitions
         for node in nodes:
-            node_id = node.get("id", "")
-            node_type = node.get("type", "task")
-            label = node.get("label", node_id)
-            
-            # Select syntax based on node type
-            if node_type == "start_event":
-                mermaid_lines.append(f"    {node_id}([{label}])")
-            elif node_type == "end_event":
-                mermaid_lines.append(f"    {node_id}([{label}])")
-            elif node_type in ["exclusive_gateway", "decision"]:
-                mermaid_lines.append(f"    {node_id}{{{label}?}}")
-            else:  # task
-                mermaid_lines.append(f"    {node_id}[{label}]")
-        
-        # Generate Edges
+            raw_id = str(node.get("id", "")).strip()
+            if not raw_id:
+                warnings.append("Node without ID skipped")
+                continue
+            if raw_id in id_map:
+                warnings.append(f"Duplicate node ID '{raw_id}' skipped")
+                continue
+
+            node_id = _mermaid_id(raw_id, used_ids)
+            id_map[raw_id] = node_id
+
+            node_type = str(node.get("type") or "task").strip().lower()
+            label = node.get("label") or _DEFAULT_LABELS.get(node_type, raw_id)
+            opening, closing = _NODE_SHAPES.get(node_type, _DEFAULT_SHAPE)
+            node_lines[node_id] = f"{node_id}{opening}{escape_mermaid_label(label)}{closing}"
+
+            actor = " ".join(str(node.get("actor") or "").split())
+            if group_by_actor and actor:
+                lanes.setdefault(actor, []).append(node_id)
+            else:
+                top_level.append(node_id)
+
+        mermaid_lines = [f"flowchart {direction}"]
+        mermaid_lines.extend(f"    {node_lines[n]}" for n in top_level)
+        for lane_index, (actor, lane_nodes) in enumerate(lanes.items(), start=1):
+            mermaid_lines.append(f'    subgraph lane_{lane_index}["{escape_mermaid_label(actor)}"]')
+            mermaid_lines.extend(f"        {node_lines[n]}" for n in lane_nodes)
+            mermaid_lines.append("    end")
+
+        # 2. Edges
+        seen_edges = set()
         for edge in edges:
-            from_node = edge.get("from", "")
-            to_node = edge.get("to", "")
-            edge_label = edge.get("label", "")
-            
+            from_raw = str(edge.get("from", edge.get("from_", ""))).strip()
+            to_raw = str(edge.get("to", "")).strip()
+            if from_raw not in id_map or to_raw not in id_map:
+                warnings.append(f"Edge {from_raw} -> {to_raw} references an unknown node, skipped")
+                continue
+
+            edge_label = escape_mermaid_label(edge.get("label"))
+            key = (id_map[from_raw], id_map[to_raw], edge_label)
+            if key in seen_edges:
+                continue
+            seen_edges.add(key)
+
             if edge_label:
-                mermaid_lines.append(f"    {from_node} -->|{edge_label}| {to_node}")
+                mermaid_lines.append(f'    {key[0]} -->|"{edge_label}"| {key[1]}')
             else:
-                mermaid_lines.append(f"    {from_node} --> {to_node}")
-        
-        # Combine
+                mermaid_lines.append(f"    {key[0]} --> {key[1]}")
+
         mermaid_code = "\n".join(mermaid_lines)
-        full_code = f"```mermaid\n{mermaid_code}\n```"
-        
-        print(f"[Mermaid Generator] ✅ Code generated ({len(nodes)} Nodes, {len(edges)} Edges)")
-        
+        stats = {
+            "nodes": len(id_map),
+            "edges": len(seen_edges),
+            "lanes": len(lanes),
+            "skipped": len(warnings)
+        }
+
+        print(
+            f"[Mermaid Generator] ✅ Code generated ({stats['nodes']} Nodes, "
+            f"{stats['edges']} Edges, {stats['lanes']} Lanes)"
+        )
+        for warning in warnings:
+            print(f"[Mermaid Generator] ⚠️ {warning}")
+
         return {
             "success": True,
-            "mermaid_code": full_code,
-            "message": "Mermaid code successfully generated"
+            "mermaid_code": mermaid_code,
+            "message": "Mermaid code successfully generated",
+            "warnings": warnings,
+            "stats": stats
         }
-        
+
     except Exception as e:
         error_msg = f"❌ Error generating Mermaid: {str(e)}"
         print(f"[Mermaid Generator] {error_msg}")
@@ -185,4 +312,4 @@ def generate_mermaid_code(process_structure: Dict[str, Any]) -> Dict[str, Any]:
             "success": False,
             "error": error_msg,
             "mermaid_code": ""
-        }
\ No newline at end of file
+        }
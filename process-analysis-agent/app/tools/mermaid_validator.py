@@ -22,7 +22,7 @@ def validate_mermaid_syntax(mermaid_code: str) -> Dict[str, Any]:
     # Remove Code Block Wrapper
     code = mermaid_code.strip()
     if code.startswith("```mermaid"):
-        code = code.replace("``````", "").strip()
+        code = code.replace("```mermaid", "").replace("```", "").strip()
     
     # Split into lines
     lines = [line.strip() for line in code.split("\n") if line.strip()]
@@ -38,7 +38,7 @@ def validate_mermaid_syntax(mermaid_code: str) -> Dict[str, Any]:
     referenced_nodes = set()
     
     node_pattern = r"^(\w+)[\[\(\{]"  # Matches: NodeID[...], NodeID(...), NodeID{...}
-    edge_pattern = r"(\w+)\s*-->.*?(\w+)"  # Matches: Node1 --> Node2 or Node1 -->|label| Node2
+    edge_pattern = r"(\w+)\s*-->\s*(?:\|[^|]*\|\s*)?(\w+)"  # Matches: Node1 --> Node2 or Node1 -->|label| Node2
     
     for line in lines[1:]:  # Skip first line (flowchart TD)
         # Check for Node Definition
@@ -73,14 +73,20 @@ def validate_mermaid_syntax(mermaid_code: str) -> Dict[str, Any]:
     gateway_pattern = r"(\w+)\{.*?\}"  # Matches: GW1{...}
     gateways = []
     for line in lines:
-        gw_match = re.search(gateway_pattern, line)
+        # Ignore braces inside quoted labels
+        gw_match = re.search(gateway_pattern, re.sub(r'"[^"]*"', '""', line))
         if gw_match:
             gateways.append(gw_match.group(1))
     
     for gw in gateways:
-        # Count edges originating from this gateway
+        # Count edges originating from / ending in this gateway
         outgoing_edges = sum(1 for line in lines if re.search(rf"\b{gw}\s*-->", line))
-        if outgoing_edges < 2:
+        incoming_edges = sum(
+            1 for line in lines
+            if re.search(rf"-->\s*(?:\|[^|]*\|\s*)?{gw}\b", line)
+        )
+        # Joins (merging several incoming flows) legitimately have one output
+        if outgoing_edges < 2 and incoming_edges < 2:
             warnings.append(
                 f"Gateway '{gw}' has only {outgoing_edges} outgoing edge(s). "
                 f"Expected: at least 2."
@@ -89,8 +95,9 @@ def validate_mermaid_syntax(mermaid_code: str) -> Dict[str, Any]:
     # 7. Check: Potentially problematic special characters
     problematic_chars = ["\"", "'", ";", "|"]  # | is OK in labels but risky elsewhere
     for line in lines:
-        # Ignore Labels in -->|...|
+        # Ignore Labels in -->|...| and quoted node labels ["..."]
         cleaned_line = re.sub(r"-->\|.*?\|", "", line)
+        cleaned_line = re.sub(r'"[^"]*"', "", cleaned_line)
         for char in problematic_chars:
             if char in cleaned_line:
                 warnings.append(
@@ -0,0 +1,26 @@
+"""
+tools/pdf_pages.py
+Page text extraction shared by pdf_parser and its process pool workers.
+
+Kept apart from pdf_parser (which imports the ADK), so unpickling the pool's
+worker function only needs this module and PyPDF2.
+"""
+
+from typing import List
+
+
+def open_pdf(pdf_path: str):
+    """PdfReader for the file (PyPDF2 is only imported once a PDF is parsed)."""
+    from PyPDF2 import PdfReader
+
+    return PdfReader(pdf_path)
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """
+    Worker: extracts pages [start, end) from a PDF.
+
+    Each worker opens its own reader - PdfReader objects are not picklable.
+    """
+    reader = open_pdf(pdf_path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
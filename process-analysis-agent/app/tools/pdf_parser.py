@@ -2,22 +2,169 @@
 tools/pdf_parser.py
 Custom Tool for PDF Parsing using PyPDF2
 Now with Session State integration!
+
+Pages are streamed via 'iter_pdf_pages' and - for larger documents - spread
+over a process pool, so the page limit is a soft budget, not a hard failure.
+The pool is created on first use and shared by all later documents.
 """
 
-import json
-from typing import Dict, Any
-from PyPDF2 import PdfReader
-from google.adk.tools import ToolContext  
+import atexit
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+from google.adk.tools import ToolContext
 from app import config
+from app.app_utils.disk_cache import DiskCache
+from app.tools.pdf_pages import extract_page_range, open_pdf
+
+# Bump whenever the extraction output format changes (invalidates the cache)
+PARSER_VERSION = "2"
+
+_cache: Optional[DiskCache] = None
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_cache() -> DiskCache:
+    """Lazily creates the process-wide extracted-text cache."""
+    global _cache
+    if _cache is None:
+        _cache = DiskCache(config.PDF_CACHE_DIR, config.PDF_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
+
+
+def _cache_key(pdf_path: str) -> str:
+    """SHA-256 of the PDF bytes + everything that influences the output."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"{digest.hexdigest()}-v{PARSER_VERSION}-p{config.PDF_MAX_PAGES}"
+
+
+def _available_cores() -> int:
+    """Number of CPU cores this process may actually run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Lazily creates the process-wide extraction pool.
+
+    parse_pdf runs in a worker thread of the event loop, and forking a
+    multi-threaded process can deadlock the child. Workers are therefore
+    forked from a single-threaded fork server ('spawn' where that is not
+    available, e.g. on Windows). Every worker re-imports the main module
+    (and with it the ADK); the fork server preloads the app modules loaded
+    here, so workers start warm. The pool is kept for the process lifetime
+    instead of being created per document.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                main_spec = getattr(sys.modules["__main__"], "__spec__", None)
+                preload = sorted(name for name in sys.modules if name.split(".")[0] == "app")
+                context.set_forkserver_preload(preload + ([main_spec.name] if main_spec else []))
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drops a broken pool (a worker died), so the next document gets a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_pages(
+    pdf_path: str,
+    max_pages: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    reader=None
+) -> Iterator[Tuple[int, str]]:
+    """
+    Streams (page_number, page_text) tuples in page order.
+
+    Small documents are extracted in-process. Larger ones are split into
+    batches of config.PDF_PAGES_PER_TASK pages and distributed over the
+    shared process pool (sized on first use); at most two batches per worker
+    are in flight, so memory stays bounded regardless of document length.
+
+    Args:
+        pdf_path: Path to the PDF file
+        max_pages: Stop after this many pages (None = all pages)
+        max_workers: Pool size when the pool is created, and the limit of
+            in-flight batches (default: config.PDF_WORKERS or available cores)
+        reader: Already opened PdfReader of the file (avoids parsing it twice)
+
+    Yields:
+        Tuples of 1-based page number and extracted text
+    """
+    if reader is None:
+        reader = open_pdf(pdf_path)
+    num_pages = len(reader.pages)
+    if max_pages is not None:
+        num_pages = min(num_pages, max_pages)
+
+    workers = max_workers or config.PDF_WORKERS or _available_cores()
+
+    if workers <= 1 or num_pages < config.PDF_PARALLEL_MIN_PAGES:
+        for i in range(num_pages):
+            yield i + 1, reader.pages[i].extract_text() or ""
+        return
+
+    batch = config.PDF_PAGES_PER_TASK
+    ranges = [(s, min(s + batch, num_pages)) for s in range(0, num_pages, batch)]
+    pending: Deque[Tuple[int, Future]] = deque()
+
+    executor = _get_pool(workers)
+    try:
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            # Keep the pipeline full, but never more than 2 batches per worker
+            while next_range < len(ranges) and len(pending) < 2 * workers:
+                start, end = ranges[next_range]
+                pending.append(
+                    (start, executor.submit(extract_page_range, pdf_path, start, end))
+                )
+                next_range += 1
+
+            start, future = pending.popleft()
+            for offset, page_text in enumerate(future.result()):
+                yield start + offset + 1, page_text
+    except BrokenProcessPool:
+        _discard_pool(executor)
+        raise
+    finally:
+        # Also runs if the consumer stops iterating early (the pool stays up)
+        for _, future in pending:
+            future.cancel()
+
 
 def parse_pdf(pdf_path: str, tool_context: ToolContext = None) -> Dict[str, Any]:
     """
     Extracts text from a PDF and saves the path to session state.
-    
+
     Args:
         pdf_path: Path to the PDF file
         tool_context: ADK Tool Context (injected automatically)
-        
+
     Returns:
         Dict containing extracted_text and metadata
     """
@@ -28,41 +175,70 @@ def parse_pdf(pdf_path: str, tool_context: ToolContext = None) -> Dict[str, Any]
             tool_context.session.state["pdf_path"] = pdf_path
         # -------------------------------------------------------
 
-        # Open PDF
-        reader = PdfReader(pdf_path)
-        
-        # Check page count
+        # Cache lookup (content-addressed, so renamed/copied files still hit)
+        cache_key = None
+        if config.PDF_CACHE_ENABLED:
+            cache = _get_cache()
+            cache_key = _cache_key(pdf_path)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                cached["metadata"]["cache"] = {"hit": True, **cache.stats()}
+                result = {
+                    "success": True,
+                    "extracted_text": cached["extracted_text"],
+                    "metadata": cached["metadata"],
+                    "message": f"✅ Loaded {cached['metadata']['pages_extracted']} pages from cache"
+                }
+                print(f"[PDF Parser] {result['message']}")
+                return result
+
+        # Open PDF (metadata only - pages are streamed below)
+        reader = open_pdf(pdf_path)
+
+        # Check page count against the (soft) budget
         num_pages = len(reader.pages)
-        if num_pages > config.PDF_MAX_PAGES:
-            raise ValueError(
-                f"PDF has {num_pages} pages, "
-                f"maximum allowed is {config.PDF_MAX_PAGES}"
+        truncated = num_pages > config.PDF_MAX_PAGES
+        if truncated:
+            print(
+                f"[PDF Parser] ⚠️ PDF has {num_pages} pages, "
+                f"budget is {config.PDF_MAX_PAGES}. Extracting the first "
+                f"{config.PDF_MAX_PAGES} pages only."
             )
-        
-        # Extract text from all pages
-        extracted_text = ""
-        for page_num, page in enumerate(reader.pages, 1):
-            page_text = page.extract_text()
+
+        # Extract text page by page (parts are joined once at the end)
+        parts = []
+        pages_extracted = 0
+        for page_num, page_text in iter_pdf_pages(
+            pdf_path, max_pages=config.PDF_MAX_PAGES, reader=reader
+        ):
+            pages_extracted = page_num
             if page_text:
-                extracted_text += f"\n--- Page {page_num} ---\n{page_text}"
-        
+                parts.append(f"--- Page {page_num} ---\n{page_text}")
+        extracted_text = "\n".join(parts)
+
         # Metadata
         metadata = {
             "num_pages": num_pages,
+            "pages_extracted": pages_extracted,
+            "truncated": truncated,
             "title": reader.metadata.title if reader.metadata else None,
             "author": reader.metadata.author if reader.metadata else None
         }
-        
+
+        if cache_key:
+            cache.put(cache_key, {"extracted_text": extracted_text.strip(), "metadata": metadata})
+            metadata = {**metadata, "cache": {"hit": False, **cache.stats()}}
+
         result = {
             "success": True,
             "extracted_text": extracted_text.strip(),
             "metadata": metadata,
-            "message": f"✅ Successfully extracted {num_pages} pages"
+            "message": f"✅ Successfully extracted {pages_extracted} pages"
         }
-        
+
         print(f"[PDF Parser] {result['message']}")
         return result
-        
+
     except FileNotFoundError:
         error_msg = f"❌ PDF not found: {pdf_path}"
         print(f"[PDF Parser] {error_msg}")
@@ -72,7 +248,7 @@ def parse_pdf(pdf_path: str, tool_context: ToolContext = None) -> Dict[str, Any]
             "extracted_text": "",
             "metadata": {}
         }
-    
+
     except Exception as e:
         error_msg = f"❌ Error parsing PDF: {str(e)}"
         print(f"[PDF Parser] {error_msg}")
@@ -81,4 +257,4 @@ def parse_pdf(pdf_path: str, tool_context: ToolContext = None) -> Dict[str, Any]
             "error": error_msg,
             "extracted_text": "",
             "metadata": {}
-        }
\ No newline at end of file
+        }
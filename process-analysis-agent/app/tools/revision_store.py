@@ -0,0 +1,169 @@
+"""
+tools/revision_store.py
+Per-document revision records for incremental re-analysis.
+
+For every document (keyed by its normalised full path) the latest run stores:
+- the content hashes of its analysis chunks and the per-chunk analyses,
+- the hash of the merged process graph,
+- the Mermaid code of the last approved diagram for that graph.
+
+A new revision only re-analyses chunks whose hash changed, and the Mermaid
+generation is skipped if the merged graph is identical to the stored one.
+Chunk keys and the graph hash include fingerprints of the prompts, schemas
+and models (analysis_version / pipeline_version), so changing any of them
+invalidates the stored results instead of replaying them.
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from app import config
+from app.app_utils.disk_cache import DiskCache
+
+# Bump for changes the fingerprints below cannot see (e.g. the Mermaid
+# compiler or the merge logic); invalidates all stored revisions
+REVISION_VERSION = "1"
+
+_store: Optional[DiskCache] = None
+
+
+def _get_store() -> DiskCache:
+    """Lazily creates the revision store (size-bounded, atomic writes)."""
+    global _store
+    if _store is None:
+        _store = DiskCache(config.REVISION_STORE_DIR, config.REVISION_STORE_MAX_MB * 1024 * 1024)
+    return _store
+
+
+def document_key(pdf_path: str) -> str:
+    """
+    Stable identifier shared by all revisions of a document.
+
+    File name plus a hash of the normalised full path, so same-named PDFs in
+    different folders (recursive batch discovery) keep separate revisions.
+    """
+    path = os.path.normcase(os.path.realpath(pdf_path)) if pdf_path else ""
+    base = os.path.splitext(os.path.basename(path))[0]
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", base) or "unknown_source"
+    return f"{name}-{hashlib.sha256(path.encode('utf-8')).hexdigest()[:10]}"
+
+
+def _fingerprint(*parts: Any) -> str:
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+def analysis_version() -> str:
+    """Fingerprint of everything that shapes a chunk analysis: prompts, schema, model, wire format."""
+    from app.agents.pdf_analysis_agent import PROMPT_VERSION, PdfAnalysisOutput
+
+    return _fingerprint(
+        REVISION_VERSION, PROMPT_VERSION, PdfAnalysisOutput.model_json_schema(),
+        config.MODEL_FLASH_THINKING, config.COMPACT_OUTPUT,
+    )
+
+
+def pipeline_version() -> str:
+    """
+    Fingerprint of everything that turns an analysis into the stored diagram:
+    the analysis version plus the conversion/quality prompts, schemas, models
+    and loop settings.
+    """
+    from app.agents.conversion_agent import ConversionOutput
+    from app.agents.quality_agent import DeltaQualityOutput
+
+    return _fingerprint(
+        analysis_version(),
+        config.SYSTEM_PROMPT_CONVERSION, config.SYSTEM_PROMPT_QUALITY, config.SYSTEM_PROMPT_BPMN_GENERATION,
+        ConversionOutput.model_json_schema(), DeltaQualityOutput.model_json_schema(),
+        config.MODEL_PRO, config.MODEL_ROUTING, config.CONVERSION_MODE, config.CONVERSION_CANDIDATES,
+        config.MAX_QUALITY_ITERATIONS, config.MIN_QUALITY_SCORE, config.QUALITY_DELTA_FEEDBACK,
+        config.STRUCTURE_PRE_GATE, config.USE_LLM_MERMAID_GENERATION,
+    )
+
+
+def graph_hash(graph: Dict[str, Any]) -> str:
+    """Order-stable hash of a JSON-serialisable process graph."""
+    canonical = json.dumps(graph, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def load_revision(doc_key: str) -> Dict[str, Any]:
+    """Returns the stored record of the last run (empty dict if none)."""
+    return _get_store().get(doc_key) or {}
+
+
+def save_revision(doc_key: str, record: Dict[str, Any]) -> None:
+    """Atomically replaces the stored record of a document."""
+    record = {**record, "document": doc_key, "updated": datetime.now().isoformat()}
+    _get_store().put(doc_key, record)
+
+
+# =============================================================================
+# Agent callbacks
+# =============================================================================
+
+def skip_if_graph_unchanged(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback: skips an agent if the process graph is unchanged.
+
+    Returning content makes ADK skip the agent run and use that content as
+    the agent's response.
+    """
+    if not callback_context.state.get("graph_unchanged"):
+        return None
+
+    print(f"[Revision Store] ⏩ Graph unchanged - skipping {callback_context.agent_name}")
+    return types.Content(
+        role="model",
+        parts=[types.Part(text="Process graph unchanged since the last revision. Reusing the stored diagram.")]
+    )
+
+
+def reuse_mermaid_if_graph_unchanged(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for the BPMN generation: replays the stored Mermaid
+    code instead of regenerating it when the process graph is unchanged.
+    """
+    if not callback_context.state.get("graph_unchanged"):
+        return None
+
+    mermaid_code = callback_context.state.get("current_mermaid_code", "")
+    print(f"[Revision Store] ⏩ Graph unchanged - reusing stored Mermaid code ({len(mermaid_code)} chars)")
+    return types.Content(role="model", parts=[types.Part(text=mermaid_code)])
+
+
+def record_mermaid_revision(callback_context: CallbackContext) -> None:
+    """
+    after_agent_callback for the PublicationAgent: stores the published
+    Mermaid code and its graph together with the hash of the analysis it
+    came from. Only approved diagrams are stored - a rejected or pending one
+    must never be replayed for a later revision.
+    """
+    state = callback_context.state
+    doc_key = state.get("document_key")
+    analysis_hash = state.get("analysis_hash")
+    mermaid_code = state.get("current_mermaid_code")
+    if not (config.INCREMENTAL_ANALYSIS and doc_key and analysis_hash and mermaid_code):
+        return None
+    if state.get("approval_status") != "APPROVED" or state.get("graph_unchanged"):
+        return None  # Not approved, or the stored diagram was just replayed
+
+    record = load_revision(doc_key)
+    if record.get("analysis_hash") != analysis_hash:
+        return None  # A newer revision was analysed meanwhile
+
+    record.update({
+        "mermaid_code": mermaid_code,
+        "conversion_output": state.get("conversion_output"),
+        "mermaid_analysis_hash": analysis_hash,
+    })
+    save_revision(doc_key, record)
+    print(f"[Revision Store] 💾 Approved Mermaid code stored for '{doc_key}'")
+    return None
@@ -0,0 +1,243 @@
+"""
+tools/structure_checker.py
+Deterministic structural checks of a ConversionOutput graph (pre-gate of the quality loop).
+
+Graph checks (ConversionOutput alone) - hard errors, block the judge:
+- duplicate node IDs, edges referencing unknown nodes
+- at least one start_event and one end_event
+- every node is reachable from a start event, no dead ends (non-end nodes without outgoing edge)
+
+Warnings (reported in 'warnings'/'metrics', never block - the label matching
+is crude and the ConversionAgent is told to merge and shorten steps):
+- gateways that are neither a split (>= 2 outgoing) nor a join (>= 2 incoming)
+- actor coverage: analysis actors that appear as node actors
+- step coverage: analysis tasks/decisions that have a node with a matching label
+
+Only graphs with hard errors skip the LLM judge (QualityAgent).
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from app import config
+from app.agents.conversion_agent import NODE_TYPES
+
+GATEWAY_TYPES = {t for t in NODE_TYPES if t.endswith("_gateway") or t == "decision"}
+START_TYPES = {"start_event"}
+END_TYPES = {"end_event"}
+
+# Words that carry no meaning for label matching
+_STOPWORDS = {
+    "the", "and", "for", "with", "from", "into", "that", "this", "are", "is",
+    "der", "die", "das", "und", "mit", "von", "für", "den", "dem", "ein", "eine",
+}
+# Crude stemming: compare word prefixes ('approves' ~ 'approval')
+_STEM_LENGTH = 5
+# Max number of listed items per issue in the feedback
+_MAX_LISTED = 5
+
+
+def _norm(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _tokens(text: Optional[str]) -> Set[str]:
+    """Stemmed content words of a label/action."""
+    words = re.findall(r"\w+", (text or "").lower())
+    return {w[:_STEM_LENGTH] for w in words if len(w) >= 3 and w not in _STOPWORDS}
+
+
+def _listed(items) -> str:
+    items = sorted(items)
+    shown = ", ".join(f"'{i}'" for i in items[:_MAX_LISTED])
+    return shown + (f" (+{len(items) - _MAX_LISTED} more)" if len(items) > _MAX_LISTED else "")
+
+
+def _step_covered(step_tokens: Set[str], label_tokens: List[Set[str]]) -> bool:
+    """A step is covered if at least half of some node label's words occur in it."""
+    return any(
+        labels and len(step_tokens & labels) >= max(1, len(labels) / 2)
+        for labels in label_tokens
+    )
+
+
+def check_process_structure(
+    conversion: Dict[str, Any],
+    analysis: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Runs all structural and coverage checks on a conversion graph.
+
+    Args:
+        conversion: ConversionOutput as dict ('nodes', 'edges'; edge keys 'from' or 'from_')
+        analysis: PdfAnalysisOutput as dict (optional, enables the coverage checks)
+
+    Returns:
+        Dict with 'passed' (no hard errors), 'issues' (hard errors), 'warnings',
+        'metrics' and 'feedback' (both lists)
+    """
+    nodes = conversion.get("nodes") or []
+    edges = conversion.get("edges") or []
+    issues: List[str] = []
+    warnings: List[str] = []
+
+    # --- Graph checks ---
+    node_ids = [str(n.get("id", "")) for n in nodes]
+    id_set = set(node_ids)
+    types_by_id = {str(n.get("id", "")): _norm(n.get("type")) for n in nodes}
+
+    duplicates = {i for i in id_set if node_ids.count(i) > 1}
+    if duplicates:
+        issues.append(f"Duplicate node IDs: {_listed(duplicates)}. Every node needs a unique ID.")
+
+    pairs = [(str(e.get("from", e.get("from_", ""))), str(e.get("to", ""))) for e in edges]
+    dangling = {f"{s} -> {t}" for s, t in pairs if s not in id_set or t not in id_set}
+    if dangling:
+        issues.append(f"Edges reference unknown node IDs: {_listed(dangling)}. Use only IDs defined in 'nodes'.")
+    valid_pairs = [(s, t) for s, t in pairs if s in id_set and t in id_set]
+
+    starts = {i for i, t in types_by_id.items() if t in START_TYPES}
+    ends = {i for i, t in types_by_id.items() if t in END_TYPES}
+    if not starts:
+        issues.append("No 'start_event' node. Add exactly one start event.")
+    if not ends:
+        issues.append("No 'end_event' node. Add at least one end event.")
+
+    outgoing = {i: set() for i in id_set}
+    incoming = {i: set() for i in id_set}
+    for s, t in valid_pairs:
+        outgoing[s].add(t)
+        incoming[t].add(s)
+
+    gateways = {i for i, t in types_by_id.items() if t in GATEWAY_TYPES}
+    weak_gateways = {g for g in gateways if len(outgoing[g]) < 2 and len(incoming[g]) < 2}
+    if weak_gateways:
+        warnings.append(
+            f"Gateways with fewer than 2 outgoing edges: {_listed(weak_gateways)}. "
+            "A split gateway needs one outgoing edge per branch (with condition labels), "
+            "otherwise replace it by a task or remove it."
+        )
+
+    reachable: Set[str] = set()
+    frontier = list(starts)
+    while frontier:
+        current = frontier.pop()
+        if current not in reachable:
+            reachable.add(current)
+            frontier.extend(outgoing[current] - reachable)
+    unreachable = id_set - reachable if starts else set()
+    if unreachable:
+        issues.append(f"Nodes not reachable from the start event: {_listed(unreachable)}. Connect them to the flow.")
+
+    dead_ends = {i for i in id_set if not outgoing[i] and i not in ends}
+    if dead_ends:
+        issues.append(f"Nodes without outgoing edge (dead ends): {_listed(dead_ends)}. Connect them to the next step or an end event.")
+
+    metrics: Dict[str, Any] = {
+        "nodes": len(id_set),
+        "edges": len(valid_pairs),
+        "dangling_edges": len(dangling),
+        "gateways": len(gateways),
+        "unreachable_nodes": len(unreachable),
+        "dead_ends": len(dead_ends),
+    }
+
+    # --- Coverage checks ---
+    if analysis:
+        analysis_actors = {_norm(a): a for a in analysis.get("actors") or [] if _norm(a)}
+        graph_actors = {_norm(n.get("actor")) for n in nodes if _norm(n.get("actor"))}
+        missing_actors = set(analysis_actors) - graph_actors
+        actor_coverage = 1 - len(missing_actors) / len(analysis_actors) if analysis_actors else 1.0
+        if actor_coverage < config.MIN_ACTOR_COVERAGE:
+            warnings.append(
+                f"Actors from the analysis missing in the graph: "
+                f"{_listed(analysis_actors[a] for a in missing_actors)}. Set the 'actor' field of their nodes."
+            )
+
+        label_tokens = [
+            _tokens(n.get("label")) for n in nodes
+            if _norm(n.get("type")) not in START_TYPES | END_TYPES
+        ]
+        steps = [
+            s for s in analysis.get("steps") or []
+            if _norm(s.get("type")) not in START_TYPES | END_TYPES and _tokens(s.get("action"))
+        ]
+        missing_steps = [s.get("action", "") for s in steps if not _step_covered(_tokens(s.get("action")), label_tokens)]
+        step_coverage = 1 - len(missing_steps) / len(steps) if steps else 1.0
+        if step_coverage < config.MIN_STEP_COVERAGE:
+            warnings.append(
+                f"Only {step_coverage:.0%} of the analysed steps have a node with a matching label "
+                f"(expected: {config.MIN_STEP_COVERAGE:.0%}). Check whether these are covered: "
+                f"{_listed(missing_steps)}."
+            )
+
+        metrics.update({
+            "actor_coverage": round(actor_coverage, 3),
+            "step_coverage": round(step_coverage, 3),
+            "missing_actors": sorted(analysis_actors[a] for a in missing_actors),
+            "missing_steps": missing_steps,
+            "extra_actors": sorted(graph_actors - set(analysis_actors)),
+        })
+
+    feedback = "\n".join(
+        [f"- {issue}" for issue in issues] + [f"- (warning) {warning}" for warning in warnings]
+    )
+    return {
+        "passed": not issues,
+        "issues": issues,
+        "warnings": warnings,
+        "metrics": metrics,
+        "feedback": feedback,
+    }
+
+
+def structure_score(result: Dict[str, Any]) -> float:
+    """
+    Local 0..1 score of a checked graph (used to rank conversion candidates).
+
+    Mean of actor and step coverage, minus 0.1 per hard error.
+    """
+    metrics = result["metrics"]
+    coverage = (metrics.get("actor_coverage", 1.0) + metrics.get("step_coverage", 1.0)) / 2
+    return round(max(0.0, coverage - 0.1 * len(result["issues"])), 3)
+
+
+# =============================================================================
+# Agent callback
+# =============================================================================
+
+def structural_pre_gate(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for the QualityAgent: checks the latest conversion
+    graph locally and skips the LLM judge if the structure is broken (hard
+    errors only; coverage and gateway warnings never block).
+
+    The returned content (the precise issue list) becomes the QualityAgent's
+    response, so the ConversionAgent sees it in its next iteration.
+    """
+    state = callback_context.state
+    conversion = state.get("conversion_output")
+    if not config.STRUCTURE_PRE_GATE or not isinstance(conversion, dict):
+        return None
+
+    result = check_process_structure(conversion, state.get("pdf_analysis"))
+    state["structure_check"] = result
+
+    if result["passed"]:
+        warned = f" ({len(result['warnings'])} warning(s))" if result["warnings"] else ""
+        print(f"[Structure Checker] ✅ Structural checks passed{warned} - running the quality judge")
+        return None
+
+    state["quality_judge_skipped"] = state.get("quality_judge_skipped", 0) + 1
+    state["quality_output"] = None  # No judge verdict for this iteration
+    print(f"[Structure Checker] ❌ {len(result['issues'])} structural issue(s) - skipping the quality judge")
+    return types.Content(
+        role="model",
+        parts=[types.Part(text=(
+            "STRUCTURAL CHECK FAILED (quality evaluation skipped).\n"
+            "ConversionAgent: fix the following issues in the next version of the graph:\n"
+            + result["feedback"]
+        ))]
+    )
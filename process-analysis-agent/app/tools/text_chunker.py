@@ -0,0 +1,120 @@
+"""
+tools/text_chunker.py
+Splits extracted PDF text into sections and size-bounded chunks.
+
+Section boundaries are the '--- Page N ---' markers written by parse_pdf
+and heading lines (Markdown '#' headings or numbered headings like '2.1 Scope').
+
+Chunk boundaries are content-defined, so an edit in one section of a revised
+document only changes the chunk(s) around it - the basis for incremental
+re-analysis.
+"""
+
+import hashlib
+import re
+from typing import List
+
+PAGE_MARKER_PATTERN = re.compile(r"^--- Page (\d+) ---$")
+HEADING_PATTERN = re.compile(r"^(#{1,6}\s+\S.*|\d+(\.\d+)*\.?\s+[A-ZÄÖÜ][^.!?]{0,80})$")
+
+# On average every 4th section may end a chunk (once it is half full)
+BOUNDARY_MODULUS = 4
+
+
+def content_hash(text: str) -> str:
+    """
+    SHA-256 of a text, ignoring page markers and whitespace layout.
+
+    Inserting a page earlier in the document renumbers the markers but
+    leaves the hashes of unchanged sections intact.
+    """
+    lines = [
+        line.strip() for line in text.split("\n")
+        if line.strip() and not PAGE_MARKER_PATTERN.match(line.strip())
+    ]
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def _is_boundary_section(section: str) -> bool:
+    """Content-defined chunk boundary (independent of the section's position)."""
+    return int(content_hash(section)[:8], 16) % BOUNDARY_MODULUS == 0
+
+
+def split_into_sections(text: str) -> List[str]:
+    """
+    Splits text in front of every page marker and heading line.
+
+    Args:
+        text: Extracted PDF text
+
+    Returns:
+        Non-empty sections in document order (joined they reproduce the text)
+    """
+    sections = []
+    current: List[str] = []
+
+    for line in text.split("\n"):
+        stripped = line.strip()
+        is_boundary = bool(
+            PAGE_MARKER_PATTERN.match(stripped) or HEADING_PATTERN.match(stripped)
+        )
+        if is_boundary and any(l.strip() for l in current):
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+
+    if any(l.strip() for l in current):
+        sections.append("\n".join(current))
+    return sections
+
+
+def _split_oversized(section: str, max_chars: int) -> List[str]:
+    """Splits a single section that exceeds max_chars on line boundaries."""
+    pieces = []
+    current: List[str] = []
+    size = 0
+    for line in section.split("\n"):
+        if current and size + len(line) + 1 > max_chars:
+            pieces.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def split_into_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Packs consecutive sections into chunks of at most max_chars characters.
+
+    A section is only split mid-way if it alone exceeds max_chars. Besides
+    the size limit, a chunk also ends after a "boundary section" (chosen by
+    content hash) once it is at least half full, so chunk boundaries
+    re-synchronise right after an edited section.
+
+    Args:
+        text: Extracted PDF text
+        max_chars: Upper bound for the size of a chunk
+
+    Returns:
+        Chunks in document order (a single chunk for short documents)
+    """
+    chunks = []
+    current: List[str] = []
+    size = 0
+
+    for section in split_into_sections(text):
+        for piece in _split_oversized(section, max_chars) if len(section) > max_chars else [section]:
+            if current and size + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+            if size >= max_chars // 2 and _is_boundary_section(piece):
+                chunks.append("\n".join(current))
+                current, size = [], 0
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,118 @@
+"""
+tools/text_preprocessor.py
+Shrinks extracted PDF text before it reaches any LLM prompt.
+
+- Drops headers/footers/disclaimers: lines at the top or bottom of a page
+  that repeat (digits ignored) on a large share of all pages.
+- Drops standalone page numbers ('3', 'Page 3 of 10', 'Seite 3/10') among
+  those top/bottom lines - numbers in the body (years, amounts, table cells,
+  list markers) are kept.
+- Joins words hyphenated across line breaks ('Bestell-\\nanforderung'), but
+  not coordinated forms ('Ein-\\nund Verkauf').
+- Normalises whitespace (runs of spaces, trailing blanks, empty lines).
+
+'--- Page N ---' markers are kept, the chunker relies on them.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+from app import config
+from app.app_utils.tokens import estimate_tokens
+from app.tools.text_chunker import PAGE_MARKER_PATTERN
+
+PAGE_NUMBER_PATTERN = re.compile(
+    r"^(page|seite|s\.)?\s*\d{1,4}(\s*(of|von|/)\s*\d{1,4})?$", re.IGNORECASE
+)
+# Only a lowercase continuation joins; 'Ein-\nund Verkauf' keeps its hyphen
+HYPHENATION_PATTERN = re.compile(r"(\w)-\n(\s*)(?!(?:und|oder|and|or)\b)([a-zäöüß])")
+SPACES_PATTERN = re.compile(r"[ \t ]+")
+
+
+def _split_pages(text: str) -> List[List[str]]:
+    """Splits text into pages (lists of lines); each page starts with its marker."""
+    pages: List[List[str]] = [[]]
+    for line in text.split("\n"):
+        if PAGE_MARKER_PATTERN.match(line.strip()) and pages[-1]:
+            pages.append([])
+        pages[-1].append(line)
+    return pages
+
+
+def _signature(line: str) -> str:
+    """Normalised form used to recognise repeated lines (digits ignored)."""
+    return re.sub(r"\d+", "#", SPACES_PATTERN.sub(" ", line).strip().lower())
+
+
+def _edge_indices(page: List[str], edge: int) -> List[int]:
+    """Positions of the first and last 'edge' non-empty content lines of a page."""
+    content = [i for i, l in enumerate(page) if l.strip() and not PAGE_MARKER_PATTERN.match(l.strip())]
+    if len(content) <= 2 * edge:
+        return content
+    return content[:edge] + content[-edge:]
+
+
+def _edge_lines(page: List[str], edge: int) -> List[str]:
+    """The first and last 'edge' non-empty content lines of a page."""
+    return [page[i] for i in _edge_indices(page, edge)]
+
+
+def preprocess_text(text: str) -> Dict[str, Any]:
+    """
+    Removes boilerplate and normalises the text.
+
+    Args:
+        text: Extracted PDF text (with '--- Page N ---' markers)
+
+    Returns:
+        Dict with the cleaned 'text' and 'stats' (token estimates, removed lines)
+    """
+    pages = _split_pages(text)
+    num_pages = sum(1 for p in pages if p and PAGE_MARKER_PATTERN.match(p[0].strip()))
+
+    # 1. Repeated header/footer lines (only meaningful with several pages)
+    boilerplate = set()
+    if num_pages >= config.BOILERPLATE_MIN_PAGES:
+        counts = Counter()
+        for page in pages:
+            counts.update({_signature(l) for l in _edge_lines(page, config.BOILERPLATE_EDGE_LINES)})
+        threshold = max(2, math.ceil(config.BOILERPLATE_MIN_PAGE_RATIO * num_pages))
+        boilerplate = {sig for sig, n in counts.items() if n >= threshold and sig}
+
+    removed_boilerplate = 0
+    removed_page_numbers = 0
+    kept: List[str] = []
+    for page in pages:
+        # By position: a body line equal to a header/footer line is kept
+        edges = set(_edge_indices(page, config.BOILERPLATE_EDGE_LINES))
+        for index, line in enumerate(page):
+            stripped = line.strip()
+            if PAGE_MARKER_PATTERN.match(stripped):
+                kept.append(stripped)
+            elif index in edges and _signature(line) in boilerplate:
+                removed_boilerplate += 1
+            elif index in edges and PAGE_NUMBER_PATTERN.match(stripped):
+                removed_page_numbers += 1
+            else:
+                kept.append(SPACES_PATTERN.sub(" ", line).strip())
+
+    # 2. Hyphenation across line breaks, 3. blank line runs
+    cleaned = HYPHENATION_PATTERN.sub(r"\1\3", "\n".join(kept))
+    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+
+    tokens_before = estimate_tokens(text)
+    tokens_after = estimate_tokens(cleaned)
+    stats = {
+        "pages": num_pages,
+        "boilerplate_patterns": len(boilerplate),
+        "removed_boilerplate_lines": removed_boilerplate,
+        "removed_page_number_lines": removed_page_numbers,
+        "chars_before": len(text),
+        "chars_after": len(cleaned),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "token_reduction": round(1 - tokens_after / tokens_before, 3) if tokens_before else 0.0,
+    }
+    return {"text": cleaned, "stats": stats}
@@ -0,0 +1,96 @@
+"""
+benchmarks/bench_checkpoints.py
+Benchmark: batched WAL CheckpointStore vs. one synchronous commit per checkpoint
+
+Usage:
+    uv run python -m benchmarks.bench_checkpoints [--runs N] [--stages N] [--text-kb N]
+
+Simulates N workflow runs checkpointing before each of --stages stages
+(state with --text-kb KB of extracted text, like a real session) and
+reports the latency the workflow sees per checkpoint: CheckpointStore.save()
+(coalesced, committed by the background writer) vs. an INSERT + COMMIT per
+checkpoint in a rollback-journal database with synchronous=FULL.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from app.app_utils.checkpoints import CheckpointStore
+
+
+def make_state(text_kb: int, stage: int) -> dict:
+    return {
+        "pdf_path": "app/test_data/sample_process.pdf",
+        "extracted_pdf_text": "x" * (text_kb * 1024),
+        "pdf_analysis": {"steps": [{"id": f"s{i}", "label": f"Step {i}"} for i in range(40)]},
+        "stage": stage,
+    }
+
+
+def bench_store(path: str, runs: int, stages: int, text_kb: int) -> tuple:
+    store = CheckpointStore(path)
+    latencies = []
+    for run in range(runs):
+        for stage in range(stages):
+            start = time.perf_counter()
+            store.save(
+                session_id=f"session_{run}", app_name="bench", user_id="bench", status="running",
+                next_stage=stage, stage=f"Stage{stage}", state=make_state(text_kb, stage),
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+    store.close()
+    return latencies, store.stats()
+
+
+def bench_sync_commit(path: str, runs: int, stages: int, text_kb: int) -> list:
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA synchronous=FULL")
+    db.execute("CREATE TABLE checkpoints (session_id TEXT PRIMARY KEY, next_stage INTEGER, state_json TEXT)")
+    latencies = []
+    for run in range(runs):
+        for stage in range(stages):
+            start = time.perf_counter()
+            db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?)",
+                (f"session_{run}", stage, json.dumps(make_state(text_kb, stage))),
+            )
+            db.commit()
+            latencies.append((time.perf_counter() - start) * 1000)
+    db.close()
+    return latencies
+
+
+def describe(latencies: list) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    return f"mean {statistics.mean(latencies):7.3f} ms   p95 {p95:7.3f} ms   total {sum(latencies):8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--stages", type=int, default=8)
+    parser.add_argument("--text-kb", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        batched, stats = bench_store(os.path.join(tmp, "batched.sqlite"), args.runs, args.stages, args.text_kb)
+        sync = bench_sync_commit(os.path.join(tmp, "sync.sqlite"), args.runs, args.stages, args.text_kb)
+
+    print("\n" + "=" * 70)
+    print(f"💾 Checkpoint latency seen by the workflow ({args.runs} runs x {args.stages} stages, "
+          f"{args.text_kb} KB text)")
+    print("=" * 70)
+    print(f"   Commit per checkpoint:  {describe(sync)}")
+    print(f"   CheckpointStore.save(): {describe(batched)}")
+    print(f"   Writer: {stats['saves']} saves -> {stats['rows_written']} rows in "
+          f"{stats['batches']} batches ({stats['write_ms']:.1f} ms in the background)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+benchmarks/bench_compact_format.py
+Benchmark: compact wire format vs. regular JSON for the graph outputs
+
+Usage:
+    uv run python -m benchmarks.bench_compact_format [pdf_path ...] [--live] [--runs N]
+
+Offline (default): encodes reference outputs (a hand-written analysis/graph
+of app/test_data/sample_process.pdf, scaled to longer processes) in both
+formats and compares output size (estimated tokens) and local decode time.
+With --live (needs a real GOOGLE_API_KEY) the PDFAnalysisAgent and the
+ConversionAgent run on each PDF (default: app/test_data/*.pdf) with and
+without the CompactOutputPlugin and the real output tokens
+(candidates_token_count) and generation times are compared.
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+# Offline mode never calls Gemini, but app.config insists on a key.
+if "--live" not in sys.argv:
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from google.adk.apps import App
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.app_utils.compact_output import (
+    CompactOutputPlugin,
+    decode_analysis,
+    decode_conversion,
+    encode_analysis,
+    encode_conversion,
+)
+from app.app_utils.tokens import estimate_tokens
+
+APP_NAME = "CompactFormatBenchmark"
+DEFAULT_PDFS = sorted(glob.glob("app/test_data/*.pdf"))
+
+# Purchase requisition process of app/test_data/sample_process.pdf
+REFERENCE_ANALYSIS = {
+    "actors": ["Antragsteller", "System", "Manager", "Einkaufsabteilung"],
+    "steps": [
+        {"id": 1, "type": "start_event", "action": "Bedarf identifiziert", "actor": "Antragsteller", "condition": None},
+        {"id": 2, "type": "task", "action": "Bestellanforderung erstellen", "actor": "Antragsteller", "condition": None},
+        {"id": 3, "type": "decision", "action": "Wertprüfung", "actor": "System", "condition": "Wert > 10.000 EUR?"},
+        {"id": 4, "type": "task", "action": "Begründung und Budget prüfen", "actor": "Manager", "condition": None},
+        {"id": 5, "type": "decision", "action": "Genehmigen oder ablehnen", "actor": "Manager", "condition": "Genehmigt?"},
+        {"id": 6, "type": "task", "action": "Antragsteller über Ablehnung benachrichtigen", "actor": "System", "condition": None},
+        {"id": 7, "type": "end_event", "action": "Anforderung abgelehnt", "actor": None, "condition": None},
+        {"id": 8, "type": "task", "action": "Automatische Genehmigung", "actor": "System", "condition": None},
+        {"id": 9, "type": "task", "action": "Purchase Order erstellen", "actor": "Einkaufsabteilung", "condition": None},
+        {"id": 10, "type": "task", "action": "Bestätigung mit PO-Nummer senden", "actor": "System", "condition": None},
+        {"id": 11, "type": "end_event", "action": "Prozess abgeschlossen", "actor": None, "condition": None},
+    ],
+    "dependencies": [
+        {"from": 1, "to": 2, "label": None}, {"from": 2, "to": 3, "label": None},
+        {"from": 3, "to": 4, "label": "Ja"}, {"from": 3, "to": 8, "label": "Nein"},
+        {"from": 4, "to": 5, "label": None}, {"from": 5, "to": 6, "label": "Abgelehnt"},
+        {"from": 6, "to": 7, "label": None}, {"from": 5, "to": 9, "label": "Genehmigt"},
+        {"from": 8, "to": 9, "label": None}, {"from": 9, "to": 10, "label": None},
+        {"from": 10, "to": 11, "label": None},
+    ],
+}
+_NODE_TYPES = {"decision": "exclusive_gateway"}
+REFERENCE_GRAPH = {
+    "nodes": [
+        {"id": f"step_{s['id']}", "type": _NODE_TYPES.get(s["type"], s["type"]), "label": s["action"], "actor": s["actor"]}
+        for s in REFERENCE_ANALYSIS["steps"]
+    ],
+    "edges": [
+        {"from": f"step_{d['from']}", "to": f"step_{d['to']}", "label": d["label"]}
+        for d in REFERENCE_ANALYSIS["dependencies"]
+    ],
+}
+
+
+def _scaled(analysis: dict, graph: dict, factor: int) -> tuple:
+    """The reference process repeated factor times as one long chain (sub-process per repetition)."""
+    steps, deps, nodes, edges = [], [], [], []
+    size = len(analysis["steps"])
+    for i in range(factor):
+        offset = i * size
+        steps += [{**s, "id": s["id"] + offset, "action": f"{s['action']} ({i + 1})"} for s in analysis["steps"]]
+        deps += [{**d, "from": d["from"] + offset, "to": d["to"] + offset} for d in analysis["dependencies"]]
+        nodes += [{**n, "id": f"{n['id']}_{i}", "label": f"{n['label']} ({i + 1})"} for n in graph["nodes"]]
+        edges += [{**e, "from": f"{e['from']}_{i}", "to": f"{e['to']}_{i}"} for e in graph["edges"]]
+    return (
+        {"actors": analysis["actors"], "steps": steps, "dependencies": deps},
+        {"nodes": nodes, "edges": edges},
+    )
+
+
+def _decode_ms(decode, compact: dict, runs: int) -> float:
+    text = json.dumps(compact, ensure_ascii=False)
+    start = time.perf_counter()
+    for _ in range(runs):
+        decode(json.loads(text)).model_dump_json(by_alias=True)
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def run_offline(runs: int) -> None:
+    print("\n" + "=" * 78)
+    print(f"📊 Compact Format Benchmark (offline, reference outputs, decode median of {runs})")
+    print("=" * 78)
+    print(f"{'output':<22}{'regular tok':>12}{'compact tok':>12}{'saved':>8}{'decode ms':>11}")
+    for factor in (1, 5, 20):
+        analysis, graph = _scaled(REFERENCE_ANALYSIS, REFERENCE_GRAPH, factor)
+        for kind, regular, compact, decode in (
+            ("analysis", analysis, encode_analysis(analysis), decode_analysis),
+            ("graph", graph, encode_conversion(graph), decode_conversion),
+        ):
+            regular_tokens = estimate_tokens(json.dumps(regular, ensure_ascii=False))
+            compact_tokens = estimate_tokens(json.dumps(compact, ensure_ascii=False))
+            saved = 1 - compact_tokens / regular_tokens
+            decode_ms = statistics.median(_decode_ms(decode, compact, 20) for _ in range(runs))
+            label = f"{kind} ({len(regular.get('steps') or regular.get('nodes'))} items)"
+            print(f"{label:<22}{regular_tokens:>12}{compact_tokens:>12}{saved:>8.0%}{decode_ms:>11.3f}")
+    print("Token figures estimated (~4 chars/token); run with --live for measured output tokens.")
+
+
+# =============================================================================
+# Live mode
+# =============================================================================
+
+async def _run_agent(agent, state: dict, compact: bool, run_id: str) -> dict:
+    """Runs a single agent and returns wall time, output tokens and its output_key value."""
+    session_service = InMemorySessionService()
+    app = App(name=APP_NAME, root_agent=agent, plugins=[CompactOutputPlugin()] if compact else [])
+    runner = Runner(app=app, session_service=session_service)
+    await session_service.create_session(app_name=APP_NAME, user_id="bench", session_id=run_id, state=state)
+    message = types.Content(role="user", parts=[types.Part(text="Process the document.")])
+
+    output_tokens = 0
+    start = time.perf_counter()
+    async for event in runner.run_async(user_id="bench", session_id=run_id, new_message=message):
+        if event.usage_metadata:
+            output_tokens += event.usage_metadata.candidates_token_count or 0
+    elapsed = time.perf_counter() - start
+
+    session = await session_service.get_session(app_name=APP_NAME, user_id="bench", session_id=run_id)
+    return {"seconds": elapsed, "output_tokens": output_tokens, "output": session.state.get(agent.output_key)}
+
+
+async def run_live(pdf_paths: list, runs: int) -> None:
+    from app.agents import create_conversion_agent, create_pdf_analysis_agent
+    from app.tools.pdf_parser import parse_pdf
+
+    rows = []
+    for pdf_path in pdf_paths:
+        text = parse_pdf(pdf_path)["extracted_text"]
+        analysis = None
+        for stage in ("analysis", "conversion"):
+            results = {}
+            for compact in (False, True):
+                measured = []
+                for i in range(runs):
+                    if stage == "analysis":
+                        agent, state = create_pdf_analysis_agent(), {"extracted_pdf_text": text}
+                    else:
+                        agent, state = create_conversion_agent(), {"pdf_analysis": analysis}
+                    measured.append(await _run_agent(agent, state, compact, f"{stage}_{compact}_{i}"))
+                results[compact] = measured
+            if stage == "analysis":
+                analysis = results[False][0]["output"]  # Same input for both conversion variants
+            rows.append((os.path.basename(pdf_path), stage, results))
+
+    print("\n" + "=" * 78)
+    print(f"📊 Compact Format Benchmark (live, {runs} runs, median)")
+    print("=" * 78)
+    print(f"{'pdf / stage':<34}{'out tok':>9}{'compact':>9}{'gen s':>8}{'compact':>9}{'valid':>8}")
+    for name, stage, results in rows:
+        regular, compact = results[False], results[True]
+        valid = sum(1 for r in compact if isinstance(r["output"], dict))
+        print(
+            f"{name + ' / ' + stage:<34}"
+            f"{int(statistics.median(r['output_tokens'] for r in regular)):>9}"
+            f"{int(statistics.median(r['output_tokens'] for r in compact)):>9}"
+            f"{statistics.median(r['seconds'] for r in regular):>8.1f}"
+            f"{statistics.median(r['seconds'] for r in compact):>9.1f}"
+            f"{valid:>6}/{len(compact)}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_paths", nargs="*", default=DEFAULT_PDFS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    if args.live:
+        asyncio.run(run_live(args.pdf_paths, args.runs))
+    else:
+        run_offline(args.runs)
+
+
+if __name__ == "__main__":
+    main()
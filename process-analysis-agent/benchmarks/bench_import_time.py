@@ -0,0 +1,128 @@
+"""
+benchmarks/bench_import_time.py
+Benchmark: cold-start latency (python -X importtime) of the CLI and the server
+
+Usage:
+    uv run python -m benchmarks.bench_import_time [--runs N] [--top N] [--json PATH]
+
+Each scenario runs in a fresh interpreter with -X importtime:
+- config:  import app.config (tools, benchmarks, tests)
+- import:  import app.agent (nothing is built yet)
+- cli:     import app.agent + build the root agent, plugins and runners
+           (what 'python -m app.agent' does before the first model call)
+- server:  import the ADK FastAPI server + load the 'app' agent the way
+           'adk web' does (the server container's cold start)
+
+Reports the median wall time and total import time per scenario and the
+top-level packages with the largest cumulative import time. --json appends
+the medians as one JSON line (to track cold start over time).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+SCENARIOS = {
+    "config": "import app.config",
+    "import": "import app.agent",
+    "cli": "import app.agent; app.agent.get_runner(); app.agent.get_eval_runner()",
+    "server": (
+        "import google.adk.cli.fast_api; "
+        "from google.adk.cli.utils.agent_loader import AgentLoader; "
+        "AgentLoader('.').load_agent('app')"
+    ),
+}
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Cumulative import time (us) per top-level package from -X importtime output."""
+    packages: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # Nested import (already counted by its parent) or header
+        parts = name.strip().split(".")
+        # 'google' is a namespace package: report google.adk, google.genai, ... separately
+        top_level = ".".join(parts[:2]) if parts[0] == "google" else parts[0]
+        packages[top_level] = packages.get(top_level, 0) + int(cumulative)
+    return packages
+
+
+def run_scenario(statement: str) -> Tuple[float, Dict[str, int]]:
+    """Runs one statement in a fresh interpreter: (wall seconds, per-package import us)."""
+    env = {
+        **os.environ,
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "offline-benchmark"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_s = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Scenario failed: {statement}\n{completed.stderr[-2000:]}")
+    return wall_s, parse_importtime(completed.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per scenario (median reported)")
+    parser.add_argument("--top", type=int, default=8, help="Slowest top-level packages shown per scenario")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), action="append", help="Only these scenarios")
+    parser.add_argument("--json", help="Append the results as one JSON line to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        walls: List[float] = []
+        imports: List[Dict[str, int]] = []
+        for _ in range(args.runs):
+            wall_s, packages = run_scenario(SCENARIOS[name])
+            walls.append(wall_s)
+            imports.append(packages)
+
+        median_packages = {
+            package: statistics.median(run.get(package, 0) for run in imports)
+            for package in imports[0]
+        }
+        results[name] = {
+            "wall_ms": round(statistics.median(walls) * 1000, 1),
+            "import_ms": round(sum(median_packages.values()) / 1000, 1),
+            "top_packages_ms": {
+                package: round(us / 1000, 1)
+                for package, us in sorted(median_packages.items(), key=lambda item: -item[1])[:args.top]
+            },
+        }
+
+    print("\n" + "=" * 70)
+    print(f"⏱️  Cold start (median of {args.runs} fresh interpreters)")
+    print("=" * 70)
+    for name, result in results.items():
+        print(f"\n{name:<8} wall {result['wall_ms']:>8.1f} ms   imports {result['import_ms']:>8.1f} ms")
+        print(f"         {SCENARIOS[name][:90]}")
+        for package, ms in result["top_packages_ms"].items():
+            print(f"         {package:<28} {ms:>8.1f} ms")
+
+    if args.json:
+        directory = os.path.dirname(args.json)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.json, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"timestamp": datetime.now().isoformat(), "runs": args.runs, **results}) + "\n")
+        print(f"\n📊 Results appended to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
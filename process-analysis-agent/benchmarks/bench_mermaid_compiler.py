@@ -0,0 +1,93 @@
+"""
+benchmarks/bench_mermaid_compiler.py
+Benchmark: deterministic graph -> Mermaid compiler (MermaidCompilerStage)
+
+Usage:
+    uv run python -m benchmarks.bench_mermaid_compiler [--runs N]
+
+Compiles synthetic process graphs of growing size (tasks, exclusive and
+parallel gateways, several actors, labels with special characters), checks
+every result with validate_mermaid_syntax and reports the compile time.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from app.tools.mermaid_generator import generate_mermaid_code
+from app.tools.mermaid_validator import validate_mermaid_syntax
+
+ACTORS = ["Clerk", "Manager", "Finance (AP)", None]
+
+
+def build_graph(num_tasks: int) -> dict:
+    """Linear chain of tasks with a decision every 5 and a parallel split every 7 tasks."""
+    nodes = [{"id": "start", "type": "start_event", "label": "Start"}]
+    edges = []
+    previous = "start"
+    for i in range(1, num_tasks + 1):
+        task = f"task_{i}"
+        nodes.append({
+            "id": task, "type": "task", "actor": ACTORS[i % len(ACTORS)],
+            "label": f'Check "item" #{i} -> {{amount}} | ok?',
+        })
+        edges.append({"from": previous, "to": task})
+        previous = task
+
+        if i % 5 == 0:
+            gw = f"gw_{i}"
+            nodes.append({"id": gw, "type": "exclusive_gateway", "label": f"Amount > {i}00?"})
+            edges += [{"from": previous, "to": gw}, {"from": gw, "to": "end", "label": "no"}]
+            previous = gw
+        elif i % 7 == 0:
+            fork, join = f"fork_{i}", f"join_{i}"
+            nodes += [
+                {"id": fork, "type": "parallel_gateway", "label": ""},
+                {"id": f"{fork}_a", "type": "task", "label": "Branch A"},
+                {"id": f"{fork}_b", "type": "task", "label": "Branch B"},
+                {"id": join, "type": "parallel_gateway", "label": ""},
+            ]
+            edges += [
+                {"from": previous, "to": fork},
+                {"from": fork, "to": f"{fork}_a"}, {"from": fork, "to": f"{fork}_b"},
+                {"from": f"{fork}_a", "to": join}, {"from": f"{fork}_b", "to": join},
+            ]
+            previous = join
+
+    nodes.append({"id": "end", "type": "end_event", "label": "End"})
+    edges.append({"from": previous, "to": "end"})
+    return {"nodes": nodes, "edges": edges}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>6} {'nodes':>6} {'edges':>6} {'median µs':>10} {'p95 µs':>8}  validator")
+    for num_tasks in (10, 50, 200, 1000):
+        graph = build_graph(num_tasks)
+        timings = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                result = generate_mermaid_code(graph)
+                timings.append((time.perf_counter() - start) * 1e6)
+            validation = validate_mermaid_syntax(result["mermaid_code"])
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(
+            f"{num_tasks:>6} {result['stats']['nodes']:>6} {result['stats']['edges']:>6} "
+            f"{statistics.median(timings):>10.0f} {p95:>8.0f}  "
+            f"{validation['overall_status']} ({len(validation['errors'])} errors)"
+        )
+
+
+if __name__ == "__main__":
+    main()
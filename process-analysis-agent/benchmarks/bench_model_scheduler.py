@@ -0,0 +1,109 @@
+"""
+benchmarks/bench_model_scheduler.py
+Benchmark: ModelCallScheduler against the local fake model server
+
+Usage:
+    uv run python -m benchmarks.bench_model_scheduler [--calls N] [--rpm N] [--error-rate X]
+
+Fires N concurrent generateContent calls (alternating "interactive" and
+"batch" priority) at tests/fake_model_server.py, whose quota is --rpm
+requests per minute and which fails --error-rate of the requests with 503.
+Compares the direct client (no limits, no retries) with the scheduled one
+and reports completed calls, 429s, retries and latency per priority class.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from app import config
+from app.app_utils.model_scheduler import (
+    ModelCallScheduler,
+    ScheduledGemini,
+    priority_class,
+    set_model_scheduler,
+)
+from tests.fake_model_server import FakeModelServer
+
+MODEL = config.MODEL_FLASH_THINKING
+
+
+def make_request(i: int) -> LlmRequest:
+    return LlmRequest(
+        model=MODEL,
+        contents=[types.Content(role="user", parts=[types.Part(text=f"Request {i}: summarise the process.")])],
+        config=types.GenerateContentConfig(),
+    )
+
+
+async def run_calls(llm: ScheduledGemini, calls: int, scheduled: bool) -> dict:
+    latencies = {"interactive": [], "batch": []}
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        priority = "interactive" if i % 2 == 0 else "batch"
+        start = time.perf_counter()
+        try:
+            with priority_class(priority):
+                generate = llm.generate_content_async if scheduled else Gemini.generate_content_async.__get__(llm)
+                async for _ in generate(make_request(i)):
+                    pass
+            latencies[priority].append(time.perf_counter() - start)
+        except Exception:
+            failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return {"wall_s": time.perf_counter() - start, "failures": failures, "latencies": latencies}
+
+
+def report(label: str, result: dict, server: FakeModelServer, calls: int) -> None:
+    print(f"\n{label}")
+    print(f"   completed:        {calls - result['failures']}/{calls} in {result['wall_s']:.1f}s")
+    print(f"   server requests:  {server.counts['requests']} "
+          f"({server.counts['rate_limited']}x 429, {server.counts['unavailable']}x 503)")
+    for priority, values in result["latencies"].items():
+        if values:
+            print(f"   {priority:<12} mean {statistics.mean(values):6.2f}s   max {max(values):6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=160)
+    parser.add_argument("--rpm", type=int, default=120, help="Quota of the fake server and the scheduler")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{args.calls} concurrent calls, quota {args.rpm} rpm, {args.error_rate:.0%} transient 503s")
+
+    for scheduled in (False, True):
+        server = FakeModelServer(rpm=args.rpm, error_rate=args.error_rate, seed=42)
+        server.start_background()
+        config.GEMINI_BASE_URL = server.base_url
+        scheduler = ModelCallScheduler(
+            limits={MODEL: {"rpm": args.rpm, "tpm": 1_000_000}},
+            backoff_base_s=0.2, backoff_max_s=5.0,
+        )
+        set_model_scheduler(scheduler)
+        llm = ScheduledGemini(model=MODEL)
+
+        result = asyncio.run(run_calls(llm, args.calls, scheduled))
+        server.shutdown()
+        report("Scheduled (token buckets, priorities, backoff)" if scheduled else "Direct (no scheduler)",
+               result, server, args.calls)
+        if scheduled:
+            stats = scheduler.stats()[MODEL]
+            print(f"   retries:          {stats['retries']}, circuit opened {stats['circuit_opened']}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+benchmarks/bench_pdf_extraction.py
+Benchmark: deterministic PDFTextExtractionStage vs. LLM-based PDFTextExtractionAgent
+
+Usage:
+    uv run python -m benchmarks.bench_pdf_extraction [pdf_path] [--live] [--runs N]
+
+Without --live only the local stage is executed and the LLM path is
+estimated (tool response + echoed text). With --live (needs a real
+GOOGLE_API_KEY) the LLM agent is run as well and real usage metadata is used.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Offline mode never calls Gemini, but app.config insists on a key.
+if "--live" not in sys.argv:
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app import config
+from app.agents import create_pdf_extraction_stage, create_pdf_text_extraction_agent
+from app.app_utils.tokens import estimate_tokens
+
+APP_NAME = "ExtractionBenchmark"
+DEFAULT_PDF = "app/test_data/sample_process.pdf"
+
+
+async def _run_once(agent, pdf_path: str, run_id: int) -> dict:
+    """Runs a single-agent workflow and returns wall time, tokens and text."""
+    session_service = InMemorySessionService()
+    session_id = f"bench_{agent.name}_{run_id}"
+    await session_service.create_session(
+        app_name=APP_NAME, user_id="bench", session_id=session_id
+    )
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+    message = types.Content(
+        role="user",
+        parts=[types.Part(text=f"The source PDF is located at path: {pdf_path}")],
+    )
+
+    prompt_tokens = 0
+    output_tokens = 0
+    start = time.perf_counter()
+    async for event in runner.run_async(
+        user_id="bench", session_id=session_id, new_message=message
+    ):
+        if event.usage_metadata:
+            prompt_tokens += event.usage_metadata.prompt_token_count or 0
+            output_tokens += event.usage_metadata.candidates_token_count or 0
+    elapsed = time.perf_counter() - start
+
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id="bench", session_id=session_id
+    )
+    return {
+        "seconds": elapsed,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "text": session.state.get("extracted_pdf_text", ""),
+    }
+
+
+def _estimate_llm_tokens(extracted_text: str) -> dict:
+    """
+    Estimates what the LLM agent pays for the same result.
+
+    Two model calls: (1) instruction + user message -> function call,
+    (2) instruction + history + tool response (full text) -> text echoed back.
+    """
+    # With SCOPED_CONTEXT the instruction is a provider; estimate the plain template
+    scoped, config.SCOPED_CONTEXT = config.SCOPED_CONTEXT, False
+    try:
+        agent = create_pdf_text_extraction_agent()
+    finally:
+        config.SCOPED_CONTEXT = scoped
+    overhead = estimate_tokens(agent.instruction) + 50
+    text_tokens = estimate_tokens(extracted_text)
+    return {
+        "prompt_tokens": 2 * overhead + text_tokens,
+        "output_tokens": text_tokens + 30,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdf_path", nargs="?", default=DEFAULT_PDF)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    stage = create_pdf_extraction_stage()
+    stage_runs = [await _run_once(stage, args.pdf_path, i) for i in range(args.runs)]
+    stage_seconds = statistics.median(r["seconds"] for r in stage_runs)
+    extracted_text = stage_runs[0]["text"]
+
+    if args.live:
+        llm_agent = create_pdf_text_extraction_agent()
+        llm_runs = [
+            await _run_once(llm_agent, args.pdf_path, i) for i in range(args.runs)
+        ]
+        llm_seconds = statistics.median(r["seconds"] for r in llm_runs)
+        llm_tokens = {
+            "prompt_tokens": int(statistics.median(r["prompt_tokens"] for r in llm_runs)),
+            "output_tokens": int(statistics.median(r["output_tokens"] for r in llm_runs)),
+        }
+        source = "measured"
+    else:
+        llm_seconds = None
+        llm_tokens = _estimate_llm_tokens(extracted_text)
+        source = "estimated"
+
+    print("\n" + "=" * 70)
+    print(f"📊 PDF Extraction Benchmark ({args.pdf_path}, {args.runs} runs, median)")
+    print("=" * 70)
+    print(f"Extracted characters:          {len(extracted_text)}")
+    print(f"Stage wall time:               {stage_seconds * 1000:.1f} ms (0 tokens)")
+    if llm_seconds is not None:
+        print(f"LLM agent wall time:           {llm_seconds * 1000:.1f} ms")
+        print(f"Wall time saved:               {(llm_seconds - stage_seconds) * 1000:.1f} ms")
+    print(f"LLM token figures:             {source}")
+    print(f"LLM prompt tokens:             {llm_tokens['prompt_tokens']}")
+    print(f"LLM output tokens:             {llm_tokens['output_tokens']}")
+    print(
+        f"Tokens saved per run:          "
+        f"{llm_tokens['prompt_tokens'] + llm_tokens['output_tokens']}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+tests/conftest.py
+Shared fixtures: a fake clock and the local fake model server
+"""
+
+import asyncio
+from typing import Callable, Optional
+
+import pytest
+
+from app import config
+from app.app_utils.model_scheduler import set_model_scheduler
+from tests.fake_model_server import FakeModelServer
+
+
+class FakeClock:
+    """
+    Virtual time for ModelCallScheduler(clock=..., sleep=...) and FakeModelServer(clock=...).
+
+    sleep() returns after one event loop turn and moves the clock to its
+    deadline, so throttling waits and backoffs take no real time and elapsed
+    times are exact, however loaded the machine is.
+    """
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+        self._busy: Optional[Callable[[], bool]] = None
+
+    def __call__(self) -> float:
+        return self.now
+
+    def hold_while(self, busy: Callable[[], bool]) -> None:
+        """Time only moves on once busy() is false (e.g. requests still on their way to the server)."""
+        self._busy = busy
+
+    async def sleep(self, seconds: float) -> None:
+        deadline = self.now + seconds
+        await asyncio.sleep(0)
+        while self._busy and self._busy():
+            await asyncio.sleep(0.001)
+        self.now = max(self.now, deadline)
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def server(monkeypatch, clock):
+    """FakeModelServer on a free port (quota on the fake clock); ScheduledGemini points at it."""
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    server = FakeModelServer(rpm=100_000, latency_s=0.01, seed=1, clock=clock)
+    server.start_background()
+    monkeypatch.setattr(config, "GEMINI_BASE_URL", server.base_url)
+    yield server
+    server.shutdown()
+    set_model_scheduler(None)
@@ -0,0 +1,156 @@
+"""
+tests/fake_model_server.py
+Local fake of the Gemini generateContent endpoint (for scheduler tests and
+benchmarks/bench_model_scheduler.py)
+
+Usage:
+    uv run python -m tests.fake_model_server [--port 8089] [--rpm 60] [--error-rate 0.05]
+    GEMINI_BASE_URL=http://127.0.0.1:8089 uv run python -m app.agent <pdf>
+
+Answers POST /<version>/models/<model>:generateContent with a fixed text
+and usage metadata after a short latency. Enforces its own requests-per-
+minute quota per model, refilled continuously (429 RESOURCE_EXHAUSTED with
+a RetryInfo delay, like the real API), and fails a share of requests with
+503 UNAVAILABLE. The quota follows 'clock' (the unit tests pass the
+scheduler's fake clock, so RetryInfo delays need not pass in real time).
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+_PATH = re.compile(r"/[^/]+/models/([^/:]+):generateContent")
+
+
+class FakeModelServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer with quota, error rate, latency and request counters."""
+
+    daemon_threads = True
+    request_queue_size = 1024  # Load tests open hundreds of connections at once
+
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        rpm: int = 60,
+        error_rate: float = 0.0,
+        latency_s: float = 0.05,
+        response_text: str = "ok",
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(address, _Handler)
+        self.rpm = rpm
+        self.error_rate = error_rate
+        self.latency_s = latency_s
+        self.response_text = response_text
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.quota: Dict[str, Tuple[float, float]] = {}  # model -> (remaining requests, last update)
+        self.counts = {"requests": 0, "ok": 0, "rate_limited": 0, "unavailable": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def admit(self, model: str) -> Tuple[int, float]:
+        """Returns (HTTP status, seconds until the quota frees up)."""
+        now = self.clock()
+        with self.lock:
+            self.counts["requests"] += 1
+            remaining, updated = self.quota.get(model, (float(self.rpm), now))
+            remaining = min(float(self.rpm), remaining + (now - updated) * self.rpm / 60)
+            if remaining < 1:
+                self.quota[model] = (remaining, now)
+                self.counts["rate_limited"] += 1
+                return 429, (1 - remaining) * 60 / self.rpm
+            if self.random.random() < self.error_rate:
+                self.quota[model] = (remaining, now)
+                self.counts["unavailable"] += 1
+                return 503, 0.0
+            self.quota[model] = (remaining - 1, now)
+            self.counts["ok"] += 1
+            return 200, 0.0
+
+    def start_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeModelServer
+
+    def log_message(self, format, *args):  # Keep benchmark output readable
+        pass
+
+    def _reply(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        match = _PATH.match(self.path)
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not match:
+            self._reply(404, {"error": {"code": 404, "message": f"Unknown path {self.path}", "status": "NOT_FOUND"}})
+            return
+
+        time.sleep(self.server.latency_s)
+        status, retry_after = self.server.admit(match.group(1))
+        if status == 429:
+            self._reply(429, {"error": {
+                "code": 429,
+                "message": "Resource has been exhausted (e.g. check quota).",
+                "status": "RESOURCE_EXHAUSTED",
+                "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{max(1, round(retry_after))}s"}],
+            }})
+            return
+        if status == 503:
+            self._reply(503, {"error": {"code": 503, "message": "The model is overloaded.", "status": "UNAVAILABLE"}})
+            return
+
+        prompt_tokens = max(1, len(json.dumps(request.get("contents", []))) // 4)
+        output_tokens = max(1, len(self.server.response_text) // 4)
+        self._reply(200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": self.server.response_text}]},
+                "finishReason": "STOP",
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--rpm", type=int, default=60, help="Quota per model (requests per minute)")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Share of requests failing with 503")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request")
+    args = parser.parse_args()
+
+    server = FakeModelServer(("127.0.0.1", args.port), args.rpm, args.error_rate, args.latency)
+    print(f"Fake model server on {server.base_url} (rpm={args.rpm}, error rate={args.error_rate})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests: {server.counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+tests/unit/test_analysis_merger.py
+Merging per-chunk analyses into one process graph
+"""
+
+from app.agents.pdf_analysis_agent import PdfAnalysisOutput
+from app.tools.analysis_merger import merge_analysis_outputs
+
+
+def chunk(actors, steps, deps):
+    """steps: (id, type, action, actor) tuples, deps: (from, to) pairs."""
+    return PdfAnalysisOutput.model_validate({
+        "actors": actors,
+        "steps": [{"id": i, "type": t, "action": a, "actor": actor} for i, t, a, actor in steps],
+        "dependencies": [{"from": s, "to": t} for s, t in deps],
+    })
+
+
+def summary(merged):
+    steps = [(s.id, s.type, s.action, s.actor) for s in merged.steps]
+    return merged.actors, steps, sorted((d.from_, d.to) for d in merged.dependencies)
+
+
+def test_later_start_event_is_dropped_and_the_chunks_are_stitched():
+    first = chunk(["Clerk"], [(1, "start_event", "Invoice received", None), (2, "task", "Check invoice", "Clerk")],
+                  [(1, 2)])
+    second = chunk([" clerk", "Manager"], [
+        (1, "start_event", "Continue", None), (2, "task", "Approve invoice", "Manager"),
+        (3, "task", "Book invoice", "CLERK"), (4, "end_event", "Done", None),
+    ], [(1, 2), (2, 3), (3, 4)])
+
+    actors, steps, deps = summary(merge_analysis_outputs([first, second]))
+
+    assert actors == ["Clerk", "Manager"]
+    assert steps == [
+        (1, "start_event", "Invoice received", None), (2, "task", "Check invoice", "Clerk"),
+        (3, "task", "Approve invoice", "Manager"), (4, "task", "Book invoice", "Clerk"),
+        (5, "end_event", "Done", None),
+    ]
+    assert deps == [(1, 2), (2, 3), (3, 4), (4, 5)]
+
+
+def test_end_event_at_a_chunk_boundary_is_replaced_by_the_stitch():
+    first = chunk([], [(1, "start_event", "Start", None), (2, "task", "Receive order", None),
+                       (3, "end_event", "End of section", None)], [(1, 2), (2, 3)])
+    second = chunk([], [(1, "task", "Ship order", None), (2, "end_event", "Done", None)], [(1, 2)])
+
+    _, steps, deps = summary(merge_analysis_outputs([first, second]))
+
+    assert [action for _, _, action, _ in steps] == ["Start", "Receive order", "Ship order", "Done"]
+    assert deps == [(1, 2), (2, 3), (3, 4)]
+
+
+def test_step_repeated_by_an_overlapping_chunk_is_merged():
+    first = chunk([], [(1, "start_event", "Start", None), (2, "task", "Check order", "Sales"),
+                       (3, "task", "Confirm order", "Sales")], [(1, 2), (2, 3)])
+    second = chunk([], [(7, "task", "confirm  ORDER", "sales"), (8, "task", "Ship order", "Warehouse"),
+                        (9, "end_event", "Done", None)], [(7, 8), (8, 9)])
+
+    _, steps, deps = summary(merge_analysis_outputs([first, second]))
+
+    assert [action for _, _, action, _ in steps] == ["Start", "Check order", "Confirm order", "Ship order", "Done"]
+    assert deps == [(1, 2), (2, 3), (3, 4), (4, 5)]
+
+
+def test_last_chunk_keeps_its_end_event():
+    only = chunk([], [(1, "start_event", "Start", None), (2, "end_event", "Done", None)], [(1, 2)])
+
+    _, steps, deps = summary(merge_analysis_outputs([only]))
+
+    assert [t for _, t, _, _ in steps] == ["start_event", "end_event"] and deps == [(1, 2)]
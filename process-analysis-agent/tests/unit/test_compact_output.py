@@ -0,0 +1,199 @@
+"""
+tests/unit/test_compact_output.py
+Compact wire format: encode/decode round trips and the plugin
+
+Every structured graph output passes through decode_analysis /
+decode_conversion when config.COMPACT_OUTPUT is on, so the expanded JSON
+must equal the regular model output exactly.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from app.agents.conversion_agent import ConversionOutput
+from app.agents.pdf_analysis_agent import PdfAnalysisOutput
+from app.agents.quality_agent import DeltaQualityOutput
+from app.app_utils.compact_output import (
+    CompactConversionOutput,
+    CompactOutputPlugin,
+    decode_analysis,
+    decode_conversion,
+    encode_analysis,
+    encode_conversion,
+)
+from app.tools.graph_patch import apply_graph_edits
+
+GRAPH = {
+    "nodes": [
+        {"id": "start", "type": "start_event", "label": "Invoice received", "actor": None},
+        {"id": "1", "type": "task", "label": "Check invoice", "actor": "Clerk"},
+        {"id": "gw amount", "type": "exclusive_gateway", "label": "Amount > 1000?", "actor": "Clerk"},
+        {"id": "sub_pay", "type": "subprocess", "label": "Pay", "actor": "Accounting"},
+        {"id": "end", "type": "end_event", "label": "Done", "actor": None},
+    ],
+    "edges": [
+        {"from": "start", "to": "1", "label": None},
+        {"from": "1", "to": "gw amount", "label": None},
+        {"from": "gw amount", "to": "sub_pay", "label": "yes"},
+        {"from": "gw amount", "to": "end", "label": "no"},
+        {"from": "sub_pay", "to": "end", "label": None},
+    ],
+}
+
+ANALYSIS = {
+    "actors": ["Clerk", "Manager"],
+    "steps": [
+        {"id": 1, "type": "start_event", "action": "Invoice received", "actor": None, "condition": None},
+        {"id": 2, "type": "task", "action": "Check invoice", "actor": "Clerk", "condition": None},
+        {"id": 3, "type": "decision", "action": "Approve?", "actor": "Manager", "condition": "Amount > 1000"},
+        {"id": 4, "type": "end_event", "action": "Done", "actor": None, "condition": None},
+    ],
+    "dependencies": [
+        {"from": 1, "to": 2, "label": None},
+        {"from": 2, "to": 3, "label": None},
+        {"from": 3, "to": 4, "label": "approved"},
+    ],
+}
+
+
+def over_the_wire(compact: dict) -> dict:
+    """What the plugin decodes: the model's JSON text."""
+    return json.loads(json.dumps(compact, ensure_ascii=False))
+
+
+# --- ConversionOutput ---
+
+@pytest.mark.parametrize("graph", [GRAPH, {"nodes": [], "edges": []}], ids=["graph", "empty"])
+def test_conversion_round_trip(graph):
+    decoded = decode_conversion(over_the_wire(encode_conversion(graph)))
+
+    assert decoded.model_dump(by_alias=True) == ConversionOutput.model_validate(graph).model_dump(by_alias=True)
+
+
+def test_conversion_keeps_node_ids_when_nodes_are_reordered():
+    compact = encode_conversion(GRAPH)
+    compact["nodes"].reverse()
+
+    decoded = decode_conversion(over_the_wire(compact))
+
+    assert [n.id for n in decoded.nodes] == [n["id"] for n in reversed(GRAPH["nodes"])]
+    assert [(e.from_, e.to) for e in decoded.edges] == [(e["from"], e["to"]) for e in GRAPH["edges"]]
+
+
+def test_conversion_accepts_numeric_ids_and_an_omitted_trailing_label():
+    compact = {"actors": [], "types": ["start_event", "end_event"],
+               "nodes": [[1, 0, -1, "Start"], [2, 1, -1]], "edges": [[1, 2]]}
+
+    decoded = decode_conversion(compact)
+
+    assert [(n.id, n.label, n.actor) for n in decoded.nodes] == [("1", "Start", None), ("2", "", None)]
+    assert decoded.edges[0].model_dump(by_alias=True) == {"from": "1", "to": "2", "label": None}
+
+
+@pytest.mark.parametrize("compact, message", [
+    ({"actors": [], "types": ["task"], "nodes": [["a", 0, -1, "A"]], "edges": [["a", "b", ""]]}, "unknown node"),
+    ({"actors": [], "types": ["task"], "nodes": [["", 0, -1, "A"]], "edges": []}, "without id"),
+    ({"actors": [], "types": ["task"], "nodes": [["a", 1, -1, "A"]], "edges": []}, "type index"),
+    ({"actors": ["Clerk"], "types": ["task"], "nodes": [["a", 0, 1, "A"]], "edges": []}, "actor index"),
+    ({"actors": [], "types": ["task"], "nodes": [["a", 0]], "edges": []}, "needs 4 fields"),
+], ids=["dangling-edge", "missing-id", "type-index", "actor-index", "short-row"])
+def test_malformed_conversion_is_rejected(compact, message):
+    with pytest.raises(ValueError, match=message):
+        decode_conversion(compact)
+
+
+# --- PdfAnalysisOutput ---
+
+@pytest.mark.parametrize("analysis", [ANALYSIS, {"actors": [], "steps": [], "dependencies": []}], ids=["analysis", "empty"])
+def test_analysis_round_trip(analysis):
+    decoded = decode_analysis(over_the_wire(encode_analysis(analysis)))
+
+    assert decoded.model_dump(by_alias=True) == PdfAnalysisOutput.model_validate(analysis).model_dump(by_alias=True)
+
+
+def test_analysis_steps_are_renumbered_by_position():
+    sparse = {
+        **ANALYSIS,
+        "steps": [{**s, "id": s["id"] * 10} for s in ANALYSIS["steps"]],
+        "dependencies": [{**d, "from": d["from"] * 10, "to": d["to"] * 10} for d in ANALYSIS["dependencies"]],
+    }
+
+    decoded = decode_analysis(over_the_wire(encode_analysis(sparse)))
+
+    assert decoded.model_dump(by_alias=True) == PdfAnalysisOutput.model_validate(ANALYSIS).model_dump(by_alias=True)
+
+
+def test_analysis_dependency_outside_the_steps_is_rejected():
+    compact = encode_analysis(ANALYSIS)
+    compact["deps"].append([1, 5, ""])
+
+    with pytest.raises(ValueError, match="outside 1..4"):
+        decode_analysis(compact)
+
+
+# --- DeltaQualityOutput ---
+
+def test_delta_edits_apply_to_a_graph_that_went_through_the_compact_format():
+    # The judge refers to the node ids of the graph it saw; after a compact
+    # round trip with reordered nodes they must still resolve
+    compact = encode_conversion(GRAPH)
+    compact["nodes"].reverse()
+    graph = decode_conversion(over_the_wire(compact)).model_dump()
+    verdict = DeltaQualityOutput.model_validate_json(json.dumps({
+        "reasoning": "Missing approval.", "completeness_score": 0.6, "clarity_score": 0.8,
+        "reduction_score": 0.8, "consistency_score": 0.8, "feedback": "Add the approval.",
+        "approved": False, "exit_loop": False,
+        "edits": [
+            {"op": "add_node", "node_id": "approve", "type": "task", "label": "Approve", "actor": "Manager"},
+            {"op": "reroute_edge", "from": "gw amount", "to": "sub_pay", "new_to": "approve", "label": "yes"},
+            {"op": "add_edge", "from": "approve", "to": "sub_pay"},
+        ],
+        "open_issues": [],
+    }))
+
+    patched, applied, rejected = apply_graph_edits(graph, [e.model_dump(by_alias=True) for e in verdict.edits])
+
+    assert rejected == [] and len(applied) == 3
+    assert {"from_": "gw amount", "to": "approve", "label": "yes"} in patched["edges"]
+
+
+@pytest.mark.asyncio
+async def test_plugin_leaves_the_delta_quality_schema_alone():
+    plugin = CompactOutputPlugin()
+    context = SimpleNamespace(invocation_id="inv", agent_name="QualityAgent")
+    request = LlmRequest(config=types.GenerateContentConfig(response_schema=DeltaQualityOutput))
+    response = LlmResponse(content=types.Content(role="model", parts=[types.Part(text='{"edits": []}')]))
+
+    await plugin.before_model_callback(callback_context=context, llm_request=request)
+    await plugin.after_model_callback(callback_context=context, llm_response=response)
+
+    assert request.config.response_schema is DeltaQualityOutput
+    assert response.content.parts[0].text == '{"edits": []}'
+
+
+# --- Plugin ---
+
+@pytest.mark.asyncio
+async def test_plugin_expands_a_compact_conversion_response_in_place():
+    plugin = CompactOutputPlugin()
+    context = SimpleNamespace(invocation_id="inv", agent_name="ConversionAgent")
+    request = LlmRequest(config=types.GenerateContentConfig(response_schema=ConversionOutput))
+    compact_text = json.dumps(encode_conversion(GRAPH))
+    response = LlmResponse(content=types.Content(role="model", parts=[
+        types.Part(text="thinking...", thought=True), types.Part(text=compact_text),
+    ]))
+
+    await plugin.before_model_callback(callback_context=context, llm_request=request)
+    assert request.config.response_schema is CompactConversionOutput
+    await plugin.after_model_callback(callback_context=context, llm_response=response)
+
+    parts = response.content.parts
+    assert parts[0].thought and len(parts) == 2
+    expanded = ConversionOutput.model_validate_json(parts[1].text)
+    assert expanded.model_dump(by_alias=True) == ConversionOutput.model_validate(GRAPH).model_dump(by_alias=True)
+    assert plugin.stats()["calls"] == 1 and plugin.stats()["failed"] == 0
@@ -0,0 +1,55 @@
+"""
+tests/unit/test_evaluation_queue.py
+Sampled background evaluation: job counts and bounded timing statistics
+"""
+
+import asyncio
+
+import pytest
+
+from app.app_utils.evaluation_queue import STATS_WINDOW, EvaluationQueue
+
+
+async def evaluate(job):
+    await asyncio.sleep(0)
+    if job.get("fail"):
+        raise ValueError("judge unavailable")
+    return {"session_id": job["session_id"]}
+
+
+@pytest.mark.asyncio
+async def test_background_jobs_are_evaluated_and_failures_counted():
+    queue = EvaluationQueue(evaluate, workers=2, max_size=10, sample_rate=1.0)
+
+    for i in range(5):
+        assert queue.submit({"session_id": f"s{i}", "fail": i == 3})
+    await queue.drain()
+
+    stats = queue.stats()
+    assert (stats["submitted"], stats["completed"], stats["failed"], stats["pending"]) == (5, 4, 1, 0)
+    assert stats["queue_lag_s"]["max"] >= stats["queue_lag_s"]["mean"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_jobs():
+    queue = EvaluationQueue(evaluate, workers=1, max_size=2, sample_rate=1.0)
+
+    accepted = [queue.submit({"session_id": f"s{i}"}) for i in range(4)]
+    await queue.drain()
+
+    assert accepted == [True, True, False, False]
+    assert queue.stats()["dropped"] == 2 and queue.stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_timing_statistics_stay_bounded():
+    queue = EvaluationQueue(evaluate, sample_rate=1.0)
+
+    for i in range(STATS_WINDOW + 200):
+        await queue.evaluate_now({"session_id": f"s{i}"})
+
+    stats = queue.stats()
+    assert stats["completed"] == STATS_WINDOW + 200
+    assert len(queue._latencies.recent) == STATS_WINDOW and queue._latencies.count == STATS_WINDOW + 200
+    assert stats["queue_lag_s"] == {"mean": 0.0, "p95": 0.0, "max": 0.0}
+    assert stats["latency_s"]["max"] >= stats["latency_s"]["p95"]
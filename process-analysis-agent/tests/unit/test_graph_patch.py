@@ -0,0 +1,86 @@
+"""
+tests/unit/test_graph_patch.py
+Local application of the judge's graph edits
+
+An edit that does not fit the graph is rejected with a reason, the others
+still apply in order.
+"""
+
+import pytest
+
+from app.agents.conversion_agent import NODE_TYPES
+from app.tools.graph_patch import apply_graph_edits
+
+GRAPH = {
+    "nodes": [
+        {"id": "start", "type": "start_event", "label": "Order received", "actor": None},
+        {"id": "check", "type": "task", "label": "Check order", "actor": "Sales"},
+        {"id": "ship", "type": "task", "label": "Ship goods", "actor": "Warehouse"},
+        {"id": "end", "type": "end_event", "label": "Done", "actor": None},
+    ],
+    "edges": [
+        {"from": "start", "to": "check", "label": None},
+        {"from": "check", "to": "ship", "label": None},
+        {"from": "ship", "to": "end", "label": "shipped"},
+    ],
+}
+
+
+def edge_pairs(graph):
+    return [(e["from_"], e["to"]) for e in graph["edges"]]
+
+
+@pytest.mark.parametrize("node_type", NODE_TYPES)
+def test_every_conversion_node_type_can_be_added(node_type):
+    edit = {"op": "add_node", "node_id": "new", "type": node_type, "label": "New"}
+
+    patched, applied, rejected = apply_graph_edits(GRAPH, [edit])
+
+    assert rejected == [] and applied == [edit]
+    assert patched["nodes"][-1] == {"id": "new", "type": node_type, "label": "New", "actor": None}
+
+
+@pytest.mark.parametrize("edit, reason", [
+    ({"op": "add_node", "node_id": "x", "type": "user_task", "label": "X"}, "valid type"),
+    ({"op": "add_node", "node_id": "check", "type": "task", "label": "Again"}, "already exists"),
+    ({"op": "remove_node", "node_id": "ghost"}, "unknown node 'ghost'"),
+    ({"op": "rename_node", "node_id": "check", "type": "gateway"}, "invalid type"),
+    ({"op": "add_edge", "from": "check", "to": "ghost"}, "unknown node 'ghost'"),
+    ({"op": "add_edge", "from": "check", "to": "ship"}, "already exists"),
+    ({"op": "remove_edge", "from": "start", "to": "end"}, "unknown edge"),
+    ({"op": "reroute_edge", "from": "check", "to": "ship"}, "needs new_from"),
+    ({"op": "merge_nodes", "node_id": "check"}, "Input should be"),
+], ids=["bad-type", "duplicate-id", "remove-unknown", "rename-bad-type", "edge-to-unknown",
+        "duplicate-edge", "remove-unknown-edge", "reroute-without-target", "unknown-op"])
+def test_edit_that_does_not_fit_is_rejected(edit, reason):
+    patched, applied, rejected = apply_graph_edits(GRAPH, [edit])
+
+    assert applied == [] and len(rejected) == 1 and reason in rejected[0]
+    assert patched["nodes"] == GRAPH["nodes"]
+    assert edge_pairs(patched) == [(e["from"], e["to"]) for e in GRAPH["edges"]]
+
+
+def test_removed_pass_through_node_is_bridged():
+    patched, _, rejected = apply_graph_edits(GRAPH, [{"op": "remove_node", "node_id": "ship"}])
+
+    assert rejected == []
+    assert [n["id"] for n in patched["nodes"]] == ["start", "check", "end"]
+    assert patched["edges"][-1] == {"from_": "check", "to": "end", "label": "shipped"}
+
+
+def test_edits_apply_in_order_and_a_rejected_edit_does_not_stop_the_rest():
+    edits = [
+        {"op": "add_node", "node_id": "gw", "type": "decision", "label": "In stock?"},
+        {"op": "add_edge", "from": "gw", "to": "nowhere"},
+        {"op": "reroute_edge", "from": "check", "to": "ship", "new_to": "gw"},
+        {"op": "add_edge", "from": "gw", "to": "ship", "label": "yes"},
+        {"op": "add_edge", "from": "gw", "to": "end", "label": "no"},
+        {"op": "rename_node", "node_id": "ship", "type": "subprocess", "actor": "Logistics"},
+    ]
+
+    patched, applied, rejected = apply_graph_edits(GRAPH, edits)
+
+    assert len(applied) == 5 and len(rejected) == 1 and "nowhere" in rejected[0]
+    assert edge_pairs(patched) == [("start", "check"), ("check", "gw"), ("ship", "end"), ("gw", "ship"), ("gw", "end")]
+    assert patched["nodes"][2] == {"id": "ship", "type": "subprocess", "label": "Ship goods", "actor": "Logistics"}
+    assert GRAPH["nodes"][2]["type"] == "task"  # Input left untouched
@@ -0,0 +1,52 @@
+"""
+tests/unit/test_model_cache.py
+Cache key derivation of the record/replay model cache
+
+Only the per-run ids ADK assigns to function calls/responses may be ignored;
+'id' fields inside the tool arguments or results are part of the request.
+"""
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from app.app_utils.model_cache import request_cache_key
+
+
+def make_request(call_id: str, args: dict, response_id: str, response: dict) -> LlmRequest:
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[
+            types.Content(role="user", parts=[types.Part(text="Render the graph.")]),
+            types.Content(role="model", parts=[
+                types.Part(function_call=types.FunctionCall(id=call_id, name="render", args=args)),
+            ]),
+            types.Content(role="user", parts=[
+                types.Part(function_response=types.FunctionResponse(id=response_id, name="render", response=response)),
+            ]),
+        ],
+        config=types.GenerateContentConfig(),
+    )
+
+
+def test_function_call_and_response_ids_do_not_change_the_key():
+    args, response = {"nodes": [{"id": "start"}]}, {"result": {"id": "svg-1"}}
+    first = make_request("adk-1111", args, "adk-1111", response)
+    second = make_request("adk-2222", args, "adk-2222", response)
+
+    assert request_cache_key(first) == request_cache_key(second)
+
+
+def test_ids_inside_call_arguments_change_the_key():
+    response = {"result": "ok"}
+    first = make_request("adk-1", {"nodes": [{"id": "start"}, {"id": "end"}]}, "adk-1", response)
+    second = make_request("adk-1", {"nodes": [{"id": "start"}, {"id": "review"}]}, "adk-1", response)
+
+    assert request_cache_key(first) != request_cache_key(second)
+
+
+def test_ids_inside_function_responses_change_the_key():
+    args = {"graph": "g"}
+    first = make_request("adk-1", args, "adk-1", {"node": {"id": "gw"}})
+    second = make_request("adk-1", args, "adk-1", {"node": {"id": "approve"}})
+
+    assert request_cache_key(first) != request_cache_key(second)
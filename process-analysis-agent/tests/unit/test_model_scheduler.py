@@ -0,0 +1,142 @@
+"""
+tests/unit/test_model_scheduler.py
+ModelCallScheduler + ScheduledGemini against the local fake model server
+
+Every test starts its own tests/fake_model_server.py on a free port and
+points ScheduledGemini at it (GEMINI_BASE_URL), so the real HTTP client,
+429/503 responses and RetryInfo delays are exercised without an API key.
+Scheduler and server share a fake clock (tests/conftest.py): waits and
+backoffs take no real time and elapsed times are exact.
+"""
+
+import asyncio
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.genai import errors, types
+
+from app import config
+from app.app_utils.model_scheduler import (
+    CircuitOpenError,
+    ModelCallScheduler,
+    ScheduledGemini,
+    observe_retries,
+    priority_class,
+    set_model_scheduler,
+)
+
+MODEL = config.MODEL_FLASH_THINKING
+UNLIMITED = {"rpm": 100_000, "tpm": 100_000_000}
+
+
+def make_scheduler(clock, server, **kwargs) -> ModelCallScheduler:
+    options = {
+        "limits": {MODEL: UNLIMITED}, "backoff_base_s": 0.01, "backoff_max_s": 0.05,
+        "clock": clock, "sleep": clock.sleep, "rng": lambda: 1.0,
+    }
+    scheduler = ModelCallScheduler(**{**options, **kwargs})
+    set_model_scheduler(scheduler)
+    # The server must see every dispatched call at the time the scheduler sent it
+    clock.hold_while(lambda: scheduler.stats()[MODEL]["calls"] > server.counts["requests"])
+    return scheduler
+
+
+async def call(llm: ScheduledGemini, priority: str = "interactive") -> str:
+    request = LlmRequest(
+        model=MODEL,
+        contents=[types.Content(role="user", parts=[types.Part(text="Summarise the process.")])],
+        config=types.GenerateContentConfig(),
+    )
+    with priority_class(priority):
+        # Stops reading after the first response, like a client that only needs the answer
+        async for response in llm.generate_content_async(request):
+            return response.content.parts[0].text
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_keeps_calls_within_the_server_quota(server, clock):
+    # Server quota: 121 rpm; scheduler: 120 rpm. Unthrottled, 3 of 124 calls would get a 429.
+    server.rpm = 121
+    scheduler = make_scheduler(clock, server, limits={MODEL: {"rpm": 120, "tpm": 100_000_000}})
+    llm = ScheduledGemini(model=MODEL)
+
+    start = clock()
+    results = await asyncio.gather(*(call(llm) for _ in range(124)))
+    elapsed = clock() - start
+
+    assert results == ["ok"] * 124
+    assert server.counts["rate_limited"] == 0
+    # 4 calls beyond the bucket's capacity, refilled at 2 per second
+    assert elapsed >= 2.0
+    assert scheduler.stats()[MODEL]["throttled_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_call_is_retried_after_the_retry_info_delay(server, clock):
+    # The server allows 60 calls at once; the 61st gets a 429 with retryDelay '1s'
+    server.rpm = 60
+    scheduler = make_scheduler(clock, server)
+    llm = ScheduledGemini(model=MODEL)
+    retried = []
+    observe_retries(retried.append)  # Inherited by the gathered calls (per-agent retry counts)
+
+    start = clock()
+    results = await asyncio.gather(*(call(llm) for _ in range(61)))
+    elapsed = clock() - start
+
+    stats = scheduler.stats()[MODEL]
+    assert results == ["ok"] * 61
+    assert server.counts["rate_limited"] >= 1
+    assert stats["rate_limited"] >= 1 and stats["retries"] >= 1
+    assert stats["failed"] == 0
+    assert len(retried) == stats["retries"]
+    assert all(isinstance(error, errors.ClientError) and error.code == 429 for error in retried)
+    assert elapsed >= 1.0  # Server-suggested delay wins over the (tiny) backoff
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures_and_closes_after_a_trial(server, clock):
+    server.error_rate = 1.0  # Every request: 503 UNAVAILABLE
+    scheduler = make_scheduler(
+        clock, server, max_retries=1, breaker_threshold=2, breaker_cooldown_s=0.5, max_wait_s=0.1
+    )
+    llm = ScheduledGemini(model=MODEL)
+
+    with pytest.raises(errors.ServerError):
+        await call(llm)  # Attempt + 1 retry = 2 consecutive failures
+    assert scheduler.stats()[MODEL]["circuit"] == "open"
+    assert scheduler.stats()[MODEL]["circuit_opened"] == 1
+
+    requests = server.counts["requests"]
+    with pytest.raises(CircuitOpenError):
+        await call(llm)  # Cooldown (0.5s) exceeds max_wait_s: fails fast
+    assert server.counts["requests"] == requests  # Nothing sent while open
+
+    server.error_rate = 0.0
+    await clock.sleep(0.5)
+    assert await call(llm) == "ok"  # Half-open trial succeeds
+    assert scheduler.stats()[MODEL]["circuit"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_are_dispatched_before_queued_batch_calls(server, clock):
+    # ~1 call per 0.25s from the token bucket; an empty bucket makes every call queue
+    scheduler = make_scheduler(clock, server, limits={MODEL: {"rpm": 100_000, "tpm": 240_000}})
+    scheduler.settle(MODEL, 0, 240_000)
+    llm = ScheduledGemini(model=MODEL)
+    finished = []
+
+    async def tracked(name: str, priority: str) -> None:
+        await call(llm, priority)
+        finished.append(name)
+
+    await asyncio.gather(
+        tracked("batch-1", "batch"),
+        tracked("batch-2", "batch"),
+        tracked("interactive-1", "interactive"),
+        tracked("interactive-2", "interactive"),
+    )
+
+    assert finished == ["interactive-1", "interactive-2", "batch-1", "batch-2"]
+    queued = scheduler.stats()[MODEL]["queued_ms_by_priority"]
+    assert queued["batch"] > queued["interactive"]
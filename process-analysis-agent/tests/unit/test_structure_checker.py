@@ -0,0 +1,136 @@
+"""
+tests/unit/test_structure_checker.py
+Deterministic structural checks: blocking issues and non-blocking warnings
+
+Each case takes a valid graph and breaks exactly one thing about it.
+"""
+
+import pytest
+
+from app import config
+from app.tools.structure_checker import check_process_structure, structure_score
+
+NODES = [
+    {"id": "start", "type": "start_event", "label": "Invoice received", "actor": None},
+    {"id": "check", "type": "task", "label": "Check invoice", "actor": "Clerk"},
+    {"id": "gw", "type": "exclusive_gateway", "label": "Invoice correct?", "actor": "Clerk"},
+    {"id": "approve", "type": "task", "label": "Approve payment", "actor": "Manager"},
+    {"id": "reject", "type": "task", "label": "Return invoice", "actor": "Clerk"},
+    {"id": "end", "type": "end_event", "label": "Done", "actor": None},
+]
+EDGES = [
+    {"from": "start", "to": "check", "label": None},
+    {"from": "check", "to": "gw", "label": None},
+    {"from": "gw", "to": "approve", "label": "yes"},
+    {"from": "gw", "to": "reject", "label": "no"},
+    {"from": "approve", "to": "end", "label": None},
+    {"from": "reject", "to": "end", "label": None},
+]
+ANALYSIS = {
+    "actors": ["Clerk", "Manager"],
+    "steps": [
+        {"id": 1, "type": "start_event", "action": "Invoice received", "actor": None},
+        {"id": 2, "type": "task", "action": "Clerk checks the invoice", "actor": "Clerk"},
+        {"id": 3, "type": "decision", "action": "Is the invoice correct?", "actor": "Clerk"},
+        {"id": 4, "type": "task", "action": "Manager approves the payment", "actor": "Manager"},
+        {"id": 5, "type": "task", "action": "Clerk returns the invoice", "actor": "Clerk"},
+        {"id": 6, "type": "end_event", "action": "Done", "actor": None},
+    ],
+    "dependencies": [],
+}
+
+
+def graph(drop_nodes=(), add_nodes=(), drop_edges=(), add_edges=(), retype=None):
+    retype = retype or {}
+    nodes = [{**n, "type": retype.get(n["id"], n["type"])} for n in NODES if n["id"] not in drop_nodes]
+    edges = [e for e in EDGES if (e["from"], e["to"]) not in drop_edges
+             and e["from"] not in drop_nodes and e["to"] not in drop_nodes]
+    return {
+        "nodes": nodes + [{"id": i, "type": "task", "label": i, "actor": None} for i in add_nodes],
+        "edges": edges + [{"from": s, "to": t, "label": None} for s, t in add_edges],
+    }
+
+
+@pytest.fixture(autouse=True)
+def thresholds(monkeypatch):
+    monkeypatch.setattr(config, "MIN_ACTOR_COVERAGE", 1.0)
+    monkeypatch.setattr(config, "MIN_STEP_COVERAGE", 0.6)
+
+
+def test_valid_graph_passes_without_warnings():
+    result = check_process_structure(graph(), ANALYSIS)
+
+    assert result["passed"] and result["issues"] == [] and result["warnings"] == []
+    assert result["metrics"]["actor_coverage"] == 1.0 and result["metrics"]["step_coverage"] == 1.0
+    assert structure_score(result) == 1.0
+
+
+# --- Blocking checks ---
+
+@pytest.mark.parametrize("conversion, issue, metric", [
+    (graph(add_edges=[("check", "ghost")]), "unknown node IDs: 'check -> ghost'", ("dangling_edges", 1)),
+    (graph(drop_nodes=["start"]), "No 'start_event'", None),
+    (graph(retype={"end": "task"}), "No 'end_event'", None),
+    (graph(add_nodes=["orphan"], add_edges=[("orphan", "end")]), "not reachable from the start event: 'orphan'",
+     ("unreachable_nodes", 1)),
+    (graph(drop_edges=[("reject", "end")]), "dead ends): 'reject'", ("dead_ends", 1)),
+    ({"nodes": NODES + [NODES[1]], "edges": EDGES}, "Duplicate node IDs: 'check'", None),
+], ids=["dangling-edge", "missing-start", "missing-end", "unreachable", "dead-end", "duplicate-id"])
+def test_structural_error_blocks(conversion, issue, metric):
+    result = check_process_structure(conversion)
+
+    assert not result["passed"]
+    assert any(issue in i for i in result["issues"]), result["issues"]
+    assert issue in result["feedback"]
+    if metric:
+        assert result["metrics"][metric[0]] == metric[1]
+
+
+def test_graph_without_start_reports_no_unreachable_nodes():
+    # Without a start event everything would be unreachable - only the root cause is reported
+    result = check_process_structure(graph(drop_nodes=["start"]))
+
+    assert result["metrics"]["unreachable_nodes"] == 0 and len(result["issues"]) == 1
+
+
+# --- Non-blocking warnings ---
+
+@pytest.mark.parametrize("conversion, analysis, warning", [
+    (graph(retype={"check": "decision"}), None, "Gateways with fewer than 2 outgoing edges: 'check'"),
+    (graph(), {**ANALYSIS, "actors": ["Clerk", "Manager", "Auditor"]}, "missing in the graph: 'Auditor'"),
+    (graph(), {**ANALYSIS, "steps": ANALYSIS["steps"] + [
+        {"id": 7, "type": "task", "action": "Archive documents", "actor": "Clerk"},
+        {"id": 8, "type": "task", "action": "Notify supplier", "actor": "Clerk"},
+        {"id": 9, "type": "task", "action": "Update ledger", "actor": "Clerk"},
+    ]}, "Only 57% of the analysed steps"),
+], ids=["weak-gateway", "actor-coverage", "step-coverage"])
+def test_warning_does_not_block(conversion, analysis, warning):
+    result = check_process_structure(conversion, analysis)
+
+    assert result["passed"] and result["issues"] == []
+    assert any(warning in w for w in result["warnings"]), result["warnings"]
+    assert all(line.startswith("- (warning) ") for line in result["feedback"].splitlines())
+
+
+def test_join_gateway_is_not_a_weak_gateway():
+    # One outgoing but two incoming edges: a join, not a degenerate split
+    conversion = graph(
+        add_nodes=["join"],
+        drop_edges=[("approve", "end"), ("reject", "end")],
+        add_edges=[("approve", "join"), ("reject", "join"), ("join", "end")],
+    )
+    conversion["nodes"][-1]["type"] = "parallel_gateway"
+
+    assert check_process_structure(conversion)["warnings"] == []
+
+
+def test_coverage_metrics_name_the_missing_items():
+    analysis = {**ANALYSIS, "actors": ["clerk ", "Auditor"], "steps": ANALYSIS["steps"][:2] + [
+        {"id": 7, "type": "task", "action": "Archive documents", "actor": "Auditor"},
+    ]}
+
+    metrics = check_process_structure(graph(), analysis)["metrics"]
+
+    assert metrics["missing_actors"] == ["Auditor"] and metrics["extra_actors"] == ["manager"]
+    assert metrics["actor_coverage"] == 0.5
+    assert metrics["missing_steps"] == ["Archive documents"] and metrics["step_coverage"] == 0.5
@@ -0,0 +1,69 @@
+"""
+tests/unit/test_text_chunker.py
+Section and chunk splitting of extracted PDF text
+"""
+
+from app.tools.text_chunker import content_hash, split_into_chunks, split_into_sections
+
+TEXT = "\n".join([
+    "--- Page 1 ---",
+    "# Purchasing",
+    "Orders above 1000 EUR need an approval.",
+    "2.1 Scope",
+    "This applies to all departments.",
+    "--- Page 2 ---",
+    "The clerk checks the invoice.",
+])
+
+
+def document(sections: int) -> str:
+    return "\n".join(
+        f"--- Page {i + 1} ---\nSection {i} describes step {i} of the process in some detail." for i in range(sections)
+    )
+
+
+def test_sections_start_at_page_markers_and_headings():
+    sections = split_into_sections(TEXT)
+
+    assert [s.split("\n")[0] for s in sections] == [
+        "--- Page 1 ---", "# Purchasing", "2.1 Scope", "--- Page 2 ---",
+    ]
+    assert "\n".join(sections) == TEXT
+
+
+def test_chunks_respect_the_size_limit_and_keep_all_text():
+    text = document(40)
+
+    chunks = split_into_chunks(text, max_chars=400)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= 400 for c in chunks)
+    assert "\n".join(chunks) == text
+
+
+def test_oversized_section_is_split_on_line_boundaries():
+    text = "--- Page 1 ---\n" + "\n".join(f"Line {i} of a very long section." for i in range(30))
+
+    chunks = split_into_chunks(text, max_chars=200)
+
+    assert all(len(c) <= 200 for c in chunks)
+    assert "\n".join(chunks) == text
+
+
+def test_short_document_is_a_single_chunk():
+    assert split_into_chunks(TEXT, max_chars=10_000) == [TEXT]
+
+
+def test_chunk_boundaries_resynchronise_after_an_edit():
+    text = document(60)
+    edited = text.replace("Section 5 describes", "Section 5 now describes")
+
+    before, after = split_into_chunks(text, 500), split_into_chunks(edited, 500)
+
+    changed = [c for c in after if c not in before]
+    assert 1 <= len(changed) <= 2 and "Section 5 now" in changed[0]
+
+
+def test_content_hash_ignores_page_markers_and_layout():
+    assert content_hash("--- Page 1 ---\n  Step one  \n\nStep two") == content_hash("--- Page 7 ---\nStep one\nStep two")
+    assert content_hash("Step one\nStep two") != content_hash("Step one\nStep three")
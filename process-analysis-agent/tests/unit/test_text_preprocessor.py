@@ -0,0 +1,68 @@
+"""
+tests/unit/test_text_preprocessor.py
+Boilerplate removal and text normalisation before the LLM prompts
+"""
+
+import pytest
+
+from app import config
+from app.tools.text_preprocessor import preprocess_text
+
+
+def page(number: int, body: str) -> str:
+    return f"--- Page {number} ---\nACME Corp - Purchasing Manual\n{body}\nConfidential - Page {number} of 4\n{number}"
+
+
+@pytest.fixture(autouse=True)
+def boilerplate_settings(monkeypatch):
+    monkeypatch.setattr(config, "BOILERPLATE_MIN_PAGES", 3)
+    monkeypatch.setattr(config, "BOILERPLATE_MIN_PAGE_RATIO", 0.5)
+    monkeypatch.setattr(config, "BOILERPLATE_EDGE_LINES", 3)
+
+
+BODIES = [
+    "The clerk receives\nthe invoice and\nenters it.\nIt is filed.",
+    "The clerk checks\nthe amount against\nthe order.\nIt is marked.",
+    "The manager approves\nlarge amounts and\nsigns them.\nIt is released.",
+    "Accounting books\nthe payment and\narchives it.\nIt is closed.",
+]
+
+
+def test_repeated_headers_footers_and_page_numbers_are_removed():
+    text = "\n".join(page(n, body) for n, body in enumerate(BODIES, 1))
+
+    result = preprocess_text(text)
+
+    assert result["text"].split("\n")[:6] == ["--- Page 1 ---", *BODIES[0].split("\n"), "--- Page 2 ---"]
+    assert "ACME" not in result["text"] and "Confidential" not in result["text"]
+    # The bare page numbers repeat (digits ignored) and count as footer lines
+    assert result["stats"]["pages"] == 4 and result["stats"]["removed_boilerplate_lines"] == 12
+    assert result["stats"]["tokens_after"] < result["stats"]["tokens_before"]
+
+
+def test_numbers_in_the_body_are_kept():
+    body = "\n".join(["Intro", "Head", "Lead", "Amounts:", "2024", "1000", "Tail", "Foot", "End"])
+
+    result = preprocess_text(f"--- Page 1 ---\n{body}\n3")
+
+    assert "\n2024\n1000\n" in result["text"] and not result["text"].endswith("\n3")
+    assert result["stats"]["removed_page_number_lines"] == 1
+
+
+def test_repeated_lines_are_kept_for_short_documents():
+    text = "\n".join(page(n, "Body text.") for n in range(1, 3))
+
+    result = preprocess_text(text)
+
+    assert result["text"].count("ACME Corp") == 2 and result["stats"]["boilerplate_patterns"] == 0
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Die Bestell-\nanforderung wird geprüft.", "Die Bestellanforderung wird geprüft."),
+    ("Der Ein-\nund Verkauf", "Der Ein-\nund Verkauf"),
+    ("Pre-\nand post-processing", "Pre-\nand post-processing"),
+    ("Purchase-\nOrder", "Purchase-\nOrder"),
+    ("Multiple   spaces\t here  \n\n\n\nNext", "Multiple spaces here\n\nNext"),
+], ids=["hyphenated-word", "coordinated-und", "coordinated-and", "uppercase-continuation", "whitespace"])
+def test_text_normalisation(text, expected):
+    assert preprocess_text(text)["text"] == expected